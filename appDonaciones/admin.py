@@ -1,9 +1,61 @@
 from django.contrib import admin
 # Asegúrate de que TipoDeAlimento YA NO esté en esta lista:
-from .models import Donaciones, Donante, BajoRecursos, Zoo
+from .models import Donaciones, Donante, BajoRecursos, Zoo, CorreoPendiente, Asignacion, MovimientoInventario
+
+
+@admin.register(Donante)
+class DonanteAdmin(admin.ModelAdmin):
+    list_display = ('id_donante', 'nombre', 'ciudad', 'estado', 'num_donaciones', 'kg_donados', 'ultima_donacion')
+
+    def get_queryset(self, request):
+        # Estadísticas en la misma consulta del listado (evita N+1)
+        return super().get_queryset(request).with_stats()
+
+    @admin.display(description='Donaciones', ordering='num_donaciones')
+    def num_donaciones(self, obj):
+        return obj.num_donaciones
+
+    @admin.display(description='Kg donados', ordering='kg_donados')
+    def kg_donados(self, obj):
+        return obj.kg_donados
+
+    @admin.display(description='Última donación', ordering='ultima_donacion')
+    def ultima_donacion(self, obj):
+        return obj.ultima_donacion
+
+
+@admin.register(Donaciones)
+class DonacionesAdmin(admin.ModelAdmin):
+    list_select_related = ('donante',)
+
+
+@admin.register(CorreoPendiente)
+class CorreoPendienteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'destinatario', 'asunto', 'estado', 'intentos', 'proximo_intento', 'enviado')
+    list_filter = ('estado',)
+
+
+@admin.register(Asignacion)
+class AsignacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'donacion', 'zona', 'zoo', 'kg', 'distancia_km', 'creada')
+    list_select_related = ('donacion', 'zona', 'zoo')
+    raw_id_fields = ('donacion', 'zona', 'zoo')
+
+
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'ciudad', 'tipo_alimento', 'kg', 'donacion', 'asignacion', 'creado')
+    list_filter = ('tipo', 'tipo_alimento')
+    raw_id_fields = ('donacion', 'asignacion')
+
+    # El libro solo crece: nada se edita ni se borra desde el admin
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 # Registra solo los modelos que existen
-admin.site.register(Donaciones)
-admin.site.register(Donante)
 admin.site.register(BajoRecursos)
-admin.site.register(Zoo)
\ No newline at end of file
+admin.site.register(Zoo)
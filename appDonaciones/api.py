@@ -0,0 +1,190 @@
+"""API JSON de solo lectura (v1) para Donaciones, Donante, BajoRecursos y Zoo.
+
+- Mismos permisos que las vistas HTML: solo staff (401 sin sesión, 403 sin staff).
+- Listados con paginación por cursor ('despues'/'antes', ver paginacion.py).
+- ?fields=a,b limita las columnas: se traduce a values() y solo se leen esas.
+- ETag a partir de la generación de caché de los modelos (ver cache.py): con
+  If-None-Match se responde 304 sin consultar los datos. Solo con caché
+  compartida (settings.CACHE_VISTAS): con una por proceso, un worker que no
+  vio la escritura respondería 304 a datos que cambiaron.
+
+La única escritura es el alta de donaciones en lote (crear_donaciones_lote).
+"""
+import functools
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from .cache import generaciones
+from .importacion import crear_donaciones
+from .models import BajoRecursos, Donaciones, Donante, Zoo
+from .paginacion import paginar
+
+VERSION = 'v1'
+TAMANO_PAGINA_API = 100
+# Donaciones por petición en el alta en lote
+MAX_LOTE = 500
+
+
+class Recurso:
+    def __init__(self, modelo, campos, orden, depende_de=()):
+        self.modelo = modelo
+        self.campos = campos
+        self.orden = orden
+        # Modelos cuyos cambios invalidan el ETag
+        self.depende_de = (modelo,) + tuple(depende_de)
+
+
+RECURSOS = {
+    'donaciones': Recurso(
+        Donaciones,
+        ('id_donacion', 'donante', 'donante_texto', 'cantidad', 'fecha_llegada', 'tipo_alimento', 'destino'),
+        ('-fecha_llegada', '-id_donacion'),
+    ),
+    'donantes': Recurso(
+        Donante,
+        ('id_donante', 'nombre', 'tipo_donante', 'ciudad', 'direccion', 'telefono', 'email',
+         'fecha_registro', 'estado', 'notas', 'latitud', 'longitud'),
+        ('-fecha_registro', '-id_donante'),
+    ),
+    'bajorecursos': Recurso(
+        BajoRecursos,
+        ('id_bajo', 'ciudad', 'donacion', 'demanda_kg', 'latitud', 'longitud'),
+        ('-id_bajo',),
+    ),
+    'zoos': Recurso(
+        Zoo,
+        ('id_zoo', 'animales', 'trabajadores', 'tipo_animal', 'donacion', 'demanda_kg', 'latitud', 'longitud'),
+        ('-id_zoo',),
+    ),
+}
+
+
+def _error(mensaje, status):
+    return JsonResponse({'error': mensaje}, status=status)
+
+
+def solo_staff(vista):
+    """Como @login_required + el chequeo de staff de las vistas, pero respondiendo JSON."""
+    @functools.wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Autenticación requerida.', 401)
+        if not request.user.is_staff:
+            return _error('No tienes permisos para acceder a esta página.', 403)
+        return vista(request, *args, **kwargs)
+    return envoltura
+
+
+def _etag(request, recurso):
+    gens = '.'.join(str(g) for g in generaciones(*recurso.depende_de))
+    firma = hashlib.md5(f'{VERSION}:{request.get_full_path()}:{gens}'.encode()).hexdigest()
+    return quote_etag(firma)
+
+
+def condicional(vista):
+    """Agrega ETag y responde 304 si coincide con If-None-Match, antes de tocar la base de datos."""
+    @functools.wraps(vista)
+    def envoltura(request, recurso, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return _error('Método no permitido.', 405)
+        if not settings.CACHE_VISTAS:
+            return vista(request, recurso, *args, **kwargs)
+        etag = _etag(request, RECURSOS[recurso])
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+            response = HttpResponse(status=304)
+        else:
+            response = vista(request, recurso, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # El cliente puede guardar la respuesta, pero debe revalidar siempre
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+    return envoltura
+
+
+def _campos(request, recurso):
+    """Campos pedidos en ?fields= (o todos). None si alguno no existe."""
+    pedidos = [c.strip() for c in request.GET.get('fields', '').split(',') if c.strip()]
+    if not pedidos:
+        return list(recurso.campos)
+    if set(pedidos) - set(recurso.campos):
+        return None
+    return pedidos
+
+
+def _serializar(fila, campos):
+    return {
+        campo: float(fila[campo]) if isinstance(fila[campo], Decimal) else fila[campo]
+        for campo in campos
+    }
+
+
+@solo_staff
+@condicional
+def lista(request, recurso):
+    config = RECURSOS[recurso]
+    campos = _campos(request, config)
+    if campos is None:
+        return _error(f'Campos válidos: {", ".join(config.campos)}.', 400)
+    # Las columnas del orden se leen siempre: forman el cursor
+    columnas = list(dict.fromkeys(campos + [c.lstrip('-') for c in config.orden]))
+    pagina = paginar(request, config.modelo.objects.values(*columnas), config.orden, TAMANO_PAGINA_API)
+    url = reverse(f'api_{recurso}')
+    return JsonResponse({
+        'resultados': [_serializar(fila, campos) for fila in pagina],
+        'siguiente': f'{url}?{pagina.query_siguiente}' if pagina.tiene_siguiente else None,
+        'anterior': f'{url}?{pagina.query_anterior}' if pagina.tiene_anterior else None,
+    })
+
+
+@solo_staff
+@condicional
+def detalle(request, recurso, pk):
+    config = RECURSOS[recurso]
+    campos = _campos(request, config)
+    if campos is None:
+        return _error(f'Campos válidos: {", ".join(config.campos)}.', 400)
+    fila = config.modelo.objects.filter(pk=pk).values(*campos).first()
+    if fila is None:
+        return _error('No encontrado.', 404)
+    return JsonResponse(_serializar(fila, campos))
+
+
+@ensure_csrf_cookie
+def crear_donaciones_lote(request):
+    """Alta de varias donaciones: POST con un arreglo JSON de objetos.
+
+    Cada objeto lleva los campos de DonacionesForm (sin captcha). Las válidas
+    se guardan juntas en una transacción y la respuesta trae un resultado por
+    item. Como toda vista con sesión, el POST necesita el token CSRF: un GET
+    deja la cookie 'csrftoken' y devuelve el máximo por petición. No se encola
+    el correo de confirmación por donación.
+    """
+    if not request.user.is_authenticated:
+        return _error('Autenticación requerida.', 401)
+    if request.method == 'GET':
+        return JsonResponse({'max_lote': MAX_LOTE})
+    if request.method != 'POST':
+        return _error('Método no permitido.', 405)
+    try:
+        items = json.loads(request.body)
+    except (UnicodeDecodeError, ValueError):
+        return _error('El cuerpo debe ser JSON válido.', 400)
+    if not isinstance(items, list) or not items:
+        return _error('Se espera un arreglo JSON con al menos una donación.', 400)
+    if len(items) > MAX_LOTE:
+        return _error(f'Máximo {MAX_LOTE} donaciones por petición.', 400)
+    resultados = crear_donaciones(items)
+    creadas = sum(r['ok'] for r in resultados)
+    return JsonResponse(
+        {'creadas': creadas, 'con_error': len(resultados) - creadas, 'resultados': resultados},
+        status=201 if creadas else 400,
+    )
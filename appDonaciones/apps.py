@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppdonacionesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appDonaciones'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,399 @@
+"""Motor de asignación de donaciones a zonas de bajos recursos y zoológicos.
+
+Se arma una red de transporte y se resuelve como flujo de costo mínimo:
+
+    origen -> grupo de oferta -> grupo de demanda -> destino
+
+Los grupos de oferta juntan los kg pendientes de donaciones con el mismo
+tipo de alimento, el mismo destino elegido a mano y la misma celda de
+geohash del donante. Los de demanda juntan zonas (o zoos que aceptan los
+mismos alimentos) de la misma celda. Así el grafo depende de cuántas celdas
+hay y no de cuántas donaciones, y con decenas de miles de donaciones se
+resuelve en segundos. El costo por kg es la distancia en km, más una
+penalización si el destino no coincide con el que se eligió en la donación.
+
+El resultado es óptimo para el modelo agrupado: entre todas las asignaciones
+que reparten la mayor cantidad de kg posible, es la de menor costo cuando la
+distancia se mide entre los centros de las celdas. Para las donaciones y los
+destinos reales es una aproximación (el error es del orden del tamaño de una
+celda); si cada donación y cada destino quedan en su propia celda, es el
+óptimo exacto. La distancia_km que se guarda sí es la de cada par real.
+"""
+import heapq
+from collections import defaultdict, deque
+
+from django.db import connection, transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import geo, inventario
+from .geocodificacion import NOMENCLATOR_CHILE, normalizar
+from .models import Asignacion, BajoRecursos, Donaciones, Zoo
+
+# Largo del prefijo de geohash con que se agrupa (~20-40 km)
+PRECISION_GRUPO = 4
+# Distancia supuesta cuando falta la ubicación de alguno de los extremos
+DISTANCIA_DESCONOCIDA_KM = 300
+# Costo extra por kg si el destino no es el que se eligió en la donación
+PENALIZACION_DESTINO_KM = 100
+
+TODOS_LOS_ALIMENTOS = frozenset([
+    'Frutas y Verduras', 'Carnes', 'Granos y Cereales', 'Alimento no perecible', 'Lácteos',
+])
+_CARNIVORO = frozenset(['Carnes'])
+_HERBIVORO = frozenset(['Frutas y Verduras', 'Granos y Cereales'])
+_OMNIVORO = _CARNIVORO | _HERBIVORO
+
+# Qué alimentos acepta un zoo según su tipo_animal. ZooForm guarda los
+# códigos '1'-'4'; choice.TIPOS_ANIMAL usa los nombres.
+ALIMENTOS_POR_ANIMAL = {
+    'Mamífero': _OMNIVORO,
+    'Herbívoro': _HERBIVORO,
+    'Carnívoro': _CARNIVORO,
+    'Omnívoro': _OMNIVORO,
+    'Ave': _HERBIVORO,
+    'Reptil': _CARNIVORO | frozenset(['Frutas y Verduras']),
+    '1': _OMNIVORO,        # Mamíferos
+    '2': _HERBIVORO,       # Aves
+    '3': _CARNIVORO | frozenset(['Frutas y Verduras']),  # Reptiles
+    '4': _CARNIVORO,       # Anfibios
+}
+
+DESTINO_ZONA = 'Bajo Recursos'
+DESTINO_ZOO = 'Zoológico'
+
+
+class FlujoCostoMinimo:
+    """Flujo de costo mínimo por caminos más cortos (Dijkstra con potenciales).
+
+    En cada fase se calculan las distancias reducidas y se agotan los caminos
+    por aristas de costo reducido cero, lo que ahorra muchas corridas de
+    Dijkstra. Los costos deben ser enteros no negativos.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.grafo = [[] for _ in range(n)]
+
+    def arista(self, u, v, capacidad, costo):
+        """Agrega u -> v y devuelve una referencia para leer su flujo después."""
+        self.grafo[u].append([v, capacidad, costo, len(self.grafo[v])])
+        self.grafo[v].append([u, 0, -costo, len(self.grafo[u]) - 1])
+        return u, len(self.grafo[u]) - 1, capacidad
+
+    def flujo(self, referencia):
+        u, i, capacidad = referencia
+        return capacidad - self.grafo[u][i][1]
+
+    def _distancias(self, s, t, potencial):
+        dist, padre = [None] * self.n, [None] * self.n
+        dist[s] = 0
+        cola = [(0, s)]
+        while cola:
+            d, u = heapq.heappop(cola)
+            if d > dist[u]:
+                continue
+            if u == t:
+                # Lo que quede en la cola está a distancia >= d: basta con acotarlo
+                break
+            base = d + potencial[u]
+            for i, (v, capacidad, costo, _) in enumerate(self.grafo[u]):
+                if capacidad > 0:
+                    nueva = base + costo - potencial[v]
+                    if dist[v] is None or nueva < dist[v]:
+                        dist[v] = nueva
+                        padre[v] = (u, i)
+                        heapq.heappush(cola, (nueva, v))
+        return dist, padre
+
+    def _aumentar(self, camino):
+        grafo = self.grafo
+        empuje = min(grafo[u][i][1] for u, i in camino)
+        for u, i in camino:
+            arista = grafo[u][i]
+            arista[1] -= empuje
+            grafo[arista[0]][arista[3]][1] += empuje
+        return empuje
+
+    def _empujar(self, s, t, potencial, alcanzable, puntero):
+        """Busca otro camino de costo reducido cero de s a t (DFS iterativa) y lo aumenta."""
+        grafo = self.grafo
+        camino, en_camino = [], {s}
+        u = s
+        while u != t:
+            aristas = grafo[u]
+            while puntero[u] < len(aristas):
+                v, capacidad, costo, _ = aristas[puntero[u]]
+                if (capacidad > 0 and alcanzable[v] and v not in en_camino
+                        and costo + potencial[u] - potencial[v] == 0):
+                    break
+                puntero[u] += 1
+            if puntero[u] < len(aristas):
+                camino.append((u, puntero[u]))
+                u = aristas[puntero[u]][0]
+                en_camino.add(u)
+                continue
+            # Sin salida desde u: retroceder y descartar la arista que llevó aquí
+            if not camino:
+                return 0
+            en_camino.discard(u)
+            u, _ = camino.pop()
+            puntero[u] += 1
+        return self._aumentar(camino)
+
+    def resolver(self, s, t):
+        """Devuelve (flujo, costo) del flujo máximo de menor costo de s a t."""
+        potencial = [0] * self.n
+        flujo = costo = 0
+        while True:
+            dist, padre = self._distancias(s, t, potencial)
+            if dist[t] is None:
+                return flujo, costo
+            tope = dist[t]
+            alcanzable = [d is not None and d <= tope for d in dist]
+            for v, d in enumerate(dist):
+                potencial[v] += tope if d is None or d > tope else d
+            # El camino del árbol de Dijkstra siempre se puede aumentar; después
+            # se agotan los demás caminos igual de cortos antes de recalcular
+            camino, v = [], t
+            while v != s:
+                camino.append(padre[v])
+                v = padre[v][0]
+            empuje = self._aumentar(camino[::-1])
+            puntero = [0] * self.n
+            while empuje:
+                flujo += empuje
+                costo += empuje * (potencial[t] - potencial[s])
+                empuje = self._empujar(s, t, potencial, alcanzable, puntero)
+
+
+def _ubicacion(latitud, longitud, geohash, ciudad):
+    """Coordenadas y celda de agrupación; sin coordenadas se usa el centro de la ciudad."""
+    if latitud is not None and longitud is not None:
+        return (float(latitud), float(longitud)), geohash[:PRECISION_GRUPO]
+    ciudad = normalizar(ciudad)
+    if ciudad in NOMENCLATOR_CHILE:
+        return NOMENCLATOR_CHILE[ciudad], 'ciudad:' + ciudad
+    return None, ''
+
+
+class _Grupo:
+    def __init__(self):
+        self.miembros = deque()   # [objeto o id, kg pendientes, coordenadas]
+        self.kg = 0
+        self._suma_lat = self._suma_lon = 0.0
+        self._con_coordenadas = 0
+
+    def agregar(self, miembro, kg, coordenadas):
+        self.miembros.append([miembro, kg, coordenadas])
+        self.kg += kg
+        if coordenadas:
+            self._suma_lat += coordenadas[0]
+            self._suma_lon += coordenadas[1]
+            self._con_coordenadas += 1
+
+    @property
+    def centro(self):
+        if not self._con_coordenadas:
+            return None
+        return self._suma_lat / self._con_coordenadas, self._suma_lon / self._con_coordenadas
+
+    def tomar(self, kg):
+        """Saca kg de los miembros en orden; devuelve [(miembro, kg, coordenadas)]."""
+        partes = []
+        while kg > 0:
+            miembro = self.miembros[0]
+            parte = min(kg, miembro[1])
+            partes.append((miembro[0], parte, miembro[2]))
+            miembro[1] -= parte
+            kg -= parte
+            if not miembro[1]:
+                self.miembros.popleft()
+        return partes
+
+
+def _asignado(campo):
+    """Subconsulta con los kg ya asignados a la fila (sin GROUP BY en la consulta externa)."""
+    total = (
+        Asignacion.objects.filter(**{campo: OuterRef('pk')}).order_by()
+        .values(campo).annotate(total=Sum('kg')).values('total')
+    )
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def _oferta():
+    pendientes = (
+        Donaciones.objects
+        .annotate(asignado=_asignado('donacion'))
+        .filter(cantidad__gt=F('asignado'))
+        .order_by('fecha_llegada', 'id_donacion')
+        .values_list(
+            'id_donacion', 'cantidad', 'asignado', 'tipo_alimento', 'destino',
+            'donante__latitud', 'donante__longitud', 'donante__geohash', 'donante__ciudad',
+        )
+    )
+    grupos = defaultdict(_Grupo)
+    for pk, cantidad, asignado, tipo, destino, lat, lon, geohash, ciudad in pendientes.iterator(chunk_size=5000):
+        coordenadas, celda = _ubicacion(lat, lon, geohash or '', ciudad)
+        grupos[(tipo, destino, celda)].agregar(pk, cantidad - asignado, coordenadas)
+    return grupos
+
+
+def _demanda():
+    grupos = defaultdict(_Grupo)
+    # Bloquea las zonas y zoos con demanda: dos asignaciones simultáneas no
+    # pueden repartir la misma capacidad
+    for modelo, campo, ciudad in ((BajoRecursos, 'zona', 'ciudad'), (Zoo, 'zoo', None)):
+        destinos = (
+            modelo.objects.select_for_update(of=('self',)).filter(demanda_kg__gt=0)
+            .annotate(recibido=_asignado(campo))
+            .filter(demanda_kg__gt=F('recibido'))
+            .order_by('pk')
+        )
+        for destino in destinos:
+            coordenadas, celda = _ubicacion(
+                destino.latitud, destino.longitud, destino.geohash,
+                getattr(destino, ciudad) if ciudad else '',
+            )
+            if modelo is BajoRecursos:
+                clave = (DESTINO_ZONA, TODOS_LOS_ALIMENTOS, celda)
+            else:
+                acepta = ALIMENTOS_POR_ANIMAL.get(str(destino.tipo_animal), frozenset())
+                if not acepta:
+                    continue
+                clave = (DESTINO_ZOO, acepta, celda)
+            grupos[clave].agregar(destino, destino.demanda_kg - destino.recibido, coordenadas)
+    return grupos
+
+
+class Plan:
+    def __init__(self, asignaciones, kg_ofrecidos, kg_demandados, costo):
+        self.asignaciones = asignaciones
+        self.kg_ofrecidos = kg_ofrecidos
+        self.kg_demandados = kg_demandados
+        self.kg_asignados = sum(a.kg for a in asignaciones)
+        # km recorridos por kg entre cada donante y su destino, en promedio (sin penalizaciones)
+        self.km_por_kg = (
+            sum(a.kg * a.distancia_km for a in asignaciones) / self.kg_asignados
+            if self.kg_asignados else 0
+        )
+        # Costo del modelo agrupado (distancias entre celdas más penalizaciones)
+        self.costo = costo
+
+
+def _distancia(origen, destino):
+    if origen and destino:
+        return geo.haversine(*origen, *destino)
+    return DISTANCIA_DESCONOCIDA_KM
+
+
+def _planificar():
+    """Calcula la asignación óptima (sobre las celdas) de lo pendiente. Debe correr dentro de una transacción.
+
+    Entre la oferta y la demanda hay una capa de nodos (celda, clase de
+    destino): la oferta entra a los de su celda cuyos destinos aceptan su
+    alimento, pagando la penalización si no es el destino elegido, y de ahí
+    sale a los destinos pagando la distancia. Son celdas x destinos aristas en
+    vez de grupos de oferta x destinos.
+    """
+    ofertas = _oferta()
+    demandas = _demanda()
+    nodos = {}
+
+    def nodo(clave):
+        return nodos.setdefault(clave, len(nodos))
+
+    origen, sumidero = nodo('origen'), nodo('sumidero')
+    aristas = []   # (u, v, capacidad, costo, dato)
+    for clave, oferta in ofertas.items():
+        aristas.append((origen, nodo(clave), oferta.kg, 0, None))
+    for clave, demanda in demandas.items():
+        aristas.append((nodo(clave), sumidero, demanda.kg, 0, None))
+
+    # Centro de cada celda con toda la oferta que hay en ella
+    centros = defaultdict(_Grupo)
+    for (_, _, celda), oferta in ofertas.items():
+        if oferta.centro:
+            centros[celda].agregar(None, 0, oferta.centro)
+    clases = {(tipo_destino, acepta) for tipo_destino, acepta, _ in demandas}
+
+    entradas, salidas = [], []
+    for clave_oferta, oferta in ofertas.items():
+        tipo, destino_elegido, celda = clave_oferta
+        for tipo_destino, acepta in clases:
+            if tipo in acepta:
+                penalizacion = 0 if destino_elegido == tipo_destino else PENALIZACION_DESTINO_KM
+                capa = ('capa', celda, tipo_destino, acepta)
+                entradas.append(len(aristas))
+                aristas.append((nodo(clave_oferta), nodo(capa), oferta.kg, penalizacion * 10, (capa, oferta)))
+    capas = {dato[0] for *_, dato in (aristas[i] for i in entradas)}
+    for capa in capas:
+        _, celda, tipo_destino, acepta = capa
+        for clave_demanda, demanda in demandas.items():
+            if clave_demanda[:2] == (tipo_destino, acepta):
+                distancia = _distancia(centros[celda].centro if celda in centros else None, demanda.centro)
+                salidas.append(len(aristas))
+                aristas.append((nodo(capa), nodo(clave_demanda), demanda.kg, round(distancia * 10),
+                                (capa, demanda)))
+
+    red = FlujoCostoMinimo(len(nodos))
+    referencias = [red.arista(u, v, capacidad, costo) for u, v, capacidad, costo, _ in aristas]
+    _, costo = red.resolver(origen, sumidero)
+
+    # Cada capa recibe kg de varios grupos de oferta y los entrega a varios
+    # destinos; como todos sus costos son independientes, cualquier
+    # emparejamiento respeta el óptimo. Se reparte en orden: donaciones más
+    # antiguas primero.
+    por_capa = defaultdict(lambda: (deque(), deque()))
+    for i in entradas:
+        kg = red.flujo(referencias[i])
+        if kg:
+            capa, oferta = aristas[i][4]
+            por_capa[capa][0].append([oferta, kg])
+    for i in salidas:
+        kg = red.flujo(referencias[i])
+        if kg:
+            capa, demanda = aristas[i][4]
+            por_capa[capa][1].append([demanda, kg])
+
+    asignaciones = []
+    for entran, salen in por_capa.values():
+        while entran and salen:
+            (oferta, kg_oferta), (demanda, kg_demanda) = entran[0], salen[0]
+            kg = min(kg_oferta, kg_demanda)
+            for donacion_id, parte, origen_real in oferta.tomar(kg):
+                for destino, kg_destino, destino_real in demanda.tomar(parte):
+                    asignaciones.append(Asignacion(
+                        donacion_id=donacion_id, kg=kg_destino,
+                        distancia_km=round(_distancia(origen_real, destino_real), 3),
+                        zona=destino if isinstance(destino, BajoRecursos) else None,
+                        zoo=destino if isinstance(destino, Zoo) else None,
+                    ))
+            entran[0][1] -= kg
+            salen[0][1] -= kg
+            if not entran[0][1]:
+                entran.popleft()
+            if not salen[0][1]:
+                salen.popleft()
+    return Plan(
+        asignaciones,
+        kg_ofrecidos=sum(g.kg for g in ofertas.values()),
+        kg_demandados=sum(g.kg for g in demandas.values()),
+        costo=costo / 10,
+    )
+
+
+def asignar(simular=False):
+    """Calcula y guarda la asignación, con sus salidas de inventario, en una sola transacción."""
+    with transaction.atomic():
+        plan = _planificar()
+        if not simular:
+            if connection.features.can_return_rows_from_bulk_insert:
+                creadas = Asignacion.objects.bulk_create(plan.asignaciones, batch_size=1000)
+            else:
+                # Sin ids de bulk_create (MySQL) las salidas no podrían apuntar a su asignación
+                for creada in plan.asignaciones:
+                    creada.save(force_insert=True)
+                creadas = plan.asignaciones
+            inventario.registrar_salidas(creadas)
+    return plan
@@ -0,0 +1,117 @@
+"""Búsqueda de texto completo de donantes (nombre, dirección y notas).
+
+- PostgreSQL: columna generada ``busqueda`` (tsvector) con índice GIN y un
+  índice trigram sobre ``nombre`` para coincidencias aproximadas.
+- SQLite: tabla virtual FTS5 ``donante_fts`` sincronizada por señales.
+- Otros motores: ``icontains`` sin índice como último recurso.
+
+Las tablas/columnas se crean en la migración 0007.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q, Value
+
+TABLA_FTS = 'donante_fts'
+SIMILITUD_MINIMA = 0.3
+
+
+def _terminos(texto):
+    # Solo palabras: evita errores de sintaxis en MATCH / to_tsquery
+    return re.findall(r'\w+', texto or '')[:10]
+
+
+def motor():
+    return connection.vendor
+
+
+def buscar_donantes(queryset, texto):
+    """Restringe `queryset` a los donantes que coinciden con `texto`.
+
+    El resultado queda anotado con ``rank`` y ordenado por relevancia, así que
+    se puede paginar con slicing. Devuelve un queryset vacío si no hay términos.
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return queryset.none()
+
+    if motor() == 'postgresql':
+        consulta = ' & '.join(f'{t}:*' for t in terminos)
+        resultado = queryset.extra(
+            select={'rank': "ts_rank(donante.busqueda, to_tsquery('spanish', %s))"},
+            select_params=[consulta],
+            where=["donante.busqueda @@ to_tsquery('spanish', %s)"],
+            params=[consulta],
+            order_by=['-rank', '-id_donante'],
+        )
+        if resultado.exists():
+            return resultado
+        # Sin coincidencias exactas: coincidencia aproximada por trigramas
+        texto = ' '.join(terminos)
+        return queryset.extra(
+            select={'rank': 'similarity(donante.nombre, %s)'},
+            select_params=[texto],
+            where=['donante.nombre %% %s'],
+            params=[texto],
+            order_by=['-rank', '-id_donante'],
+        )
+
+    if motor() == 'sqlite':
+        consulta = ' '.join(f'"{t}"*' for t in terminos)
+        # bm25: menor es más relevante
+        return queryset.extra(
+            select={'rank': f'{TABLA_FTS}.rank'},
+            tables=[TABLA_FTS],
+            where=[f'{TABLA_FTS}.rowid = donante.id_donante', f'{TABLA_FTS} MATCH %s'],
+            params=[consulta],
+            order_by=['rank', '-id_donante'],
+        )
+
+    filtro = Q()
+    for termino in terminos:
+        filtro &= Q(nombre__icontains=termino) | Q(direccion__icontains=termino) | Q(notas__icontains=termino)
+    return queryset.filter(filtro).annotate(rank=Value(0)).order_by('-id_donante')
+
+
+def indexar_donantes(donantes, nuevos=False):
+    """Actualiza el índice FTS5 de SQLite para los donantes dados.
+
+    En PostgreSQL la columna generada se mantiene sola, así que no hace nada.
+    Los guardados individuales pasan por las señales; las escrituras masivas
+    (bulk_create/update) deben llamar a esta función. Con ``nuevos=True``
+    (filas recién insertadas) se omite el borrado previo.
+    """
+    if motor() != 'sqlite':
+        return
+    filas = [
+        (d.pk, d.nombre or '', d.direccion or '', d.notas or '')
+        for d in donantes
+    ]
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        if not nuevos:
+            cursor.executemany(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [(f[0],) for f in filas])
+        cursor.executemany(
+            f'INSERT INTO {TABLA_FTS} (rowid, nombre, direccion, notas) VALUES (%s, %s, %s, %s)',
+            filas,
+        )
+
+
+def desindexar_donantes(ids):
+    if motor() != 'sqlite' or not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLA_FTS} WHERE rowid = %s', [(pk,) for pk in ids])
+
+
+def reconstruir_indice():
+    """Reconstruye por completo el índice FTS5 (SQLite)."""
+    if motor() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA_FTS}')
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, nombre, direccion, notas) "
+            "SELECT id_donante, COALESCE(nombre, ''), COALESCE(direccion, ''), COALESCE(notas, '') FROM donante"
+        )
@@ -0,0 +1,110 @@
+"""Caché de vistas y fragmentos invalidada por "generación" de modelo.
+
+Cada modelo tiene un número de generación guardado en la caché. Las claves de
+las vistas y fragmentos incluyen las generaciones de los modelos de los que
+dependen; al guardar o borrar un registro se incrementa la generación de su
+modelo (O(1)) y todas las entradas anteriores quedan huérfanas hasta expirar.
+
+Las generaciones tienen que verse desde todos los procesos, así que esto solo
+se activa con una caché compartida (settings.CACHE_VISTAS); con 'locmem' y
+varios workers, los que no hicieron la escritura seguirían sirviendo páginas
+viejas hasta el timeout.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PREFIJO = 'donaciones'
+
+
+def _clave_generacion(modelo):
+    return f'{PREFIJO}:gen:{modelo._meta.label_lower}'
+
+
+def _generacion_inicial():
+    # Basada en el reloj: si la clave se pierde (reinicio, desalojo) nunca vuelve a un valor ya usado
+    return int(time.time() * 1000)
+
+
+def generaciones(*modelos):
+    """Devuelve las generaciones de `modelos` con una sola lectura a la caché."""
+    claves = [_clave_generacion(m) for m in modelos]
+    valores = cache.get_many(claves)
+    for clave in claves:
+        if clave not in valores:
+            cache.add(clave, _generacion_inicial(), timeout=None)
+            valores[clave] = cache.get(clave)
+    return [valores[c] for c in claves]
+
+
+def invalidar(modelo):
+    """Incrementa la generación de `modelo`. Lo llaman las señales (tras el commit) y las escrituras masivas."""
+    clave = _clave_generacion(modelo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, _generacion_inicial(), timeout=None)
+
+
+# --- Estadísticas de aciertos ---
+
+def _registrar(resultado):
+    clave = f'{PREFIJO}:stats:{resultado}'
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 1, timeout=None)
+
+
+def estadisticas():
+    datos = cache.get_many([f'{PREFIJO}:stats:hits', f'{PREFIJO}:stats:misses'])
+    hits = datos.get(f'{PREFIJO}:stats:hits', 0)
+    misses = datos.get(f'{PREFIJO}:stats:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'ratio': hits / total if total else 0.0}
+
+
+# --- Vistas ---
+
+def _clave_vista(request, modelos):
+    gens = '.'.join(str(g) for g in generaciones(*modelos))
+    ruta = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{PREFIJO}:vista:{request.user.pk}:{int(request.user.is_staff)}:{ruta}:{gens}'
+
+
+def cache_por_modelo(*modelos, timeout=None):
+    """Cachea la respuesta GET de una vista mientras no cambien `modelos`.
+
+    Va debajo de @login_required. La clave incluye al usuario (las páginas
+    muestran su nombre) y no se usa la caché si hay mensajes pendientes,
+    porque la plantilla los consumiría, ni sin caché compartida.
+    """
+    def decorador(vista):
+        @functools.wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not settings.CACHE_VISTAS or request.method != 'GET' or len(messages.get_messages(request)):
+                return vista(request, *args, **kwargs)
+
+            clave = _clave_vista(request, modelos)
+            guardado = cache.get(clave)
+            if guardado is not None:
+                _registrar('hits')
+                contenido, tipo = guardado
+                return HttpResponse(contenido, content_type=tipo)
+
+            _registrar('misses')
+            response = vista(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    clave,
+                    (response.content, response['Content-Type']),
+                    timeout if timeout is not None else settings.CACHE_VISTAS_TIMEOUT,
+                )
+            return response
+        return envoltura
+    return decorador
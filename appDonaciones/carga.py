@@ -0,0 +1,245 @@
+"""Reproducción de carga: usuarios simulados concurrentes contra la app real.
+
+Cada usuario es un hilo con su propia sesión (cookies) que inicia sesión por
+'signin' y luego elige acciones del escenario según su peso. Los POST llevan
+el token CSRF de la cookie, como un navegador. Las peticiones van por HTTP a
+un servidor WSGI levantado en este mismo proceso o a un gunicorn local, y de
+cada una se guarda el tiempo para calcular percentiles por nombre de URL.
+
+Para correr sin red, aplicar_stubs() hace que reCAPTCHA acepte cualquier
+respuesta y cambia el backend de correo por el de memoria.
+"""
+import http.cookiejar
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass, field
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.urls import reverse
+
+TIMEOUT = 30
+
+
+@dataclass
+class Accion:
+    """Una entrada del escenario: qué URL pide, con qué peso y qué rol."""
+    nombre: str
+    peso: int = 1
+    metodo: str = 'GET'
+    rol: str = 'staff'
+    params: dict = field(default_factory=dict)
+
+
+# Mezcla por defecto: staff navegando listados, voluntarios registrando
+# donaciones y algunos inicios de sesión
+ESCENARIO = [
+    Accion('home', 10),
+    Accion('donaciones_list', 15),
+    Accion('donante_list', 10),
+    Accion('donante_detail', 8),
+    Accion('donante_buscar', 5, params={'q': 'Donante'}),
+    Accion('bajorecursos_list', 4),
+    Accion('zoo_list', 4),
+    Accion('reporte_donaciones_datos', 4),
+    Accion('inventario_saldos', 2),
+    Accion('api_donaciones', 4),
+    Accion('donaciones_create', 6, rol='voluntario'),
+    Accion('donaciones_create', 12, metodo='POST', rol='voluntario'),
+    Accion('signin', 3, metodo='POST', rol='voluntario'),
+]
+
+
+def leer_escenario(ruta):
+    """Escenario desde un JSON: lista de objetos con los campos de Accion."""
+    with open(ruta, encoding='utf-8') as f:
+        return [Accion(**entrada) for entrada in json.load(f)]
+
+
+def aplicar_stubs():
+    """reCAPTCHA siempre válido y correos a memoria: la carga corre sin salir a internet."""
+    from django_recaptcha import client
+
+    client.submit = lambda recaptcha_response, private_key, remoteip: client.RecaptchaResponse(is_valid=True)
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+# --- Servidor en proceso ---
+
+class _ServidorConHilos(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    # El listen() por defecto (5) rechaza conexiones con muchos usuarios
+    request_queue_size = 128
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servidor_en_proceso(application, puerto=0):
+    """Levanta la app WSGI en un hilo; devuelve (url_base, servidor). Detener con servidor.shutdown()."""
+    servidor = make_server(
+        '127.0.0.1', puerto, application, server_class=_ServidorConHilos, handler_class=_HandlerSilencioso,
+    )
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{servidor.server_port}', servidor
+
+
+# --- Usuarios simulados ---
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    # Cada petición se mide sola: la redirección no se sigue
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+@dataclass
+class Medicion:
+    nombre: str
+    segundos: float
+    status: int
+    ok: bool
+
+
+class UsuarioSimulado:
+    def __init__(self, base, credenciales, datos, azar):
+        self.base = base
+        self.credenciales = credenciales
+        self.datos = datos
+        self.azar = azar
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _SinRedirecciones,
+        )
+        self.mediciones = []
+
+    def _csrf(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def pedir(self, etiqueta, url, metodo='GET', datos=None, params=None):
+        if params:
+            url = f'{url}?{urllib.parse.urlencode(params)}'
+        cuerpo = None
+        if metodo == 'POST':
+            datos = {**(datos or {}), 'csrfmiddlewaretoken': self._csrf()}
+            cuerpo = urllib.parse.urlencode(datos).encode()
+        peticion = urllib.request.Request(self.base + url, data=cuerpo, method=metodo)
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(peticion, timeout=TIMEOUT) as respuesta:
+                respuesta.read()
+                status = respuesta.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        # Un formulario aceptado redirige; un 200 al POST es el formulario con errores
+        ok = 300 <= status < 400 if metodo == 'POST' else 200 <= status < 400
+        self.mediciones.append(Medicion(etiqueta, time.perf_counter() - inicio, status, ok))
+        return status
+
+    def iniciar_sesion(self):
+        url = reverse('signin')
+        self.pedir('GET signin', url)
+        usuario, clave = self.credenciales
+        return self.pedir('POST signin', url, 'POST', {'username': usuario, 'password': clave})
+
+    def ejecutar(self, accion):
+        etiqueta = f'{accion.metodo} {accion.nombre}'
+        if accion.nombre == 'signin':
+            self.cookies.clear()
+            self.iniciar_sesion()
+            return
+        if accion.nombre == 'donaciones_create' and accion.metodo == 'POST':
+            # Como el navegador: el formulario deja la cookie CSRF antes del envío
+            if not self._csrf():
+                self.pedir('GET donaciones_create', reverse('donaciones_create'))
+            self.pedir(etiqueta, reverse('donaciones_create'), 'POST', self._donacion())
+            return
+        self.pedir(etiqueta, self._url(accion.nombre), accion.metodo, params=accion.params)
+
+    def _url(self, nombre):
+        if nombre in ('donante_detail', 'donante_zonas_cercanas'):
+            return reverse(nombre, args=[self.azar.choice(self.datos['donantes'])])
+        return reverse(nombre)
+
+    def _donacion(self):
+        return {
+            'donante': self.azar.choice(self.datos['donantes']),
+            'cantidad': self.azar.randint(1, 200),
+            'fecha_llegada': self.datos['hoy'],
+            'tipo_alimento': self.azar.choice(self.datos['alimentos']),
+            'destino': self.azar.choice(self.datos['destinos']),
+            'g-recaptcha-response': 'carga',
+        }
+
+
+def reproducir(base, escenario, credenciales, datos, usuarios=10, duracion=30, semilla=1):
+    """Corre `usuarios` hilos durante `duracion` segundos; devuelve (mediciones, segundos reales).
+
+    credenciales: {rol: (usuario, clave)}. datos: ids y valores para armar las peticiones.
+    """
+    fin = time.monotonic() + duracion
+    simulados = []
+    for i in range(usuarios):
+        azar = random.Random(semilla * 1000 + i)
+        # Los roles se reparten según el peso de sus acciones
+        rol = azar.choices([a.rol for a in escenario], weights=[a.peso for a in escenario])[0]
+        acciones = [a for a in escenario if a.rol == rol]
+        simulados.append((UsuarioSimulado(base, credenciales[rol], datos, azar), acciones))
+
+    def correr(usuario, acciones):
+        usuario.iniciar_sesion()
+        pesos = [a.peso for a in acciones]
+        while time.monotonic() < fin:
+            usuario.ejecutar(usuario.azar.choices(acciones, weights=pesos)[0])
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=correr, args=par, daemon=True) for par in simulados]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return [m for usuario, _ in simulados for m in usuario.mediciones], time.perf_counter() - inicio
+
+
+# --- Reporte ---
+
+def percentil(valores, p):
+    """Percentil por rango más cercano de una lista ordenada."""
+    if not valores:
+        return 0.0
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def resumir(mediciones, segundos):
+    """Por nombre de URL: cantidad, errores, peticiones/s y p50/p95/p99 en ms."""
+    por_nombre = defaultdict(list)
+    for m in mediciones:
+        por_nombre[m.nombre].append(m)
+    filas = []
+    for nombre, lista in sorted(por_nombre.items()):
+        tiempos = sorted(m.segundos * 1000 for m in lista)
+        filas.append({
+            'nombre': nombre,
+            'peticiones': len(lista),
+            'errores': sum(not m.ok for m in lista),
+            'por_segundo': len(lista) / segundos if segundos else 0.0,
+            'p50': percentil(tiempos, 50),
+            'p95': percentil(tiempos, 95),
+            'p99': percentil(tiempos, 99),
+        })
+    return filas
@@ -0,0 +1,45 @@
+"""Contadores del panel de inicio mantenidos de forma incremental.
+
+Las señales suman o restan con expresiones F() sobre una única fila, así que
+escritores concurrentes no se pisan. 'reconciliar_contadores' recalcula los
+totales con COUNT(*) por si alguna escritura masiva se saltó las señales.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BajoRecursos, ContadoresPanel, Donaciones, Donante, Zoo
+
+CAMPO_POR_MODELO = {
+    Donaciones: 'donaciones',
+    Donante: 'donantes',
+    BajoRecursos: 'zonas',
+    Zoo: 'zoos',
+}
+
+
+def incrementar(modelo, cantidad=1):
+    """Suma `cantidad` (puede ser negativa) al contador de `modelo`.
+
+    Lo usan las señales y las escrituras masivas (bulk_create), que no las disparan.
+    """
+    campo = CAMPO_POR_MODELO[modelo]
+    actualizadas = ContadoresPanel.objects.filter(pk=1).update(
+        actualizado=timezone.now(), **{campo: F(campo) + cantidad}
+    )
+    if not actualizadas:
+        # Sin fila todavía: se crea con los totales reales
+        reconciliar()
+
+
+def reconciliar():
+    totales = {campo: modelo.objects.count() for modelo, campo in CAMPO_POR_MODELO.items()}
+    ContadoresPanel.objects.update_or_create(pk=1, defaults=totales)
+    return totales
+
+
+def leer():
+    contadores = ContadoresPanel.objects.filter(pk=1).first()
+    if contadores is None:
+        reconciliar()
+        contadores = ContadoresPanel.objects.get(pk=1)
+    return contadores
@@ -0,0 +1,122 @@
+"""Bandeja de salida de correos (outbox).
+
+Las vistas solo insertan un CorreoPendiente en la misma transacción que el
+registro que lo origina; el comando 'enviar_correos' los despacha en lotes
+reutilizando una sola conexión SMTP y reintenta con backoff exponencial
+(también cuando no se pudo conectar).
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import metricas
+from .models import CorreoPendiente
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 5
+ESPERA_BASE = datetime.timedelta(minutes=1)
+# Cuánto queda reservado un correo tomado por un worker antes de que otro pueda retomarlo
+RESERVA = datetime.timedelta(minutes=10)
+
+
+def encolar_confirmacion_donacion(donacion, user):
+    """Encola el correo de confirmación de una donación. Devuelve None si el usuario no tiene email."""
+    if not user.email:
+        return None
+    contexto = {'donacion': donacion, 'user': user}
+    return CorreoPendiente.objects.create(
+        destinatario=user.email,
+        asunto=f'Confirmación de Donación #{donacion.id_donacion} - Sistema Donaciones',
+        cuerpo_texto=render_to_string('html/email_confirmacion.txt', contexto),
+        cuerpo_html=render_to_string('html/email_confirmacion.html', contexto),
+    )
+
+
+def _espera(intentos):
+    return ESPERA_BASE * (2 ** (intentos - 1))
+
+
+def _tomar(lote):
+    """Reserva hasta `lote` correos vencidos y les cuenta el intento, en una transacción corta.
+
+    Se toman con SELECT ... FOR UPDATE SKIP LOCKED cuando el motor lo soporta
+    y se corre su proximo_intento RESERVA hacia adelante, así otros workers no
+    los envían mientras este trabaja y, si muere a mitad, se retoman después.
+    """
+    with transaction.atomic():
+        correos = list(
+            CorreoPendiente.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente', proximo_intento__lte=timezone.now())
+            .order_by('proximo_intento', 'id')[:lote]
+        )
+        reserva = timezone.now() + RESERVA
+        for correo in correos:
+            correo.intentos += 1
+            correo.proximo_intento = reserva
+        CorreoPendiente.objects.bulk_update(correos, ['intentos', 'proximo_intento'])
+    return correos
+
+
+def _registrar_fallo(correo, error):
+    metricas.correos_fallidos.inc()
+    correo.ultimo_error = str(error)
+    if correo.intentos >= MAX_INTENTOS:
+        correo.estado = 'fallido'
+    else:
+        correo.proximo_intento = timezone.now() + _espera(correo.intentos)
+    correo.save(update_fields=['estado', 'proximo_intento', 'ultimo_error'])
+    logger.warning('Error enviando correo %s: %s', correo.pk, error)
+
+
+def enviar_pendientes(lote=50, connection=None):
+    """Envía hasta `lote` correos vencidos con una sola conexión.
+
+    Devuelve (enviados, fallidos). Los correos se reservan primero (ver
+    _tomar) y se envían fuera de la transacción: no quedan filas bloqueadas
+    mientras se habla con el servidor SMTP. Si la conexión no se puede abrir,
+    el intento cuenta como fallido para todo el lote.
+    """
+    correos = _tomar(lote)
+    if not correos:
+        return 0, 0
+
+    enviados = fallidos = 0
+    conexion = connection or get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        for correo in correos:
+            _registrar_fallo(correo, e)
+        return 0, len(correos)
+    try:
+        for correo in correos:
+            mensaje = EmailMultiAlternatives(
+                correo.asunto,
+                correo.cuerpo_texto,
+                settings.DEFAULT_FROM_EMAIL,
+                [correo.destinatario],
+                connection=conexion,
+            )
+            if correo.cuerpo_html:
+                mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+            try:
+                mensaje.send()
+            except Exception as e:
+                fallidos += 1
+                _registrar_fallo(correo, e)
+            else:
+                enviados += 1
+                metricas.correos_enviados.inc()
+                correo.estado = 'enviado'
+                correo.enviado = timezone.now()
+                correo.ultimo_error = ''
+                correo.save(update_fields=['estado', 'ultimo_error', 'enviado'])
+    finally:
+        conexion.close()
+    return enviados, fallidos
@@ -1,5 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from .models import Donaciones, Donante, BajoRecursos, Zoo
 import datetime
 
@@ -7,6 +8,69 @@ import datetime
 from django_recaptcha.fields import ReCaptchaField
 from django_recaptcha.widgets import ReCaptchaV2Checkbox
 
+class AutocompletarSelect(forms.Select):
+    """<select> que solo renderiza la opción elegida; el resto llega por JSON.
+
+    Se usa con ModelChoiceField: al validar se hace una sola búsqueda por PK
+    y nunca se recorre la tabla completa para armar las opciones.
+    """
+
+    def __init__(self, url, placeholder='Escriba para buscar...', attrs=None):
+        attrs = {'class': 'form-control', **(attrs or {})}
+        super().__init__(attrs)
+        self.url = url
+        self.placeholder = placeholder
+
+    class Media:
+        js = ('appDonaciones/js/autocompletar.js',)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = str(self.url)
+        context['widget']['attrs']['data-placeholder'] = self.placeholder
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        opciones = [self.create_option(name, '', self.placeholder, False, 0)]
+        # Un formulario enviado con un id inválido se vuelve a mostrar con su
+        # error: esos valores no se buscan (filtrar por ellos lanzaría ValueError)
+        pk = self.choices.queryset.model._meta.pk
+        seleccionados = []
+        for v in value:
+            if v in (None, ''):
+                continue
+            try:
+                seleccionados.append(pk.to_python(v))
+            except (ValidationError, ValueError, TypeError):
+                pass
+        if seleccionados:
+            campo = self.choices.field
+            for indice, obj in enumerate(self.choices.queryset.filter(pk__in=seleccionados), start=1):
+                opciones.append(self.create_option(
+                    name, str(obj.pk), campo.label_from_instance(obj), True, indice
+                ))
+        return [(None, opciones, 0)]
+
+
+class DonanteChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, donante):
+        # Si el nombre está vacío, usar la ciudad como alternativa
+        return donante.nombre or f"{donante.ciudad} (Sin Nombre)"
+
+
+class DonacionChoiceField(forms.ModelChoiceField):
+    def label_from_instance(self, donacion):
+        return f"Donación #{donacion.id_donacion} - {donacion.nombre_donante}"
+
+
+def _campo_donacion():
+    return DonacionChoiceField(
+        queryset=Donaciones.objects.select_related('donante'),
+        widget=AutocompletarSelect(reverse_lazy('autocompletar_donaciones'), 'Seleccione una donación'),
+        error_messages={'required': "Debe seleccionar una donación", 'invalid_choice': "Donación no válida"},
+    )
+
+
 class DonanteForm(forms.ModelForm):
     # (Este formulario se mantiene igual)
     TIPOS_DONANTE = [
@@ -120,31 +184,27 @@ class BajoRecursosForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         ciudades_qs = Donante.objects.order_by('ciudad').values_list('ciudad', flat=True).distinct()
         ciudad_choices = [('', 'Seleccione una ciudad')] + [(ciudad, ciudad) for ciudad in ciudades_qs]
-        donaciones = Donaciones.objects.all()
-        donacion_choices = [('', 'Seleccione una donación')] + [
-            (donacion.id_donacion, f"Donación #{donacion.id_donacion} - {donacion.donante}") 
-            for donacion in donaciones
-        ]
         self.fields['ciudad'] = forms.ChoiceField(
             choices=ciudad_choices, widget=forms.Select(attrs={'class': 'form-control'}), required=True
         )
-        self.fields['donacion'] = forms.ChoiceField(
-            choices=donacion_choices, widget=forms.Select(attrs={'class': 'form-control'}), required=True
-        )
+        self.fields['donacion'] = _campo_donacion()
     class Meta:
         model = BajoRecursos
-        fields = ['ciudad', 'donacion']
+        fields = ['ciudad', 'donacion', 'demanda_kg', 'latitud', 'longitud']
+        widgets = {
+            'demanda_kg': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Kg que puede recibir', 'min': '0'}),
+            'latitud': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ej: -33.448900', 'step': 'any'}),
+            'longitud': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ej: -70.669300', 'step': 'any'}),
+        }
     def clean_ciudad(self):
         ciudad = self.cleaned_data.get('ciudad')
         if not ciudad: raise ValidationError("Debe seleccionar una ciudad")
         return ciudad
     def clean_donacion(self):
-        donacion_id = self.cleaned_data.get('donacion')
-        if not donacion_id: raise ValidationError("Debe seleccionar una donación")
-        try:
-            return int(donacion_id)
-        except ValueError:
-            raise ValidationError("Donación no válida")
+        # El modelo guarda el id de la donación como texto
+        donacion = self.cleaned_data.get('donacion')
+        if not donacion: raise ValidationError("Debe seleccionar una donación")
+        return donacion.id_donacion
 
 class ZooForm(forms.ModelForm):
     # (Este formulario se mantiene igual)
@@ -157,18 +217,14 @@ class ZooForm(forms.ModelForm):
     )
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        donaciones = Donaciones.objects.all()
-        donacion_choices = [('', 'Seleccione una donación')] + [
-            (donacion.id_donacion, f"Donación #{donacion.id_donacion} - {donacion.donante}") 
-            for donacion in donaciones
-        ]
-        self.fields['donacion'] = forms.ChoiceField(
-            choices=donacion_choices, widget=forms.Select(attrs={'class': 'form-control'}), required=True
-        )
+        self.fields['donacion'] = _campo_donacion()
     class Meta:
         model = Zoo
-        fields = ['animales', 'trabajadores', 'tipo_animal', 'donacion']
+        fields = ['animales', 'trabajadores', 'tipo_animal', 'donacion', 'demanda_kg', 'latitud', 'longitud']
         widgets = {
+            'demanda_kg': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Kg que puede recibir', 'min': '0'}),
+            'latitud': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ej: -33.448900', 'step': 'any'}),
+            'longitud': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Ej: -70.669300', 'step': 'any'}),
             'animales': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Especies de animales'}),
             'trabajadores': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nombres de trabajadores'}),
         }
@@ -185,12 +241,10 @@ class ZooForm(forms.ModelForm):
         if not tipo_animal: raise ValidationError("Debe seleccionar un tipo de animal")
         return int(tipo_animal)
     def clean_donacion(self):
-        donacion_id = self.cleaned_data.get('donacion')
-        if not donacion_id: raise ValidationError("Debe seleccionar una donación")
-        try:
-            return int(donacion_id)
-        except ValueError:
-            raise ValidationError("Donación no válida")
+        # El modelo guarda el id de la donación como texto
+        donacion = self.cleaned_data.get('donacion')
+        if not donacion: raise ValidationError("Debe seleccionar una donación")
+        return donacion.id_donacion
 
 # ===================================================================
 # FORMULARIO 'DonacionesForm' CON RECAPTCHA
@@ -212,10 +266,10 @@ class DonacionesForm(forms.ModelForm):
         ('Zoológico', 'Zoológico'),
     ]
     
-    donante = forms.ChoiceField(
-        choices=[], 
-        widget=forms.Select(attrs={'class': 'form-control'}), 
-        required=True
+    donante = DonanteChoiceField(
+        queryset=Donante.objects.all(),
+        widget=AutocompletarSelect(reverse_lazy('autocompletar_donantes'), 'Seleccione un donante...'),
+        error_messages={'required': "Debe seleccionar un donante", 'invalid_choice': "Donante no válido"},
     )
     
     tipo_alimento = forms.ChoiceField(
@@ -234,32 +288,6 @@ class DonacionesForm(forms.ModelForm):
     captcha = ReCaptchaField(widget=ReCaptchaV2Checkbox)
     # -----------------------------
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._cargar_opciones_donantes()
-    
-    def _cargar_opciones_donantes(self):
-        try:
-            # 1. Ordenar por nombre para que sea fácil de encontrar
-            donantes = Donante.objects.all().order_by('nombre')
-            
-            # 2. Cambiar la etiqueta por defecto
-            choices = [('', 'Seleccione un donante...')]
-            
-            for donante in donantes:
-                # 3. Usar el nombre para la etiqueta (display)
-                display_name = donante.nombre
-                # Si el nombre está vacío, usar la ciudad como alternativa
-                if not display_name:
-                    display_name = f"{donante.ciudad} (Sin Nombre)"
-                
-                # El valor es el ID, pero la etiqueta es el NOMBRE
-                choices.append((donante.id_donante, display_name))
-            
-            self.fields['donante'].choices = choices
-        except Exception as e:
-            self.fields['donante'].choices = [('', 'Error cargando donantes')]
-    
     class Meta:
         model = Donaciones
         fields = ['donante', 'cantidad', 'fecha_llegada', 'tipo_alimento', 'destino']
@@ -269,16 +297,11 @@ class DonacionesForm(forms.ModelForm):
         }
 
     def clean_donante(self):
-        # Esta función recibe el ID del donante (ej. 1)
-        donante_id = self.cleaned_data.get('donante')
-        if not donante_id:
+        # DonanteChoiceField ya resolvió el ID con una sola búsqueda por PK
+        donante = self.cleaned_data.get('donante')
+        if not donante:
             raise ValidationError("Debe seleccionar un donante")
-        try:
-            donante = Donante.objects.get(id_donante=int(donante_id))
-            # 2. Devuelve la CIUDAD (ya que tu modelo Donaciones espera un CharField)
-            return donante.ciudad
-        except (Donante.DoesNotExist, ValueError):
-            raise ValidationError("Donante no válido")
+        return donante
 
     def clean_tipo_alimento(self):
         tipo_alimento = self.cleaned_data.get('tipo_alimento')
@@ -302,4 +325,16 @@ class DonacionesForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class ImportacionForm(forms.Form):
+    TIPO_CHOICES = [('donantes', 'Donantes'), ('donaciones', 'Donaciones')]
+    tipo = forms.ChoiceField(
+        choices=TIPO_CHOICES, widget=forms.Select(attrs={'class': 'form-control'}), label='Tipo de registro'
+    )
+    archivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+        label='Archivo (.csv o .xlsx)'
+    )
+    simular = forms.BooleanField(required=False, label='Solo validar (no guardar)')
@@ -0,0 +1,158 @@
+"""Índice espacial por geohash para consultas de cercanía.
+
+Donante y BajoRecursos guardan el geohash de sus coordenadas en una columna
+indexada. Los prefijos del geohash son celdas anidadas: para buscar alrededor
+de un punto se eligen las celdas que cubren el radio (o, para los k más
+cercanos, la celda del punto y sus 8 vecinas), se leen solo esas filas (rangos
+sobre el índice) y recién ahí se calcula la distancia exacta con haversine.
+"""
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+# Máximo de rangos de geohash en una consulta por radio
+MAX_CELDAS_CONSULTA = 12
+
+
+def codificar(lat, lon, precision=PRECISION):
+    """Geohash de (lat, lon); '' si falta alguna coordenada."""
+    if lat is None or lon is None:
+        return ''
+    lat, lon = float(lat), float(lon)
+    rango_lat, rango_lon = [-90.0, 90.0], [-180.0, 180.0]
+    resultado = []
+    bit, valor, par = 0, 0, True
+    while len(resultado) < precision:
+        rango, v = (rango_lon, lon) if par else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if v >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        par = not par
+        bit += 1
+        if bit == 5:
+            resultado.append(BASE32[valor])
+            bit, valor = 0, 0
+    return ''.join(resultado)
+
+
+def tamano_celda(precision):
+    """Alto y ancho en grados de una celda con esa precisión."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distancia en km entre dos puntos."""
+    lat1, lon1, lat2, lon2 = (math.radians(float(v)) for v in (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def _alcance_km(lat, precision):
+    """Radio que cubren con seguridad la celda del punto y sus 8 vecinas."""
+    alto, ancho = tamano_celda(precision)
+    lat_extrema = min(abs(float(lat)) + 2 * alto, 90.0)
+    return min(alto * KM_POR_GRADO, ancho * KM_POR_GRADO * math.cos(math.radians(lat_extrema)))
+
+
+def celdas_vecinas(lat, lon, precision):
+    """La celda del punto y sus 8 vecinas, como prefijos de geohash."""
+    alto, ancho = tamano_celda(precision)
+    celdas = set()
+    for d_lat in (-alto, 0, alto):
+        v_lat = float(lat) + d_lat
+        if not -90 <= v_lat <= 90:
+            continue
+        for d_lon in (-ancho, 0, ancho):
+            v_lon = (float(lon) + d_lon + 180) % 360 - 180
+            celdas.add(codificar(v_lat, v_lon, precision))
+    return sorted(celdas)
+
+
+def _filtrar_celdas(queryset, celdas):
+    # Rango [prefijo, prefijo + '{') en vez de LIKE para aprovechar el índice
+    # ('{' es el carácter siguiente a 'z' en ASCII)
+    condicion = Q()
+    for celda in celdas:
+        condicion |= Q(geohash__gte=celda, geohash__lt=celda + '{')
+    return queryset.filter(condicion)
+
+
+def _candidatos(queryset, lat, lon, precision):
+    if precision == 0:
+        return queryset.exclude(geohash='')
+    return _filtrar_celdas(queryset, celdas_vecinas(lat, lon, precision))
+
+
+def _con_distancia(filas, lat, lon):
+    resultado = [
+        (obj, haversine(lat, lon, obj.latitud, obj.longitud))
+        for obj in filas
+    ]
+    resultado.sort(key=lambda par: par[1])
+    return resultado
+
+
+def celdas_en_caja(sur, oeste, norte, este, precision):
+    """Prefijos de las celdas de esa precisión que tocan la caja."""
+    alto, ancho = tamano_celda(precision)
+    filas = range(math.floor((max(sur, -90) + 90) / alto), math.floor((min(norte, 90) + 90) / alto) + 1)
+    columnas = range(math.floor((oeste + 180) / ancho), math.floor((este + 180) / ancho) + 1)
+    celdas = set()
+    for fila in filas:
+        lat = min(-90 + (fila + 0.5) * alto, 90)
+        for columna in columnas:
+            lon = (-180 + (columna + 0.5) * ancho + 180) % 360 - 180
+            celdas.add(codificar(lat, lon, precision))
+    return sorted(celdas)
+
+
+def celdas_para_radio(lat, lon, radio_km):
+    """Las celdas más finas que cubren el círculo sin pasar de MAX_CELDAS_CONSULTA.
+
+    Devuelve None si ni las celdas más grandes sirven (se recorre todo).
+    """
+    lat, lon = float(lat), float(lon)
+    d_lat = radio_km / KM_POR_GRADO
+    cos_lat = math.cos(math.radians(min(abs(lat) + d_lat, 89.9)))
+    d_lon = min(radio_km / (KM_POR_GRADO * cos_lat), 180)
+    for precision in range(PRECISION, 0, -1):
+        alto, ancho = tamano_celda(precision)
+        # Cota de cuántas celdas toca la caja antes de calcularlas
+        if (2 * d_lat / alto + 2) * (2 * d_lon / ancho + 2) > MAX_CELDAS_CONSULTA * 2:
+            continue
+        celdas = celdas_en_caja(lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon, precision)
+        if len(celdas) <= MAX_CELDAS_CONSULTA:
+            return celdas
+    return None
+
+
+def en_radio(queryset, lat, lon, radio_km):
+    """Objetos del queryset a menos de radio_km del punto, con su distancia, del más cercano al más lejano."""
+    celdas = celdas_para_radio(lat, lon, radio_km)
+    candidatos = queryset.exclude(geohash='') if celdas is None else _filtrar_celdas(queryset, celdas)
+    return [par for par in _con_distancia(candidatos, lat, lon) if par[1] <= radio_km]
+
+
+def mas_cercanos(queryset, lat, lon, k=1):
+    """Los k objetos más cercanos al punto, con su distancia.
+
+    Empieza con celdas pequeñas y las agranda hasta que el k-ésimo candidato
+    queda dentro del radio cubierto, lo que garantiza que no hay otro más cerca.
+    """
+    for precision in range(6, -1, -1):
+        resultado = _con_distancia(_candidatos(queryset, lat, lon, precision), lat, lon)
+        if precision == 0:
+            return resultado[:k]
+        if len(resultado) >= k and resultado[k - 1][1] <= _alcance_km(lat, precision):
+            return resultado[:k]
+    return []
@@ -0,0 +1,153 @@
+"""Geocodificación por lotes de donantes sin coordenadas.
+
+Los geocodificadores se configuran en settings.GEOCODIFICADORES (rutas a
+clases) y se prueban en orden. El que viene incluido resuelve sin red con un
+nomenclátor de las ciudades de choice.CIUDADES_CHILE. Cada dirección se
+normaliza y su resultado, encontrado o no, queda en DireccionGeocodificada:
+ninguna dirección se consulta dos veces, ni siquiera entre ejecuciones.
+"""
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import cache
+from .models import DireccionGeocodificada, Donante
+
+TAMANO_LOTE = 500
+HILOS = 4
+
+# Centro de cada ciudad de choice.CIUDADES_CHILE (lat, lon)
+NOMENCLATOR_CHILE = {
+    'santiago': (-33.448890, -70.669265),
+    'valparaiso': (-33.047238, -71.612688),
+    'concepcion': (-36.827008, -73.050300),
+    'la serena': (-29.902669, -71.251972),
+    'antofagasta': (-23.650928, -70.397500),
+    'temuco': (-38.735901, -72.590378),
+    'iquique': (-20.230731, -70.135659),
+    'puerto montt': (-41.469298, -72.942378),
+    'punta arenas': (-53.163833, -70.917068),
+}
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni puntuación y con espacios simples."""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return ' '.join(texto.split())
+
+
+def clave_direccion(direccion, ciudad):
+    return f'{normalizar(direccion)}|{normalizar(ciudad)}'[:255]
+
+
+class Geocodificador:
+    """Interfaz: recibe dirección y ciudad ya normalizadas.
+
+    Devuelve (latitud, longitud) o None si no la encuentra. Debe poder
+    llamarse desde varios hilos a la vez.
+    """
+    nombre = ''
+
+    def geocodificar(self, direccion, ciudad):
+        raise NotImplementedError
+
+
+class GeocodificadorNomenclator(Geocodificador):
+    """Sin red: ubica la dirección en el centro de su ciudad."""
+    nombre = 'nomenclator'
+
+    def geocodificar(self, direccion, ciudad):
+        return NOMENCLATOR_CHILE.get(ciudad)
+
+
+def cargar_geocodificadores():
+    rutas = getattr(settings, 'GEOCODIFICADORES', ['appDonaciones.geocodificacion.GeocodificadorNomenclator'])
+    return [import_string(ruta)() for ruta in rutas]
+
+
+def resolver(clave, geocodificadores):
+    """(clave, lat, lon, fuente) con el primer geocodificador que encuentre la dirección."""
+    direccion, _, ciudad = clave.partition('|')
+    for geocodificador in geocodificadores:
+        coordenadas = geocodificador.geocodificar(direccion, ciudad)
+        if coordenadas:
+            lat, lon = coordenadas
+            return clave, lat, lon, geocodificador.nombre
+    return clave, None, None, ''
+
+
+def _decimal(valor):
+    return None if valor is None else Decimal(valor).quantize(Decimal('0.000001'))
+
+
+class Resultado:
+    def __init__(self):
+        self.procesados = 0
+        self.ubicados = 0
+        self.consultas = 0
+        self.ultimo_id = None
+
+
+def geocodificar_donantes(desde_id=0, tamano_lote=TAMANO_LOTE, hilos=HILOS,
+                          geocodificadores=None, al_terminar_lote=None):
+    """Rellena latitud/longitud de los donantes que no tienen, por lotes de id.
+
+    Cada lote se guarda en su propia transacción, así que si el proceso se
+    corta basta con volver a ejecutarlo: los donantes ya ubicados no vuelven
+    a aparecer y las direcciones ya consultadas salen de la caché.
+    """
+    geocodificadores = geocodificadores or cargar_geocodificadores()
+    resultado = Resultado()
+    pendientes = Donante.objects.filter(latitud__isnull=True).order_by('id_donante')
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        while True:
+            lote = list(
+                pendientes.filter(id_donante__gt=desde_id)
+                .only('id_donante', 'direccion', 'ciudad')[:tamano_lote]
+            )
+            if not lote:
+                break
+            claves = {d.pk: clave_direccion(d.direccion, d.ciudad) for d in lote}
+            conocidas = {
+                c.clave: c for c in DireccionGeocodificada.objects.filter(clave__in=set(claves.values()))
+            }
+            nuevas = [
+                DireccionGeocodificada(
+                    clave=clave, latitud=_decimal(lat), longitud=_decimal(lon), fuente=fuente,
+                )
+                for clave, lat, lon, fuente in pool.map(
+                    lambda clave: resolver(clave, geocodificadores),
+                    sorted(set(claves.values()) - conocidas.keys()),
+                )
+            ]
+            conocidas.update((c.clave, c) for c in nuevas)
+
+            ubicados = []
+            for donante in lote:
+                encontrada = conocidas[claves[donante.pk]]
+                if encontrada.latitud is not None:
+                    donante.latitud, donante.longitud = encontrada.latitud, encontrada.longitud
+                    donante.actualizar_geohash()
+                    ubicados.append(donante)
+            with transaction.atomic():
+                DireccionGeocodificada.objects.bulk_create(nuevas, ignore_conflicts=True)
+                Donante.objects.bulk_update(ubicados, ['latitud', 'longitud', 'geohash'])
+
+            desde_id = lote[-1].pk
+            resultado.procesados += len(lote)
+            resultado.ubicados += len(ubicados)
+            resultado.consultas += len(nuevas)
+            resultado.ultimo_id = desde_id
+            if al_terminar_lote:
+                al_terminar_lote(resultado)
+    if resultado.ubicados:
+        # bulk_update no dispara señales
+        cache.invalidar(Donante)
+    return resultado
@@ -0,0 +1,11 @@
+"""Configuración de gunicorn para 'reproducir_carga --modo gunicorn'.
+
+Se usa con -c python:appDonaciones.gunicorn_carga: aplica en cada worker los
+mismos stubs de reCAPTCHA y correo que el modo en proceso.
+"""
+
+
+def post_worker_init(worker):
+    from appDonaciones.carga import aplicar_stubs
+
+    aplicar_stubs()
@@ -0,0 +1,280 @@
+"""Importación masiva de donantes y donaciones desde CSV o XLSX.
+
+Los archivos se leen fila por fila (sin cargarlos completos en memoria), cada
+fila se valida con las reglas de DonanteForm/DonacionesForm y las válidas se
+insertan con bulk_create en lotes, cada lote en su propia transacción. Las
+consultas que los formularios harían por fila (email único, donante
+existente) se resuelven una vez por lote.
+"""
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .forms import DonacionesForm, DonanteForm
+from .models import Donaciones, Donante
+from .signals import guardar_en_lote
+
+TAMANO_LOTE = 1000
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+# --- Lectura de archivos ---
+
+def _leer_csv(archivo):
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+        return
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(texto)
+    finally:
+        texto.detach()
+
+
+def _leer_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErrorImportacion('Para importar archivos .xlsx instala el paquete openpyxl.')
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezados = [str(c).strip() if c is not None else '' for c in next(filas, [])]
+        for fila in filas:
+            yield dict(zip(encabezados, fila))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """Itera las filas de `archivo` como diccionarios según la extensión de `nombre`."""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension == '.csv':
+        return _leer_csv(archivo)
+    if extension == '.xlsx':
+        return _leer_xlsx(archivo)
+    raise ErrorImportacion('Formato no soportado: use .csv o .xlsx')
+
+
+def _normalizar(fila):
+    # Celdas vacías de XLSX llegan como None y los números como int/float
+    datos = {}
+    for clave, valor in fila.items():
+        if clave is None:
+            continue
+        if valor is None:
+            valor = ''
+        elif isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        datos[clave.strip()] = valor if hasattr(valor, 'isoformat') else str(valor).strip()
+    return datos
+
+
+# --- Formularios de importación (mismas reglas, sin consultas por fila) ---
+
+class DonanteImportForm(DonanteForm):
+    def __init__(self, *args, emails_ocupados, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.emails_ocupados = emails_ocupados
+
+    def clean_email(self):
+        email = self.cleaned_data.get('email')
+        if email and email in self.emails_ocupados:
+            raise ValidationError("Este correo electrónico ya está registrado para otro donante.")
+        return email
+
+
+class DonanteEnLoteField(forms.Field):
+    """Resuelve el id del donante con el diccionario precargado del lote.
+
+    Field.__deepcopy__ hace una copia superficial, así que el diccionario se
+    comparte entre los formularios del lote en lugar de copiarse por fila.
+    """
+
+    def __init__(self, donantes=None, **kwargs):
+        super().__init__(**kwargs)
+        self.donantes = donantes or {}
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.donantes[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError("Donante no válido")
+
+
+class DonacionesImportForm(DonacionesForm):
+    # Sin captcha: la importación la hace personal autenticado o un comando
+    captcha = None
+    donante = DonanteEnLoteField(error_messages={'required': "Debe seleccionar un donante"})
+
+    def __init__(self, *args, donantes, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['donante'].donantes = donantes
+
+    def _get_validation_exclusions(self):
+        # La existencia del donante ya se comprobó contra el lote precargado;
+        # así el modelo no repite un SELECT por fila al validar la FK.
+        exclusiones = super()._get_validation_exclusions()
+        exclusiones.add('donante')
+        return exclusiones
+
+
+# --- Importadores ---
+
+@dataclass
+class Reporte:
+    total: int = 0
+    creados: int = 0
+    errores: list = field(default_factory=list)  # (número de fila, campo, mensaje)
+
+    @property
+    def filas_con_error(self):
+        return len({fila for fila, _, _ in self.errores})
+
+    def escribir_csv(self, destino):
+        escritor = csv.writer(destino)
+        escritor.writerow(['fila', 'campo', 'error'])
+        escritor.writerows(self.errores)
+
+
+class Importador:
+    modelo = None
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, simular=False):
+        self.tamano_lote = tamano_lote
+        self.simular = simular
+        self.reporte = Reporte()
+
+    def preparar_lote(self, filas):
+        """Precarga lo que las validaciones necesitan consultar para todo el lote."""
+
+    def crear_formulario(self, datos):
+        raise NotImplementedError
+
+    def importar(self, filas):
+        lote = []
+        # La fila 1 es el encabezado
+        for numero, fila in enumerate(filas, start=2):
+            datos = _normalizar(fila)
+            if not any(v != '' for v in datos.values()):
+                continue  # filas en blanco
+            lote.append((numero, datos))
+            if len(lote) >= self.tamano_lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+        return self.reporte
+
+    def _procesar_lote(self, lote):
+        self.preparar_lote([datos for _, datos in lote])
+        objetos = []
+        for numero, datos in lote:
+            self.reporte.total += 1
+            form = self.crear_formulario(datos)
+            if form.is_valid():
+                objetos.append(form.save(commit=False))
+                self.registrar_valido(form)
+            else:
+                for campo, mensajes in form.errors.items():
+                    for mensaje in mensajes:
+                        self.reporte.errores.append((numero, campo, mensaje))
+        if objetos and not self.simular:
+            with transaction.atomic():
+                objetos = guardar_en_lote(self.modelo, objetos, batch_size=self.tamano_lote)
+        self.reporte.creados += len(objetos)
+
+    def registrar_valido(self, form):
+        pass
+
+
+class ImportadorDonantes(Importador):
+    modelo = Donante
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Emails ya usados en filas anteriores del mismo archivo
+        self.emails_archivo = set()
+        self.emails_ocupados = set()
+
+    def preparar_lote(self, filas):
+        emails = {f.get('email') for f in filas if f.get('email')}
+        existentes = set(Donante.objects.filter(email__in=emails).values_list('email', flat=True))
+        self.emails_ocupados = existentes | self.emails_archivo
+
+    def crear_formulario(self, datos):
+        return DonanteImportForm(data=datos, emails_ocupados=self.emails_ocupados)
+
+    def registrar_valido(self, form):
+        email = form.cleaned_data.get('email')
+        if email:
+            self.emails_archivo.add(email)
+            self.emails_ocupados.add(email)
+
+
+class ImportadorDonaciones(Importador):
+    modelo = Donaciones
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.donantes = {}
+
+    def preparar_lote(self, filas):
+        ids = set()
+        for f in filas:
+            try:
+                ids.add(int(f.get('donante')))
+            except (TypeError, ValueError):
+                pass
+        self.donantes = Donante.objects.in_bulk(ids)
+
+    def crear_formulario(self, datos):
+        return DonacionesImportForm(data=datos, donantes=self.donantes)
+
+
+def crear_donaciones(items):
+    """Valida y guarda una lista de donaciones (diccionarios) en una sola transacción.
+
+    Los donantes de todos los items se resuelven con una consulta IN y las
+    válidas se insertan con un solo bulk_create (ver guardar_en_lote); las inválidas no impiden
+    guardar el resto. Devuelve un resultado por item, en el mismo orden:
+    {'ok': True, 'id_donacion': ...} o {'ok': False, 'errores': {campo: [mensajes]}}.
+    """
+    importador = ImportadorDonaciones()
+    importador.preparar_lote([i for i in items if isinstance(i, dict)])
+    resultados, objetos = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            resultados.append({'ok': False, 'errores': {'__all__': ['Cada donación debe ser un objeto.']}})
+            continue
+        form = importador.crear_formulario(item)
+        if form.is_valid():
+            objetos.append(form.save(commit=False))
+            resultados.append({'ok': True})
+        else:
+            resultados.append({'ok': False, 'errores': {c: list(m) for c, m in form.errors.items()}})
+    if objetos:
+        with transaction.atomic():
+            objetos = guardar_en_lote(Donaciones, objetos)
+    pendientes = iter(objetos)
+    for resultado in resultados:
+        if resultado['ok']:
+            resultado['id_donacion'] = next(pendientes).pk
+    return resultados
+
+
+IMPORTADORES = {
+    'donantes': ImportadorDonantes,
+    'donaciones': ImportadorDonaciones,
+}
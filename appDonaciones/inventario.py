@@ -0,0 +1,246 @@
+"""Inventario por (ciudad, tipo_alimento) sobre un libro de movimientos.
+
+Las donaciones registran entradas y las asignaciones, salidas. El saldo de
+una cuenta es su último corte más la suma de los movimientos posteriores
+(con el índice (ciudad, tipo_alimento, id) esa cola es un rango corto), y
+cada CORTE_CADA movimientos se guarda un corte nuevo.
+
+Toda escritura bloquea la fila de CuentaInventario: las salidas verifican el
+saldo con la cuenta bloqueada, así dos salidas simultáneas no pueden
+entregar los mismos kg.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CorteInventario, CuentaInventario, MovimientoInventario
+
+# Movimientos de una cuenta entre un corte y el siguiente
+CORTE_CADA = 500
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, ciudad, tipo_alimento, saldo, pedido):
+        self.ciudad, self.tipo_alimento, self.saldo, self.pedido = ciudad, tipo_alimento, saldo, pedido
+        super().__init__(
+            f'Hay {saldo} kg de {tipo_alimento} en {ciudad or "sin ciudad"}; se pidieron {pedido}.'
+        )
+
+
+def _cuentas_bloqueadas(claves):
+    """Bloquea (y crea si hace falta) las cuentas, siempre en el mismo orden para no caer en deadlocks."""
+    claves = sorted(set(claves))
+    for ciudad, tipo_alimento in claves:
+        try:
+            with transaction.atomic():
+                CuentaInventario.objects.get_or_create(ciudad=ciudad, tipo_alimento=tipo_alimento)
+        except IntegrityError:
+            # Otra transacción la creó al mismo tiempo
+            pass
+    cuentas = {}
+    for ciudad, tipo_alimento in claves:
+        cuenta = CuentaInventario.objects.select_for_update().get(ciudad=ciudad, tipo_alimento=tipo_alimento)
+        cuentas[(ciudad, tipo_alimento)] = cuenta
+    return cuentas
+
+
+def _cola(cuenta):
+    return MovimientoInventario.objects.filter(
+        ciudad=cuenta.ciudad, tipo_alimento=cuenta.tipo_alimento, id__gt=cuenta.hasta_movimiento,
+    )
+
+
+def _saldo_cuenta(cuenta):
+    return cuenta.saldo_corte + (_cola(cuenta).aggregate(total=Sum('kg'))['total'] or 0)
+
+
+def _cortar(cuenta):
+    """Guarda el saldo actual como corte. La cuenta debe estar bloqueada."""
+    cola = _cola(cuenta).aggregate(total=Sum('kg'), ultimo=Max('id'))
+    if cola['ultimo'] is None:
+        return
+    cuenta.saldo_corte += cola['total']
+    cuenta.hasta_movimiento = cola['ultimo']
+    cuenta.movimientos_desde_corte = 0
+    cuenta.save(update_fields=['saldo_corte', 'hasta_movimiento', 'movimientos_desde_corte'])
+    CorteInventario.objects.create(cuenta=cuenta, saldo=cuenta.saldo_corte, hasta_movimiento=cuenta.hasta_movimiento)
+
+
+def registrar(movimientos):
+    """Agrega movimientos al libro (instancias de MovimientoInventario sin guardar).
+
+    Las salidas (kg < 0 de tipo 'salida') se rechazan con StockInsuficiente si
+    dejarían la cuenta en negativo; en ese caso no se guarda ninguno.
+    """
+    movimientos = [m for m in movimientos if m.kg]
+    if not movimientos:
+        return []
+    with transaction.atomic():
+        cuentas = _cuentas_bloqueadas((m.ciudad, m.tipo_alimento) for m in movimientos)
+        salidas = defaultdict(int)
+        for m in movimientos:
+            if m.tipo == 'salida':
+                salidas[(m.ciudad, m.tipo_alimento)] -= m.kg
+        for clave, pedido in salidas.items():
+            cuenta = cuentas[clave]
+            disponible = _saldo_cuenta(cuenta) + sum(
+                m.kg for m in movimientos if (m.ciudad, m.tipo_alimento) == clave and m.tipo != 'salida'
+            )
+            if pedido > disponible:
+                raise StockInsuficiente(*clave, disponible, pedido)
+
+        movimientos = MovimientoInventario.objects.bulk_create(movimientos)
+        por_cuenta = defaultdict(int)
+        for m in movimientos:
+            por_cuenta[(m.ciudad, m.tipo_alimento)] += 1
+        for clave, cantidad in por_cuenta.items():
+            cuenta = cuentas[clave]
+            cuenta.movimientos_desde_corte += cantidad
+            if cuenta.movimientos_desde_corte >= CORTE_CADA:
+                _cortar(cuenta)
+            else:
+                cuenta.save(update_fields=['movimientos_desde_corte'])
+    return movimientos
+
+
+def _clave_donacion(donacion):
+    ciudad = donacion.donante.ciudad if donacion.donante_id else ''
+    return ciudad or '', donacion.tipo_alimento
+
+
+def entradas_de(donaciones):
+    movimientos = []
+    for donacion in donaciones:
+        ciudad, tipo_alimento = _clave_donacion(donacion)
+        movimientos.append(MovimientoInventario(
+            ciudad=ciudad, tipo_alimento=tipo_alimento, kg=donacion.cantidad,
+            tipo='entrada', donacion=donacion,
+        ))
+    return movimientos
+
+
+def _bloquear_cuentas_de(donacion_id, otras=()):
+    """Bloquea las cuentas donde la donación tiene movimientos (más `otras`).
+
+    Sus salidas van a la cuenta de su entrada, que está entre ellas: con las
+    cuentas bloqueadas ninguna asignación puede sacar kg de la donación entre
+    la lectura de sus netos y el ajuste.
+    """
+    claves = set(
+        MovimientoInventario.objects.filter(donacion_id=donacion_id)
+        .values_list('ciudad', 'tipo_alimento').distinct().order_by()
+    )
+    _cuentas_bloqueadas(claves | set(otras))
+
+
+def _revertir(donacion_id, vincular=True):
+    """Ajustes que anulan lo que la donación tiene aún en inventario, por cuenta.
+
+    Llamar con las cuentas de la donación ya bloqueadas (_bloquear_cuentas_de).
+    """
+    netos = (
+        MovimientoInventario.objects.filter(donacion_id=donacion_id)
+        .values('ciudad', 'tipo_alimento').annotate(kg=Sum('kg')).order_by()
+    )
+    return [
+        MovimientoInventario(
+            ciudad=n['ciudad'], tipo_alimento=n['tipo_alimento'], kg=-n['kg'], tipo='ajuste',
+            donacion_id=donacion_id if vincular else None,
+        )
+        for n in netos if n['kg']
+    ]
+
+
+def registrar_donacion(donacion, creada):
+    """Entrada de una donación nueva, o ajuste si se editó su cantidad, tipo o donante."""
+    if creada:
+        registrar(entradas_de([donacion]))
+        return
+    ciudad, tipo_alimento = _clave_donacion(donacion)
+    with transaction.atomic():
+        _bloquear_cuentas_de(donacion.pk, [(ciudad, tipo_alimento)])
+        movimientos = _revertir(donacion.pk)
+        # Lo ya entregado no vuelve: el ajuste deja en inventario la cantidad
+        # nueva menos lo que salió por asignaciones
+        salido = -(
+            MovimientoInventario.objects.filter(donacion_id=donacion.pk, tipo='salida')
+            .aggregate(total=Sum('kg'))['total'] or 0
+        )
+        movimientos.append(MovimientoInventario(
+            ciudad=ciudad, tipo_alimento=tipo_alimento, kg=donacion.cantidad - salido,
+            tipo='ajuste', donacion=donacion,
+        ))
+        # Se compensan entre sí si nada cambió
+        netos = defaultdict(int)
+        for m in movimientos:
+            netos[(m.ciudad, m.tipo_alimento)] += m.kg
+        registrar([
+            MovimientoInventario(ciudad=c, tipo_alimento=t, kg=kg, tipo='ajuste', donacion=donacion)
+            for (c, t), kg in netos.items() if kg
+        ])
+
+
+def registrar_baja_donacion(donacion_id):
+    """Retira del inventario lo que quedaba de una donación que se va a borrar."""
+    with transaction.atomic():
+        _bloquear_cuentas_de(donacion_id)
+        registrar(_revertir(donacion_id, vincular=False))
+
+
+def registrar_salidas(asignaciones):
+    """Salidas por asignaciones ya guardadas; la cuenta es la de la entrada de cada donación."""
+    ids = {a.donacion_id for a in asignaciones}
+    cuenta_de = dict(
+        (pk, (ciudad, tipo))
+        for pk, ciudad, tipo in MovimientoInventario.objects
+        .filter(donacion_id__in=ids, kg__gt=0)
+        .order_by('donacion_id', 'id')
+        .values_list('donacion_id', 'ciudad', 'tipo_alimento')
+    )
+    movimientos = []
+    for a in asignaciones:
+        ciudad, tipo_alimento = cuenta_de[a.donacion_id]
+        movimientos.append(MovimientoInventario(
+            ciudad=ciudad, tipo_alimento=tipo_alimento, kg=-a.kg, tipo='salida',
+            donacion_id=a.donacion_id, asignacion=a,
+        ))
+    return registrar(movimientos)
+
+
+def saldo(ciudad, tipo_alimento):
+    """Kg disponibles: último corte más la cola de movimientos posteriores."""
+    cuenta = CuentaInventario.objects.filter(ciudad=ciudad, tipo_alimento=tipo_alimento).first()
+    return _saldo_cuenta(cuenta) if cuenta else 0
+
+
+def saldos(ciudad=None, tipo_alimento=None):
+    """Saldo de todas las cuentas (filtrables), en una sola consulta."""
+    cola = (
+        MovimientoInventario.objects
+        .filter(ciudad=OuterRef('ciudad'), tipo_alimento=OuterRef('tipo_alimento'),
+                id__gt=OuterRef('hasta_movimiento'))
+        .order_by().values('ciudad').annotate(total=Sum('kg')).values('total')
+    )
+    cuentas = CuentaInventario.objects.annotate(cola=Coalesce(Subquery(cola), Value(0)))
+    if ciudad is not None:
+        cuentas = cuentas.filter(ciudad=ciudad)
+    if tipo_alimento:
+        cuentas = cuentas.filter(tipo_alimento=tipo_alimento)
+    return [
+        {'ciudad': c.ciudad, 'tipo_alimento': c.tipo_alimento, 'kg': c.saldo_corte + c.cola}
+        for c in cuentas.order_by('ciudad', 'tipo_alimento')
+    ]
+
+
+def cortar_todas():
+    """Corte de todas las cuentas con movimientos nuevos (p. ej. desde un cron nocturno)."""
+    cortadas = 0
+    for pk in CuentaInventario.objects.values_list('pk', flat=True):
+        with transaction.atomic():
+            cuenta = CuentaInventario.objects.select_for_update().get(pk=pk)
+            antes = cuenta.hasta_movimiento
+            _cortar(cuenta)
+            cortadas += cuenta.hasta_movimiento != antes
+    return cortadas
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appDonaciones.asignacion import asignar
+
+
+class Command(BaseCommand):
+    help = ('Reparte los kg pendientes de las donaciones entre las zonas y zoos con demanda, '
+            'minimizando la distancia (flujo de costo mínimo).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simular', action='store_true', help='Calcular sin guardar las asignaciones.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        plan = asignar(simular=options['simular'])
+        accion = 'calculadas' if options['simular'] else 'guardadas'
+        self.stdout.write(
+            f'Oferta pendiente: {plan.kg_ofrecidos} kg   Demanda pendiente: {plan.kg_demandados} kg'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(plan.asignaciones)} asignaciones {accion}: {plan.kg_asignados} kg, '
+            f'{plan.km_por_kg:.1f} km promedio por kg ({time.perf_counter() - inicio:.1f} s).'
+        ))
@@ -0,0 +1,74 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from appDonaciones import geo
+from appDonaciones.models import Donante
+
+
+class Command(BaseCommand):
+    help = 'Compara la búsqueda por radio y k-cercanos usando geohash contra el recorrido completo con haversine.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument('--radio', type=float, default=20, help='Radio en km.')
+        parser.add_argument('--k', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def _medir(self, funcion, puntos):
+        tiempos, resultados = [], []
+        for lat, lon in puntos:
+            inicio = time.perf_counter()
+            resultados.append(funcion(lat, lon))
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos, resultados
+
+    def _reportar(self, nombre, tiempos):
+        tiempos = sorted(tiempos)
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+        self.stdout.write(
+            f'{nombre:<26} media {statistics.mean(tiempos):9.3f} ms   '
+            f'p50 {statistics.median(tiempos):9.3f} ms   p95 {p95:9.3f} ms'
+        )
+        return statistics.mean(tiempos)
+
+    def handle(self, *args, **options):
+        donantes = Donante.objects.exclude(geohash='')
+        muestra = list(donantes.values_list('latitud', 'longitud')[:1000])
+        if not muestra:
+            self.stderr.write('No hay donantes con coordenadas.')
+            return
+        azar = random.Random(options['semilla'])
+        puntos = [azar.choice(muestra) for _ in range(options['iteraciones'])]
+        radio, k = options['radio'], options['k']
+        self.stdout.write(f'{donantes.count()} donantes con coordenadas, radio {radio} km, k={k}')
+
+        def fuerza_bruta(lat, lon):
+            return geo._con_distancia(donantes.only('latitud', 'longitud'), lat, lon)
+
+        def ids(pares):
+            return [obj.pk for obj, _ in pares]
+
+        t_indice, r_indice = self._medir(lambda lat, lon: geo.en_radio(donantes, lat, lon, radio), puntos)
+        t_bruta, r_bruta = self._medir(
+            lambda lat, lon: [p for p in fuerza_bruta(lat, lon) if p[1] <= radio], puntos)
+        indice = self._reportar('Radio con geohash', t_indice)
+        bruta = self._reportar('Radio recorrido completo', t_bruta)
+        self._comparar('radio', r_indice, r_bruta, ids, bruta / indice)
+
+        t_indice, r_indice = self._medir(lambda lat, lon: geo.mas_cercanos(donantes, lat, lon, k), puntos)
+        t_bruta, r_bruta = self._medir(lambda lat, lon: fuerza_bruta(lat, lon)[:k], puntos)
+        indice = self._reportar('k-cercanos con geohash', t_indice)
+        bruta = self._reportar('k-cercanos recorrido', t_bruta)
+        # Con empates de distancia el orden puede variar: se comparan distancias
+        self._comparar('k-cercanos', r_indice, r_bruta,
+                       lambda pares: [round(d, 9) for _, d in pares], bruta / indice)
+
+    def _comparar(self, nombre, con_indice, bruta, clave, aceleracion):
+        distintos = sum(clave(a) != clave(b) for a, b in zip(con_indice, bruta))
+        if distintos:
+            self.stdout.write(self.style.ERROR(f'{nombre}: {distintos} resultados distintos a la fuerza bruta'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{nombre}: mismos resultados, {aceleracion:.1f}x más rápido'))
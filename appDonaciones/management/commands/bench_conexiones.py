@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia de una consulta abriendo una conexión nueva cada vez vs reutilizándola.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=50)
+
+    def _medir(self, iteraciones, reconectar):
+        tiempos = []
+        for _ in range(iteraciones):
+            if reconectar:
+                connection.close()
+            inicio = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def _reportar(self, nombre, tiempos):
+        tiempos = sorted(tiempos)
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+        self.stdout.write(
+            f'{nombre:<22} media {statistics.mean(tiempos):8.3f} ms   '
+            f'p50 {statistics.median(tiempos):8.3f} ms   p95 {p95:8.3f} ms'
+        )
+        return statistics.mean(tiempos)
+
+    def handle(self, *args, **options):
+        n = options['iteraciones']
+        if n < 1:
+            raise CommandError('--iteraciones debe ser al menos 1.')
+        ajustes = connection.settings_dict
+        con_pool = 'pool' in ajustes.get('OPTIONS', {})
+        self.stdout.write(
+            f"Motor: {connection.vendor}  CONN_MAX_AGE={ajustes.get('CONN_MAX_AGE')}  pool={con_pool}"
+        )
+        if con_pool:
+            # Con pool, close() devuelve la conexión y la siguiente consulta
+            # toma otra ya abierta: no se mide el costo de abrir una nueva
+            self.stdout.write(self.style.WARNING(
+                'Con DB_POOL cada reconexión toma una conexión ya abierta del pool; '
+                'para medir conexiones nuevas ejecutar sin DB_POOL=1.'
+            ))
+        nueva = self._reportar('Tomada del pool' if con_pool else 'Conexión nueva', self._medir(n, reconectar=True))
+        # Lo que hace Django entre requests con CONN_MAX_AGE > 0
+        close_old_connections()
+        reutilizada = self._reportar('Conexión reutilizada', self._medir(n, reconectar=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"Costo de {'tomar la conexión del pool' if con_pool else 'abrir la conexión'} por request: "
+            f'{nueva - reutilizada:.3f} ms'
+        ))
+        connection.close()
@@ -0,0 +1,88 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+
+from appDonaciones.correo import encolar_confirmacion_donacion
+from appDonaciones.forms import DonacionesForm
+from appDonaciones.importacion import crear_donaciones
+from appDonaciones.models import Donante
+
+
+class DonacionesSinCaptchaForm(DonacionesForm):
+    # El captcha es una llamada a Google: no se mide
+    captcha = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el alta de donaciones una por una (como donaciones_create) con el alta en lote '
+        'de la API. Todo se hace dentro de una transacción que se revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cantidad', type=int, default=200, help='Donaciones por prueba.')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def _items(self, cantidad, semilla):
+        donantes = list(Donante.objects.values_list('pk', flat=True)[:500])
+        azar = random.Random(semilla)
+        tipos = [v for v, _ in DonacionesForm.TIPOS_ALIMENTO if v]
+        destinos = [v for v, _ in DonacionesForm.DESTINO_CHOICES if v]
+        return [
+            {
+                'donante': azar.choice(donantes),
+                'cantidad': azar.randint(1, 200),
+                'fecha_llegada': (datetime.date(2025, 1, 1) + datetime.timedelta(days=azar.randint(0, 364))).isoformat(),
+                'tipo_alimento': azar.choice(tipos),
+                'destino': azar.choice(destinos),
+            }
+            for _ in range(cantidad)
+        ]
+
+    def _una_por_una(self, items, usuario):
+        for item in items:
+            form = DonacionesSinCaptchaForm(data=item)
+            if not form.is_valid():
+                raise ValueError(form.errors)
+            with transaction.atomic():
+                donacion = form.save()
+                encolar_confirmacion_donacion(donacion, usuario)
+
+    def _en_lote(self, items, usuario):
+        resultados = crear_donaciones(items)
+        if not all(r['ok'] for r in resultados):
+            raise ValueError([r['errores'] for r in resultados if not r['ok']])
+
+    def _medir(self, nombre, funcion, items, usuario):
+        reset_queries()
+        inicio = time.perf_counter()
+        funcion(items, usuario)
+        segundos = time.perf_counter() - inicio
+        consultas = len(connection.queries)
+        self.stdout.write(
+            f'{nombre:<12} {segundos * 1000:9.1f} ms   {len(items) / segundos:9.1f} donaciones/s   '
+            f'{consultas:6d} consultas'
+        )
+        return segundos
+
+    def handle(self, *args, **options):
+        if not Donante.objects.exists():
+            self.stderr.write('No hay donantes.')
+            return
+        items = self._items(options['cantidad'], options['semilla'])
+        usuario = User(username='bench', email='bench@example.com')
+        self.stdout.write(f'{len(items)} donaciones, motor {connection.vendor}')
+        # Para contar consultas sin depender de DEBUG
+        connection.force_debug_cursor = True
+        try:
+            with transaction.atomic():
+                una = self._medir('Una por una', self._una_por_una, items, usuario)
+                lote = self._medir('En lote', self._en_lote, items, usuario)
+                transaction.set_rollback(True)
+        finally:
+            connection.force_debug_cursor = False
+        self.stdout.write(self.style.SUCCESS(f'El lote es {una / lote:.1f}x más rápido'))
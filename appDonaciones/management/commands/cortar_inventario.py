@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from appDonaciones.inventario import cortar_todas
+
+
+class Command(BaseCommand):
+    help = 'Guarda un corte de saldo de cada cuenta de inventario con movimientos nuevos.'
+
+    def handle(self, *args, **options):
+        cortadas = cortar_todas()
+        self.stdout.write(self.style.SUCCESS(f'{cortadas} cuentas con corte nuevo.'))
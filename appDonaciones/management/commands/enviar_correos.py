@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appDonaciones.correo import enviar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Despacha los correos pendientes de la bandeja de salida.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help='Correos por conexión SMTP.')
+        parser.add_argument('--continuo', action='store_true', help='Seguir corriendo como worker.')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera sin trabajo (modo continuo).')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                enviados, fallidos = enviar_pendientes(lote=options['lote'])
+            except Exception as e:
+                # p. ej. la base de datos no responde: se reintenta en la próxima vuelta
+                self.stderr.write(f'Error al despachar correos: {e}')
+                enviados = fallidos = 0
+                if not options['continuo']:
+                    raise
+            if enviados or fallidos:
+                self.stdout.write(f'Enviados: {enviados}, fallidos: {fallidos}')
+            if not options['continuo']:
+                break
+            if enviados + fallidos < options['lote']:
+                time.sleep(options['intervalo'])
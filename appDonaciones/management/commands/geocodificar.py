@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appDonaciones.geocodificacion import HILOS, TAMANO_LOTE, geocodificar_donantes
+
+
+class Command(BaseCommand):
+    help = ('Rellena latitud/longitud de los donantes sin coordenadas. '
+            'Se puede interrumpir y volver a ejecutar: retoma donde quedó.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Donantes por lote/transacción.')
+        parser.add_argument('--hilos', type=int, default=HILOS, help='Consultas al geocodificador en paralelo.')
+        parser.add_argument('--desde-id', type=int, default=0, help='Saltar los donantes con id menor o igual.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+
+        def avance(resultado):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'  hasta id {resultado.ultimo_id}: {resultado.ubicados}/{resultado.procesados} ubicados'
+                )
+
+        resultado = geocodificar_donantes(
+            desde_id=options['desde_id'], tamano_lote=options['lote'],
+            hilos=options['hilos'], al_terminar_lote=avance,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.procesados} donantes revisados, {resultado.ubicados} ubicados, '
+            f'{resultado.consultas} direcciones nuevas consultadas ({time.perf_counter() - inicio:.1f} s).'
+        ))
@@ -0,0 +1,39 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appDonaciones.importacion import IMPORTADORES, TAMANO_LOTE, ErrorImportacion, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importa donantes o donaciones desde un archivo CSV o XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por bulk_create/transacción.')
+        parser.add_argument('--reporte', help='Ruta del CSV con los errores por fila (por defecto, la salida estándar).')
+        parser.add_argument('--simular', action='store_true', help='Solo validar, sin escribir en la base de datos.')
+
+    def handle(self, *args, **options):
+        importador = IMPORTADORES[options['tipo']](tamano_lote=options['lote'], simular=options['simular'])
+        inicio = time.perf_counter()
+        try:
+            reporte = importador.importar(leer_filas(options['archivo'], options['archivo']))
+        except (ErrorImportacion, OSError) as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+
+        if reporte.errores:
+            if options['reporte']:
+                with open(options['reporte'], 'w', encoding='utf-8', newline='') as f:
+                    reporte.escribir_csv(f)
+            else:
+                reporte.escribir_csv(sys.stdout)
+
+        accion = 'válidas' if options['simular'] else 'creadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{reporte.total} filas leídas, {reporte.creados} {accion}, '
+            f'{reporte.filas_con_error} con errores ({duracion:.1f} s).'
+        ))
@@ -0,0 +1,23 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Borra las sesiones expiradas de la base de datos en lotes (sin bloquear la tabla).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        total = 0
+        while True:
+            claves = list(
+                Session.objects.filter(expire_date__lt=ahora)
+                .values_list('session_key', flat=True)[:options['lote']]
+            )
+            if not claves:
+                break
+            total += Session.objects.filter(session_key__in=claves).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Sesiones expiradas eliminadas: {total}'))
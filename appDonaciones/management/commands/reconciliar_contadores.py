@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from appDonaciones.contadores import reconciliar
+
+
+class Command(BaseCommand):
+    help = 'Recalcula con COUNT(*) los contadores del panel de inicio.'
+
+    def handle(self, *args, **options):
+        totales = reconciliar()
+        resumen = ', '.join(f'{campo}: {valor}' for campo, valor in totales.items())
+        self.stdout.write(self.style.SUCCESS(f'Contadores actualizados ({resumen}).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from appDonaciones.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla de resumen de donaciones con un GROUP BY sobre Donaciones.'
+
+    def handle(self, *args, **options):
+        filas = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido ({filas} filas).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from appDonaciones.busqueda import motor, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de donantes (FTS5 en SQLite).'
+
+    def handle(self, *args, **options):
+        if motor() != 'sqlite':
+            self.stdout.write('El índice de PostgreSQL se mantiene solo; no hay nada que hacer.')
+            return
+        reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido.'))
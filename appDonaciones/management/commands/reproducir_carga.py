@@ -0,0 +1,177 @@
+import importlib.util
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from appDonaciones import carga
+from appDonaciones.forms import DonacionesForm
+from appDonaciones.models import Donaciones, Donante
+
+# Usuarios que crea el comando para cada corrida (con nombre y clave al azar) y borra al terminar
+USUARIOS_CARGA = {
+    'staff': {'is_staff': True},
+    'voluntario': {},
+}
+HOSTS_LOCALES = ('', 'localhost', '127.0.0.1', '::1')
+
+
+class Command(BaseCommand):
+    help = (
+        'Reproduce un escenario de tráfico con N usuarios concurrentes (sesión y CSRF propios) contra la '
+        'app en proceso o un gunicorn local, y reporta peticiones/s y p50/p95/p99 por URL. '
+        'reCAPTCHA y SMTP quedan simulados. Solo corre contra una base de datos local (o con '
+        '--permitir-base-remota), '
+        'y al terminar borra los usuarios de la carga y las donaciones que registraron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=['wsgi', 'gunicorn'], default='wsgi')
+        parser.add_argument('--usuarios', type=int, default=10, help='Usuarios simulados concurrentes.')
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos de carga.')
+        parser.add_argument('--escenario', help='JSON con la lista de acciones (ver appDonaciones/carga.py).')
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn.')
+        parser.add_argument('--puerto', type=int, default=0, help='Puerto local (0: uno libre).')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument(
+            '--permitir-base-remota', action='store_true',
+            help='Correr aunque la base de datos no sea local (borra TODAS las donaciones creadas durante la carga).',
+        )
+
+    def _verificar_entorno(self, permitir_remota):
+        """La carga crea un usuario staff y registra donaciones: nunca contra una base de producción.
+
+        Se decide por la base de datos y no por DEBUG (que está encendido en
+        settings): la limpieza borra por rango de id cualquier donación nueva.
+        """
+        local = connection.vendor == 'sqlite' or connection.settings_dict.get('HOST') in HOSTS_LOCALES
+        if not (local or permitir_remota):
+            raise CommandError(
+                f'La base de datos ({connection.settings_dict.get("HOST")}) no es local: la carga crea usuarios '
+                'staff y al terminar borra todas las donaciones registradas durante la corrida, incluso las de '
+                'usuarios reales. Usa --permitir-base-remota solo si nadie más escribe en esa base.'
+            )
+
+    def _crear_usuarios(self):
+        """Usuarios de esta corrida; devuelve ({rol: (usuario, clave)}, [User])."""
+        sufijo = secrets.token_hex(4)
+        credenciales, usuarios = {}, []
+        for rol, extra in USUARIOS_CARGA.items():
+            clave = secrets.token_urlsafe(16)
+            usuario = User.objects.create_user(f'carga_{rol}_{sufijo}', password=clave, **extra)
+            credenciales[rol] = (usuario.username, clave)
+            usuarios.append(usuario)
+        return credenciales, usuarios
+
+    def _limpiar(self, usuarios, ultima_donacion):
+        # Donaciones no guarda quién la registró: se borran las creadas durante
+        # la corrida (por eso solo se permite contra una base local o con --permitir-base-remota)
+        nuevas = Donaciones.objects.filter(pk__gt=ultima_donacion)
+        cantidad = nuevas.count()
+        for donacion in nuevas.iterator():
+            # delete() por instancia: las señales descuentan resumen, inventario y contadores
+            donacion.delete()
+        User.objects.filter(pk__in=[u.pk for u in usuarios]).delete()
+        self.stdout.write(f'Limpieza: {len(usuarios)} usuarios y {cantidad} donaciones de la carga borrados.')
+
+    def _datos(self):
+        donantes = list(Donante.objects.order_by('pk').values_list('pk', flat=True)[:1000])
+        if not donantes:
+            raise CommandError('No hay donantes: ejecuta antes "manage.py sembrar".')
+        return {
+            'donantes': donantes,
+            'hoy': time.strftime('%Y-%m-%d'),
+            'alimentos': [v for v, _ in DonacionesForm.TIPOS_ALIMENTO if v],
+            'destinos': [v for v, _ in DonacionesForm.DESTINO_CHOICES if v],
+        }
+
+    def _puerto_libre(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            return s.getsockname()[1]
+
+    def _gunicorn(self, puerto, workers):
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('El modo gunicorn necesita el paquete gunicorn instalado.')
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'prjDonaciones.wsgi:application',
+             '--bind', f'127.0.0.1:{puerto}', '--workers', str(workers),
+             '--config', 'python:appDonaciones.gunicorn_carga', '--log-level', 'warning'],
+            env=os.environ.copy(),
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                raise CommandError('gunicorn terminó al iniciar.')
+            try:
+                socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+                return proceso
+            except OSError:
+                time.sleep(0.2)
+        proceso.terminate()
+        raise CommandError('gunicorn no respondió en 30 s.')
+
+    def handle(self, *args, **options):
+        escenario = carga.leer_escenario(options['escenario']) if options['escenario'] else carga.ESCENARIO
+        roles = {a.rol for a in escenario} - set(USUARIOS_CARGA)
+        if roles:
+            raise CommandError(f'Roles desconocidos en el escenario: {", ".join(sorted(roles))}.')
+        self._verificar_entorno(options['permitir_base_remota'])
+        datos = self._datos()
+        ultima_donacion = Donaciones.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        credenciales, usuarios = self._crear_usuarios()
+        try:
+            self._cargar(options, escenario, credenciales, datos)
+        finally:
+            self._limpiar(usuarios, ultima_donacion)
+
+    def _cargar(self, options, escenario, credenciales, datos):
+        puerto = options['puerto'] or self._puerto_libre()
+
+        if options['modo'] == 'wsgi':
+            from django.core.wsgi import get_wsgi_application
+
+            carga.aplicar_stubs()
+            base, servidor = carga.servidor_en_proceso(get_wsgi_application(), puerto)
+            detener = servidor.shutdown
+        else:
+            proceso = self._gunicorn(puerto, options['workers'])
+            base = f'http://127.0.0.1:{puerto}'
+
+            def detener():
+                # Que ningún worker siga escribiendo mientras se limpia
+                proceso.terminate()
+                proceso.wait(timeout=30)
+
+        self.stdout.write(
+            f'{options["usuarios"]} usuarios durante {options["duracion"]:.0f} s contra {base} ({options["modo"]})'
+        )
+        try:
+            mediciones, segundos = carga.reproducir(
+                base, escenario, credenciales, datos,
+                usuarios=options['usuarios'], duracion=options['duracion'], semilla=options['semilla'],
+            )
+        finally:
+            detener()
+
+        filas = carga.resumir(mediciones, segundos)
+        self.stdout.write(
+            f'{"URL":<30} {"peticiones":>10} {"errores":>8} {"req/s":>8} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}'
+        )
+        for f in filas:
+            self.stdout.write(
+                f'{f["nombre"]:<30} {f["peticiones"]:>10} {f["errores"]:>8} {f["por_segundo"]:>8.1f} '
+                f'{f["p50"]:>9.1f} {f["p95"]:>9.1f} {f["p99"]:>9.1f}'
+            )
+        errores = sum(f['errores'] for f in filas)
+        estilo = self.style.ERROR if errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'Total: {len(mediciones)} peticiones en {segundos:.1f} s '
+            f'({len(mediciones) / segundos:.1f} req/s), {errores} con error.'
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appDonaciones.semilla import TAMANO_LOTE, sembrar
+
+
+class Command(BaseCommand):
+    help = 'Genera donantes, donaciones, zonas y zoos de prueba (deterministas según la semilla) con bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--donantes', type=int, default=100)
+        parser.add_argument('--donaciones', type=int, default=1000)
+        parser.add_argument('--zonas', type=int, default=20)
+        parser.add_argument('--zoos', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por bulk_create/transacción.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            creados = sembrar(
+                donantes=options['donantes'], donaciones=options['donaciones'], zonas=options['zonas'],
+                zoos=options['zoos'], semilla=options['semilla'], tamano_lote=options['lote'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        resumen = ', '.join(f'{cantidad} {tipo}' for tipo, cantidad in creados.items())
+        self.stdout.write(self.style.SUCCESS(f'Creados: {resumen} ({time.perf_counter() - inicio:.1f} s).'))
@@ -0,0 +1,113 @@
+"""Donantes del mapa en GeoJSON, filtrados por caja y agrupados por celdas.
+
+Con zoom bajo (o demasiados puntos en la caja) los donantes se agrupan en una
+grilla fija de grados cuyo tamaño depende del zoom: cada celda se calcula con
+un GROUP BY en la base de datos y se devuelve como un único punto con su
+cantidad. Así la respuesta queda acotada por el número de celdas de la vista y
+no por el número de donantes.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DecimalField, F, Value
+from django.db.models.functions import Floor
+from django.urls import reverse
+
+from .models import Donante
+
+# A partir de este zoom se devuelven donantes individuales
+ZOOM_DETALLE = 13
+# Máximo de donantes individuales; si la caja tiene más, se agrupa igual
+MAX_PUNTOS = 1000
+# Celdas por tesela de 256 px (4 -> celdas de unos 64 px en pantalla)
+CELDAS_POR_TESELA = 4
+# Tope de celdas por lado, aunque la caja pedida sea enorme
+MAX_CELDAS_LADO = 40
+
+
+class CajaInvalida(ValueError):
+    pass
+
+
+def leer_caja(params):
+    """Lee 'bbox=oeste,sur,este,norte' y 'zoom' de los parámetros GET."""
+    try:
+        oeste, sur, este, norte = (float(v) for v in params.get('bbox', '').split(','))
+        zoom = int(params.get('zoom', ZOOM_DETALLE))
+    except ValueError:
+        raise CajaInvalida('Se espera bbox=oeste,sur,este,norte y zoom entero.')
+    sur, norte = max(sur, -90.0), min(norte, 90.0)
+    oeste, este = max(oeste, -180.0), min(este, 180.0)
+    if sur >= norte or oeste >= este:
+        raise CajaInvalida('La caja está vacía.')
+    return (oeste, sur, este, norte), max(0, min(zoom, 22))
+
+
+def tamano_celda(caja, zoom):
+    """Lado de la celda en grados para el zoom, con tope de celdas por lado."""
+    oeste, sur, este, norte = caja
+    tamano = 360.0 / (2 ** zoom * CELDAS_POR_TESELA)
+    return max(tamano, (este - oeste) / MAX_CELDAS_LADO, (norte - sur) / MAX_CELDAS_LADO)
+
+
+def donantes_en_caja(caja):
+    oeste, sur, este, norte = caja
+    return Donante.objects.filter(
+        latitud__gte=sur, latitud__lte=norte,
+        longitud__gte=oeste, longitud__lte=este,
+    )
+
+
+def _punto(lon, lat, propiedades):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [round(float(lon), 6), round(float(lat), 6)]},
+        'properties': propiedades,
+    }
+
+
+def _donantes(queryset):
+    filas = queryset.order_by('id_donante').values_list(
+        'id_donante', 'nombre', 'ciudad', 'tipo_donante', 'latitud', 'longitud',
+    )[:MAX_PUNTOS + 1]
+    filas = list(filas)
+    if len(filas) > MAX_PUNTOS:
+        return None
+    return [
+        _punto(lon, lat, {
+            'id': pk, 'nombre': nombre, 'ciudad': ciudad, 'tipo_donante': tipo,
+            'url': reverse('donante_detail', args=[pk]),
+        })
+        for pk, nombre, ciudad, tipo, lat, lon in filas
+    ]
+
+
+def _celdas(queryset, tamano):
+    # Grilla anclada en (0, 0): las celdas no cambian al desplazar el mapa
+    lado = Value(Decimal(repr(tamano)), output_field=DecimalField())
+    grupos = (
+        queryset
+        .annotate(fila=Floor(F('latitud') / lado), columna=Floor(F('longitud') / lado))
+        .values('fila', 'columna')
+        .annotate(cantidad=Count('id_donante'), lat=Avg('latitud'), lon=Avg('longitud'))
+        .order_by()
+    )
+    return [
+        _punto(g['lon'], g['lat'], {'cluster': True, 'cantidad': g['cantidad']})
+        for g in grupos
+    ]
+
+
+def geojson(caja, zoom):
+    queryset = donantes_en_caja(caja)
+    features = None
+    if zoom >= ZOOM_DETALLE:
+        features = _donantes(queryset)
+    agrupado = features is None
+    if agrupado:
+        features = _celdas(queryset, tamano_celda(caja, zoom))
+    return {
+        'type': 'FeatureCollection',
+        'features': features,
+        'agrupado': agrupado,
+        'zoom': zoom,
+    }
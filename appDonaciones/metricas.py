@@ -0,0 +1,285 @@
+"""Métricas en formato de texto de Prometheus (GET /metrics).
+
+Contadores e histogramas propios, sin dependencias: cada actualización es un
+incremento en un diccionario bajo un lock que casi nunca se disputa.
+
+Con varios procesos (workers de gunicorn, el comando 'enviar_correos') cada
+uno tiene su propia memoria. Si METRICAS_DIR apunta a un directorio
+compartido, cada proceso escribe sus valores en un archivo propio mapeado en
+memoria (mmap) y /metrics suma los de todos los archivos. El directorio debe
+vaciarse al desplegar, antes de arrancar los workers.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .cache import estadisticas
+
+# Segundos por request
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+BUCKETS_TIEMPO_SQL = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+# --- Almacenes de valores ---
+
+class _AlmacenMemoria:
+    def __init__(self):
+        self.valores = defaultdict(float)
+
+    def sumar(self, clave, n):
+        self.valores[clave] += n
+
+    def leer(self):
+        return dict(self.valores)
+
+
+class _AlmacenMmap:
+    """Claves y valores de un proceso en un archivo mapeado en memoria.
+
+    Formato: 8 bytes con los bytes usados y luego entradas
+    [largo de la clave (4)][clave utf-8, con relleno a múltiplo de 8][valor double (8)].
+    Solo escribe el proceso dueño; los demás solo leen.
+    """
+    TAMANO_INICIAL = 1 << 16
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.archivo = open(ruta, 'a+b')
+        if os.fstat(self.archivo.fileno()).st_size == 0:
+            self.archivo.truncate(self.TAMANO_INICIAL)
+        self._mapear()
+        self.posiciones = {}
+        self.usado = struct.unpack_from('q', self.mm, 0)[0] or 8
+        for clave, posicion in _entradas(self.mm, self.usado):
+            self.posiciones[clave] = posicion
+
+    def _mapear(self):
+        self.mm = mmap.mmap(self.archivo.fileno(), os.fstat(self.archivo.fileno()).st_size)
+
+    def _agregar(self, clave):
+        datos = clave.encode()
+        relleno = -(4 + len(datos)) % 8
+        tamano = 4 + len(datos) + relleno + 8
+        if self.usado + tamano > len(self.mm):
+            self.mm.close()
+            self.archivo.truncate(max(len(self.mm) * 2, self.usado + tamano))
+            self._mapear()
+        posicion = self.usado + 4 + len(datos) + relleno
+        struct.pack_into(f'i{len(datos)}s', self.mm, self.usado, len(datos), datos)
+        struct.pack_into('d', self.mm, posicion, 0.0)
+        self.usado += tamano
+        # El largo usado se publica al final, con la entrada ya escrita
+        struct.pack_into('q', self.mm, 0, self.usado)
+        self.posiciones[clave] = posicion
+        return posicion
+
+    def sumar(self, clave, n):
+        posicion = self.posiciones.get(clave)
+        if posicion is None:
+            posicion = self._agregar(clave)
+        valor = struct.unpack_from('d', self.mm, posicion)[0]
+        struct.pack_into('d', self.mm, posicion, valor + n)
+
+    def leer(self):
+        return leer_archivo(self.ruta)
+
+
+def _entradas(datos, usado):
+    posicion = 8
+    while posicion < usado:
+        largo = struct.unpack_from('i', datos, posicion)[0]
+        clave = bytes(datos[posicion + 4:posicion + 4 + largo]).decode()
+        valor = posicion + 4 + largo + (-(4 + largo) % 8)
+        yield clave, valor
+        posicion = valor + 8
+
+
+def leer_archivo(ruta):
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    if len(datos) < 8:
+        return {}
+    usado = struct.unpack_from('q', datos, 0)[0]
+    return {clave: struct.unpack_from('d', datos, pos)[0] for clave, pos in _entradas(datos, usado)}
+
+
+_lock = threading.Lock()
+_almacen = None
+_pid = None
+
+
+def _almacen_actual():
+    """El almacén de este proceso; se crea de nuevo tras un fork (workers de gunicorn)."""
+    global _almacen, _pid
+    if _pid != os.getpid():
+        directorio = getattr(settings, 'METRICAS_DIR', '')
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            _almacen = _AlmacenMmap(os.path.join(directorio, f'metricas_{os.getpid()}.db'))
+        else:
+            _almacen = _AlmacenMemoria()
+        _pid = os.getpid()
+    return _almacen
+
+
+def _clave(muestra, etiquetas):
+    return json.dumps([muestra, etiquetas], separators=(',', ':'), sort_keys=True)
+
+
+# --- Métricas ---
+
+METRICAS = {}
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        METRICAS[nombre] = self
+
+    def _sumar(self, pares):
+        with _lock:
+            almacen = _almacen_actual()
+            for clave, n in pares:
+                almacen.sumar(clave, n)
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, n=1, **etiquetas):
+        self._sumar([(_clave(f'{self.nombre}_total', etiquetas), n)])
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, buckets):
+        super().__init__(nombre, ayuda)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        # Se guarda solo el bucket que corresponde; los acumulados se arman al exponer
+        indice = bisect.bisect_left(self.buckets, valor)
+        le = _formato(self.buckets[indice]) if indice < len(self.buckets) else '+Inf'
+        self._sumar([
+            (_clave(f'{self.nombre}_bucket', {**etiquetas, 'le': le}), 1),
+            (_clave(f'{self.nombre}_sum', etiquetas), valor),
+            (_clave(f'{self.nombre}_count', etiquetas), 1),
+        ])
+
+
+requests_total = Contador('donaciones_http_requests', 'Requests atendidos por URL, método y status.')
+duracion_request = Histograma(
+    'donaciones_http_request_duracion_segundos', 'Duración de los requests por URL.', BUCKETS_DURACION,
+)
+consultas_request = Histograma(
+    'donaciones_db_consultas_por_request', 'Consultas SQL por request, por URL.', BUCKETS_CONSULTAS,
+)
+tiempo_sql_request = Histograma(
+    'donaciones_db_tiempo_por_request_segundos', 'Tiempo en SQL por request, por URL.', BUCKETS_TIEMPO_SQL,
+)
+correos_encolados = Contador(
+    'donaciones_correos_encolados', 'Confirmaciones de donación encoladas (o no, si el usuario no tiene email).',
+)
+correos_enviados = Contador('donaciones_correos_enviados', 'Correos enviados por enviar_pendientes.')
+correos_fallidos = Contador('donaciones_correos_fallidos', 'Envíos de correo que fallaron.')
+
+
+def registrar_request(url, metodo, status, segundos, consultas, segundos_sql):
+    """Lo llama InstrumentacionSQLMiddleware al terminar cada request."""
+    requests_total.inc(url=url, metodo=metodo, status=str(status))
+    duracion_request.observar(segundos, url=url)
+    consultas_request.observar(consultas, url=url)
+    tiempo_sql_request.observar(segundos_sql, url=url)
+
+
+# --- Exposición ---
+
+def _formato(valor):
+    return repr(float(valor)) if not float(valor).is_integer() else f'{float(valor):.1f}'
+
+
+def valores():
+    """Valores de este proceso, o la suma de todos los procesos en modo multiproceso."""
+    directorio = getattr(settings, 'METRICAS_DIR', '')
+    if not directorio:
+        with _lock:
+            return _almacen_actual().leer()
+    totales = defaultdict(float)
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('metricas_') and nombre.endswith('.db'):
+            for clave, valor in leer_archivo(os.path.join(directorio, nombre)).items():
+                totales[clave] += valor
+    return totales
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    partes = (
+        '{}="{}"'.format(k, str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for k, v in sorted(etiquetas.items())
+    )
+    return '{' + ','.join(partes) + '}'
+
+
+def _linea(muestra, etiquetas, valor):
+    return f'{muestra}{_etiquetas(etiquetas)} {_formato(valor) if valor % 1 else int(valor)}'
+
+
+def exponer():
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    por_muestra = defaultdict(list)
+    for clave, valor in valores().items():
+        muestra, etiquetas = json.loads(clave)
+        por_muestra[muestra].append((etiquetas, valor))
+
+    lineas = []
+    for metrica in METRICAS.values():
+        # En el formato 0.0.4 el nombre de un contador ya incluye _total
+        nombre = f'{metrica.nombre}_total' if metrica.tipo == 'counter' else metrica.nombre
+        lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+        if metrica.tipo == 'counter':
+            for etiquetas, valor in sorted(por_muestra[nombre], key=lambda e: sorted(e[0].items())):
+                lineas.append(_linea(nombre, etiquetas, valor))
+            continue
+        # Histograma: buckets acumulados por conjunto de etiquetas
+        cuentas = defaultdict(dict)
+        for etiquetas, valor in por_muestra[f'{metrica.nombre}_bucket']:
+            le = etiquetas.pop('le')
+            cuentas[json.dumps(etiquetas, sort_keys=True)][le] = valor
+        sumas = {json.dumps(e, sort_keys=True): v for e, v in por_muestra[f'{metrica.nombre}_sum']}
+        for clave in sorted(cuentas):
+            etiquetas = json.loads(clave)
+            acumulado = 0
+            for limite in [_formato(b) for b in metrica.buckets] + ['+Inf']:
+                acumulado += cuentas[clave].get(limite, 0)
+                lineas.append(_linea(f'{metrica.nombre}_bucket', {**etiquetas, 'le': limite}, acumulado))
+            lineas.append(_linea(f'{metrica.nombre}_sum', etiquetas, sumas.get(clave, 0)))
+            lineas.append(_linea(f'{metrica.nombre}_count', etiquetas, acumulado))
+
+    # Caché de vistas: los contadores ya viven en la caché (compartida entre procesos si es Redis)
+    cache = estadisticas()
+    lineas += [
+        '# HELP donaciones_cache_vistas_aciertos_total Aciertos de la caché de vistas.',
+        '# TYPE donaciones_cache_vistas_aciertos_total counter',
+        f'donaciones_cache_vistas_aciertos_total {cache["hits"]}',
+        '# HELP donaciones_cache_vistas_fallos_total Fallos de la caché de vistas.',
+        '# TYPE donaciones_cache_vistas_fallos_total counter',
+        f'donaciones_cache_vistas_fallos_total {cache["misses"]}',
+        '# HELP donaciones_cache_vistas_ratio Proporción de aciertos de la caché de vistas.',
+        '# TYPE donaciones_cache_vistas_ratio gauge',
+        f'donaciones_cache_vistas_ratio {cache["ratio"]}',
+    ]
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,128 @@
+import json
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import metricas
+
+logger = logging.getLogger('appDonaciones.sql')
+
+CLAVE_RENOVACION = '_renovada_en'
+
+
+class SesionDeslizanteMiddleware:
+    """Renueva la expiración de la sesión solo cuando ya pasó parte de su vida.
+
+    Sustituye a SESSION_SAVE_EVERY_REQUEST: en vez de escribir la sesión en
+    cada request, la marca como modificada cuando transcurrió más de
+    SESSION_RENOVAR_FRACCION * SESSION_COOKIE_AGE desde la última renovación.
+    Funciona con cualquier SESSION_ENGINE (db, cached_db, signed_cookies).
+    Va justo después de SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.intervalo = settings.SESSION_COOKIE_AGE * getattr(settings, 'SESSION_RENOVAR_FRACCION', 0.5)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # Solo sesiones de usuarios autenticados; las anónimas no se crean por esto
+        if session is None or session.modified or SESSION_KEY not in session:
+            return response
+        ahora = int(time.time())
+        if ahora - session.get(CLAVE_RENOVACION, 0) >= self.intervalo:
+            session[CLAVE_RENOVACION] = ahora
+        return response
+
+
+class _RegistroConsultas:
+    """execute_wrapper que cuenta, cronometra y agrupa por forma las consultas de un request.
+
+    El SQL llega con los parámetros aparte (%s), así que el texto ya es la
+    "forma" de la consulta: la misma forma muchas veces es un probable N+1.
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.formas[sql] += 1
+
+
+class InstrumentacionSQLMiddleware:
+    """Consultas y tiempo de base de datos por request, sin DEBUG.
+
+    - Agrega Server-Timing (db: consultas y ms en SQL; app: ms totales), que
+      el navegador muestra en la pestaña de red.
+    - Registra como JSON en el logger 'appDonaciones.sql' los requests de más
+      de SQL_LENTO_MS y los que repiten una misma consulta SQL_REPETICIONES_N1
+      veces o más.
+    - Alimenta las métricas por URL de /metrics (ver metricas.py).
+    Va primero en MIDDLEWARE para medir también la sesión y la autenticación.
+    En respuestas streaming (exportaciones CSV) no cuenta las consultas hechas
+    al generar el contenido. Se desactiva con SQL_INSTRUMENTACION = False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTACION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lento_ms = getattr(settings, 'SQL_LENTO_MS', 500)
+        self.repeticiones_n1 = getattr(settings, 'SQL_REPETICIONES_N1', 5)
+
+    def __call__(self, request):
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+        # Lo mismo que connection.execute_wrapper(), sin el costo del contextmanager
+        # ni de resolver el proxy `connection` dos veces
+        conexion = connections[DEFAULT_DB_ALIAS]
+        conexion.execute_wrappers.append(registro)
+        try:
+            response = self.get_response(request)
+        finally:
+            conexion.execute_wrappers.remove(registro)
+        total_ms = (time.perf_counter() - inicio) * 1000
+        sql_ms = registro.segundos * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.1f};desc="{registro.cantidad} consultas", app;dur={total_ms:.1f}'
+        )
+        match = getattr(request, 'resolver_match', None)
+        metricas.registrar_request(
+            match.view_name if match else 'sin_ruta', request.method, response.status_code,
+            total_ms / 1000, registro.cantidad, registro.segundos,
+        )
+
+        repetidas = []
+        if registro.cantidad >= self.repeticiones_n1:
+            repetidas = [
+                {'sql': sql[:300], 'veces': veces}
+                for sql, veces in registro.formas.most_common(3) if veces >= self.repeticiones_n1
+            ]
+        if repetidas or total_ms >= self.lento_ms:
+            logger.warning(json.dumps({
+                'evento': 'posible_n_mas_1' if repetidas else 'request_lento',
+                'metodo': request.method,
+                'ruta': request.path,
+                'url': match.view_name if match else None,
+                'status': response.status_code,
+                'ms': round(total_ms, 1),
+                'consultas': registro.cantidad,
+                'sql_ms': round(sql_ms, 1),
+                'repetidas': repetidas,
+            }, ensure_ascii=False))
+        return response
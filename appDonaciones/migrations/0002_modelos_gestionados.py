@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:26
+
+from django.db import migrations
+
+
+def crear_tablas_faltantes(apps, schema_editor):
+    # 0001 declaraba los modelos como managed=False, así que 'migrate' nunca
+    # creó sus tablas en una base nueva. Solo se crean las que no existen.
+    existentes = set(schema_editor.connection.introspection.table_names())
+    for nombre in ('BajoRecursos', 'Donaciones', 'Donante', 'Zoo'):
+        modelo = apps.get_model('appDonaciones', nombre)
+        if modelo._meta.db_table not in existentes:
+            schema_editor.create_model(modelo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='AuthGroup',
+        ),
+        migrations.DeleteModel(
+            name='AuthGroupPermissions',
+        ),
+        migrations.DeleteModel(
+            name='AuthPermission',
+        ),
+        migrations.DeleteModel(
+            name='AuthUser',
+        ),
+        migrations.DeleteModel(
+            name='AuthUserGroups',
+        ),
+        migrations.DeleteModel(
+            name='AuthUserUserPermissions',
+        ),
+        migrations.DeleteModel(
+            name='DjangoAdminLog',
+        ),
+        migrations.DeleteModel(
+            name='DjangoContentType',
+        ),
+        migrations.DeleteModel(
+            name='DjangoMigrations',
+        ),
+        migrations.DeleteModel(
+            name='DjangoSession',
+        ),
+        migrations.DeleteModel(
+            name='TipoDeAlimento',
+        ),
+        migrations.AlterModelOptions(
+            name='bajorecursos',
+            options={'managed': True},
+        ),
+        migrations.AlterModelOptions(
+            name='donaciones',
+            options={'managed': True},
+        ),
+        migrations.AlterModelOptions(
+            name='donante',
+            options={'managed': True},
+        ),
+        migrations.AlterModelOptions(
+            name='zoo',
+            options={'managed': True},
+        ),
+        migrations.RunPython(crear_tablas_faltantes, migrations.RunPython.noop),
+    ]
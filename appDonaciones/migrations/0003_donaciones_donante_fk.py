@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0002_modelos_gestionados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donante',
+            name='estado',
+            field=models.CharField(blank=True, choices=[('activo', 'Activo'), ('inactivo', 'Inactivo'), ('suspendido', 'Suspendido')], max_length=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='donante',
+            name='tipo_donante',
+            field=models.CharField(blank=True, choices=[('individual', 'Individual'), ('empresa', 'Empresa'), ('organizacion', 'Organización'), ('institucion', 'Institución')], max_length=20, null=True),
+        ),
+        # La columna 'Donante' se conserva con otro nombre de campo; no cambia en la BD.
+        migrations.RenameField(
+            model_name='donaciones',
+            old_name='donante',
+            new_name='donante_texto',
+        ),
+        migrations.AlterField(
+            model_name='donaciones',
+            name='donante_texto',
+            field=models.CharField(blank=True, db_column='Donante', default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='donaciones',
+            name='donante',
+            field=models.ForeignKey(blank=True, db_column='id_donante', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donaciones', to='appDonaciones.donante'),
+        ),
+        migrations.AddIndex(
+            model_name='donaciones',
+            index=models.Index(fields=['donante', 'fecha_llegada'], name='donaciones_donante_fecha_idx'),
+        ),
+    ]
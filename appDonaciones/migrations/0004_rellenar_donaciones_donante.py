@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.db import migrations, transaction
+
+TAMANO_LOTE = 2000
+
+
+def _resolver_donantes(Donante):
+    """Mapea el texto histórico a un id de donante.
+
+    La columna guardaba la ciudad del donante, así que manda la ciudad: se
+    enlaza solo si hay un único donante en ella y el texto no es además el
+    nombre de otro donante (en ese caso la fila queda sin enlazar). El nombre
+    exacto se usa solo si el texto no es la ciudad de ningún donante.
+    """
+    por_nombre = defaultdict(set)
+    por_ciudad = defaultdict(set)
+    for pk, nombre, ciudad in Donante.objects.values_list('id_donante', 'nombre', 'ciudad').iterator():
+        if nombre:
+            por_nombre[nombre].add(pk)
+        if ciudad:
+            por_ciudad[ciudad].add(pk)
+
+    mapa = {}
+    for texto in por_ciudad.keys() | por_nombre.keys():
+        ciudad, nombre = por_ciudad.get(texto), por_nombre.get(texto)
+        if ciudad:
+            if len(ciudad) == 1 and (not nombre or nombre == ciudad):
+                mapa[texto] = next(iter(ciudad))
+        elif len(nombre) == 1:
+            mapa[texto] = next(iter(nombre))
+    return mapa
+
+
+def rellenar_donante(apps, schema_editor):
+    Donaciones = apps.get_model('appDonaciones', 'Donaciones')
+    Donante = apps.get_model('appDonaciones', 'Donante')
+    mapa = _resolver_donantes(Donante)
+    if not mapa:
+        return
+
+    ultimo_pk = 0
+    while True:
+        lote = list(
+            Donaciones.objects.filter(id_donacion__gt=ultimo_pk)
+            .order_by('id_donacion')
+            .values_list('id_donacion', 'donante_texto', 'donante_id')[:TAMANO_LOTE]
+        )
+        if not lote:
+            break
+        ultimo_pk = lote[-1][0]
+
+        por_donante = defaultdict(list)
+        for pk, texto, donante_id in lote:
+            if donante_id is None and texto in mapa:
+                por_donante[mapa[texto]].append(pk)
+
+        with transaction.atomic():
+            for donante_id, pks in por_donante.items():
+                Donaciones.objects.filter(id_donacion__in=pks).update(donante_id=donante_id)
+
+
+class Migration(migrations.Migration):
+    # Cada lote se confirma por separado para no bloquear la tabla completa.
+    atomic = False
+
+    dependencies = [
+        ('appDonaciones', '0003_donaciones_donante_fk'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_donante, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def rellenar_fecha_registro(apps, schema_editor):
+    # La paginación por cursor necesita una clave no nula. Los donantes sin
+    # fecha toman la de su primera donación o, si no tienen, la fecha de hoy.
+    Donante = apps.get_model('appDonaciones', 'Donante')
+    sin_fecha = Donante.objects.filter(fecha_registro__isnull=True)
+    for donante in sin_fecha.annotate(primera=Min('donaciones__fecha_llegada')).iterator():
+        Donante.objects.filter(pk=donante.pk).update(
+            fecha_registro=donante.primera or datetime.date.today()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0004_rellenar_donaciones_donante'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_fecha_registro, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='donante',
+            name='fecha_registro',
+            field=models.DateField(blank=True, default=datetime.date.today),
+        ),
+        migrations.AddIndex(
+            model_name='donaciones',
+            index=models.Index(fields=['fecha_llegada', 'id_donacion'], name='donaciones_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['fecha_registro', 'id_donante'], name='donante_registro_id_idx'),
+        ),
+    ]
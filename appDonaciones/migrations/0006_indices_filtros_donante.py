@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0005_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['tipo_donante', 'fecha_registro', 'id_donante'], name='donante_tipo_registro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['estado', 'fecha_registro', 'id_donante'], name='donante_estado_registro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['ciudad', 'fecha_registro', 'id_donante'], name='donante_ciudad_registro_idx'),
+        ),
+    ]
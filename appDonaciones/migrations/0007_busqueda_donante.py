@@ -0,0 +1,57 @@
+from django.db import migrations
+
+POSTGRES_CREAR = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    ALTER TABLE donante ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', COALESCE(nombre, '')), 'A') ||
+        setweight(to_tsvector('spanish', COALESCE(direccion, '')), 'B') ||
+        setweight(to_tsvector('spanish', COALESCE(notas, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX donante_busqueda_gin ON donante USING gin (busqueda)',
+    'CREATE INDEX donante_nombre_trgm ON donante USING gin (nombre gin_trgm_ops)',
+]
+POSTGRES_BORRAR = [
+    'DROP INDEX IF EXISTS donante_nombre_trgm',
+    'DROP INDEX IF EXISTS donante_busqueda_gin',
+    'ALTER TABLE donante DROP COLUMN IF EXISTS busqueda',
+]
+SQLITE_CREAR = [
+    "CREATE VIRTUAL TABLE donante_fts USING fts5(nombre, direccion, notas, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO donante_fts (rowid, nombre, direccion, notas) "
+    "SELECT id_donante, COALESCE(nombre, ''), COALESCE(direccion, ''), COALESCE(notas, '') FROM donante",
+]
+SQLITE_BORRAR = ['DROP TABLE IF EXISTS donante_fts']
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_CREAR)
+    elif vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_CREAR)
+
+
+def borrar_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _ejecutar(schema_editor, POSTGRES_BORRAR)
+    elif vendor == 'sqlite':
+        _ejecutar(schema_editor, SQLITE_BORRAR)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0006_indices_filtros_donante'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, borrar_indice_busqueda),
+    ]
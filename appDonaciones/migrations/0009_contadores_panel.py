@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:32
+
+from django.db import migrations, models
+
+
+def inicializar_contadores(apps, schema_editor):
+    def contar(nombre):
+        return apps.get_model('appDonaciones', nombre).objects.count()
+
+    apps.get_model('appDonaciones', 'ContadoresPanel').objects.update_or_create(pk=1, defaults={
+        'donaciones': contar('Donaciones'),
+        'donantes': contar('Donante'),
+        'zonas': contar('BajoRecursos'),
+        'zoos': contar('Zoo'),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0008_correo_pendiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadoresPanel',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('donaciones', models.BigIntegerField(default=0)),
+                ('donantes', models.BigIntegerField(default=0)),
+                ('zonas', models.BigIntegerField(default=0)),
+                ('zoos', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'contadores_panel',
+            },
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
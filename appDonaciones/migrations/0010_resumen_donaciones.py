@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:45
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+
+def llenar_resumen(apps, schema_editor):
+    Donaciones = apps.get_model('appDonaciones', 'Donaciones')
+    ResumenDonaciones = apps.get_model('appDonaciones', 'ResumenDonaciones')
+    filas = []
+    for granularidad, truncar in (('mes', TruncMonth), ('semana', TruncWeek)):
+        grupos = (
+            Donaciones.objects
+            .annotate(p=truncar('fecha_llegada'), c=Coalesce('donante__ciudad', Value('')))
+            .values('p', 'tipo_alimento', 'destino', 'c')
+            .annotate(kg=Sum('cantidad'), n=Count('id_donacion'))
+            .order_by()
+        )
+        for g in grupos:
+            periodo = g['p'].date() if isinstance(g['p'], datetime.datetime) else g['p']
+            filas.append(ResumenDonaciones(
+                granularidad=granularidad, periodo=periodo, tipo_alimento=g['tipo_alimento'],
+                destino=g['destino'], ciudad=g['c'], total_kg=g['kg'], num_donaciones=g['n'],
+            ))
+    ResumenDonaciones.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0009_contadores_panel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDonaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('mes', 'Mensual'), ('semana', 'Semanal')], max_length=6)),
+                ('periodo', models.DateField()),
+                ('tipo_alimento', models.CharField(max_length=50)),
+                ('destino', models.CharField(max_length=50)),
+                ('ciudad', models.CharField(blank=True, default='', max_length=255)),
+                ('total_kg', models.BigIntegerField(default=0)),
+                ('num_donaciones', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'resumen_donaciones',
+                'constraints': [models.UniqueConstraint(fields=('granularidad', 'periodo', 'tipo_alimento', 'destino', 'ciudad'), name='resumen_donaciones_clave_unica')],
+            },
+        ),
+        migrations.RunPython(llenar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0010_resumen_donaciones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['latitud', 'longitud'], name='donante_lat_lon_idx'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:49
+
+from django.db import migrations, models
+
+TAMANO_LOTE = 2000
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+
+
+def codificar(lat, lon, precision=PRECISION):
+    # Copia de geo.codificar: la migración no debe cambiar si cambia geo.py
+    lat, lon = float(lat), float(lon)
+    rango_lat, rango_lon = [-90.0, 90.0], [-180.0, 180.0]
+    resultado = []
+    bit, valor, par = 0, 0, True
+    while len(resultado) < precision:
+        rango, v = (rango_lon, lon) if par else (rango_lat, lat)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if v >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        par = not par
+        bit += 1
+        if bit == 5:
+            resultado.append(BASE32[valor])
+            bit, valor = 0, 0
+    return ''.join(resultado)
+
+
+def calcular_geohash(apps, schema_editor):
+    for nombre in ('Donante', 'BajoRecursos'):
+        modelo = apps.get_model('appDonaciones', nombre)
+        pendientes = modelo.objects.filter(latitud__isnull=False, longitud__isnull=False).order_by('pk')
+        lote = []
+        for obj in pendientes.only('pk', 'latitud', 'longitud').iterator(chunk_size=TAMANO_LOTE):
+            obj.geohash = codificar(obj.latitud, obj.longitud)
+            lote.append(obj)
+            if len(lote) == TAMANO_LOTE:
+                modelo.objects.bulk_update(lote, ['geohash'])
+                lote = []
+        if lote:
+            modelo.objects.bulk_update(lote, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0011_indice_mapa_donante'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bajorecursos',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='bajorecursos',
+            name='latitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='bajorecursos',
+            name='longitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='donante',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddIndex(
+            model_name='bajorecursos',
+            index=models.Index(fields=['geohash'], name='bajo_recursos_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['estado', 'geohash'], name='donante_estado_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donante',
+            index=models.Index(fields=['geohash'], name='donante_geohash_idx'),
+        ),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+    ]
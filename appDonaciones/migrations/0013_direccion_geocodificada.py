@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0012_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DireccionGeocodificada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255, unique=True)),
+                ('latitud', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitud', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('fuente', models.CharField(blank=True, default='', max_length=50)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'direccion_geocodificada',
+            },
+        ),
+    ]
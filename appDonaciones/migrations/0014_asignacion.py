@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0013_direccion_geocodificada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bajorecursos',
+            name='demanda_kg',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='zoo',
+            name='demanda_kg',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='zoo',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='zoo',
+            name='latitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.AddField(
+            model_name='zoo',
+            name='longitud',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True),
+        ),
+        migrations.CreateModel(
+            name='Asignacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kg', models.PositiveIntegerField()),
+                ('distancia_km', models.FloatField(blank=True, null=True)),
+                ('creada', models.DateTimeField(auto_now_add=True)),
+                ('donacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='appDonaciones.donaciones')),
+                ('zona', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='appDonaciones.bajorecursos')),
+                ('zoo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='appDonaciones.zoo')),
+            ],
+            options={
+                'db_table': 'asignacion',
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('zona__isnull', False), ('zoo__isnull', True)), models.Q(('zona__isnull', True), ('zoo__isnull', False)), _connector='OR'), name='asignacion_un_destino')],
+            },
+        ),
+    ]
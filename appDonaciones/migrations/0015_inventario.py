@@ -0,0 +1,106 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+TAMANO_LOTE = 2000
+
+
+def llenar_inventario(apps, schema_editor):
+    Donaciones = apps.get_model('appDonaciones', 'Donaciones')
+    Asignacion = apps.get_model('appDonaciones', 'Asignacion')
+    MovimientoInventario = apps.get_model('appDonaciones', 'MovimientoInventario')
+    CuentaInventario = apps.get_model('appDonaciones', 'CuentaInventario')
+    CorteInventario = apps.get_model('appDonaciones', 'CorteInventario')
+
+    def guardar(filas):
+        lote = []
+        for fila in filas:
+            lote.append(MovimientoInventario(**fila))
+            if len(lote) == TAMANO_LOTE:
+                MovimientoInventario.objects.bulk_create(lote)
+                lote = []
+        MovimientoInventario.objects.bulk_create(lote)
+
+    donaciones = Donaciones.objects.order_by('pk').values_list(
+        'pk', 'donante__ciudad', 'tipo_alimento', 'cantidad')
+    guardar(
+        dict(ciudad=ciudad or '', tipo_alimento=tipo, kg=cantidad, tipo='entrada', donacion_id=pk)
+        for pk, ciudad, tipo, cantidad in donaciones.iterator(chunk_size=TAMANO_LOTE)
+    )
+    asignaciones = Asignacion.objects.order_by('pk').values_list(
+        'pk', 'donacion_id', 'donacion__donante__ciudad', 'donacion__tipo_alimento', 'kg')
+    guardar(
+        dict(ciudad=ciudad or '', tipo_alimento=tipo, kg=-kg, tipo='salida',
+             donacion_id=donacion_id, asignacion_id=pk)
+        for pk, donacion_id, ciudad, tipo, kg in asignaciones.iterator(chunk_size=TAMANO_LOTE)
+    )
+
+    totales = (
+        MovimientoInventario.objects.values('ciudad', 'tipo_alimento')
+        .annotate(saldo=Sum('kg'), ultimo=Max('id')).order_by()
+    )
+    for t in totales:
+        cuenta = CuentaInventario.objects.create(
+            ciudad=t['ciudad'], tipo_alimento=t['tipo_alimento'],
+            saldo_corte=t['saldo'], hasta_movimiento=t['ultimo'],
+        )
+        CorteInventario.objects.create(cuenta=cuenta, saldo=t['saldo'], hasta_movimiento=t['ultimo'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appDonaciones', '0014_asignacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuentaInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ciudad', models.CharField(blank=True, default='', max_length=255)),
+                ('tipo_alimento', models.CharField(max_length=50)),
+                ('saldo_corte', models.BigIntegerField(default=0)),
+                ('hasta_movimiento', models.BigIntegerField(default=0)),
+                ('movimientos_desde_corte', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'cuenta_inventario',
+                'constraints': [models.UniqueConstraint(fields=('ciudad', 'tipo_alimento'), name='cuenta_inventario_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CorteInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.BigIntegerField()),
+                ('hasta_movimiento', models.BigIntegerField()),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('cuenta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cortes', to='appDonaciones.cuentainventario')),
+            ],
+            options={
+                'db_table': 'corte_inventario',
+                'indexes': [models.Index(fields=['cuenta', 'hasta_movimiento'], name='corte_cuenta_movimiento_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('ciudad', models.CharField(blank=True, default='', max_length=255)),
+                ('tipo_alimento', models.CharField(max_length=50)),
+                ('kg', models.IntegerField()),
+                ('tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida'), ('ajuste', 'Ajuste')], max_length=7)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('asignacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='appDonaciones.asignacion')),
+                ('donacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='appDonaciones.donaciones')),
+            ],
+            options={
+                'db_table': 'movimiento_inventario',
+                'indexes': [models.Index(fields=['ciudad', 'tipo_alimento', 'id'], name='movimiento_cuenta_id_idx')],
+            },
+        ),
+        migrations.RunPython(llenar_inventario, migrations.RunPython.noop),
+    ]
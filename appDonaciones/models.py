@@ -1,24 +1,74 @@
+import datetime
+
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Count, Max, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import geo
 
 # NOTA: He eliminado los modelos 'Auth...' y 'Django...' porque Django ya los maneja internamente.
 # Solo dejamos tus modelos personalizados para evitar conflictos.
 
-class BajoRecursos(models.Model):
+class ConGeohash(models.Model):
+    """Coordenadas con su geohash indexado (ver geo.py), recalculado al guardar."""
+    latitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=geo.PRECISION, blank=True, default='', editable=False)
+
+    class Meta:
+        abstract = True
+
+    def actualizar_geohash(self):
+        self.geohash = geo.codificar(self.latitud, self.longitud)
+
+    def save(self, *args, **kwargs):
+        self.actualizar_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitud', 'longitud'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+
+class BajoRecursos(ConGeohash):
     id_bajo = models.AutoField(primary_key=True)
     ciudad = models.CharField(max_length=50)
     donacion = models.CharField(max_length=50)
+    # Kg que la zona puede recibir (los usa el motor de asignación)
+    demanda_kg = models.PositiveIntegerField(default=0)
 
     class Meta:
         managed = True  # <--- CAMBIO IMPORTANTE: True para que se cree en Render
         db_table = 'bajo_recursos'
+        indexes = [
+            models.Index(fields=['geohash'], name='bajo_recursos_geohash_idx'),
+        ]
     
     def __str__(self):
         return self.ciudad
 
+    def donantes_cercanos(self, radio_km=20, estado='activo'):
+        """Donantes (activos por defecto) a menos de radio_km, con su distancia en km."""
+        if not self.geohash:
+            return []
+        donantes = Donante.objects.all()
+        if estado:
+            donantes = donantes.filter(estado=estado)
+        return geo.en_radio(donantes, self.latitud, self.longitud, radio_km)
+
 class Donaciones(models.Model):
     id_donacion = models.AutoField(primary_key=True)
-    donante = models.CharField(db_column='Donante', max_length=255)
+    # FK real al donante (indexada). Reemplaza la antigua unión por ciudad.
+    donante = models.ForeignKey(
+        'Donante',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_column='id_donante',
+        related_name='donaciones',
+    )
+    # Valor de texto histórico (antes se guardaba la ciudad del donante aquí)
+    donante_texto = models.CharField(db_column='Donante', max_length=255, blank=True, default='')
     cantidad = models.IntegerField()
     fecha_llegada = models.DateField()
     tipo_alimento = models.CharField(max_length=50)
@@ -27,11 +77,33 @@ class Donaciones(models.Model):
     class Meta:
         managed = True  # <--- CAMBIO IMPORTANTE
         db_table = 'donaciones'
+        indexes = [
+            # Historial de un donante ordenado por fecha
+            models.Index(fields=['donante', 'fecha_llegada'], name='donaciones_donante_fecha_idx'),
+            # Clave de la paginación por cursor del listado
+            models.Index(fields=['fecha_llegada', 'id_donacion'], name='donaciones_fecha_id_idx'),
+        ]
 
     def __str__(self):
-        return f"Donación #{self.id_donacion} de {self.donante}"
+        return f"Donación #{self.id_donacion} de {self.nombre_donante}"
+
+    @property
+    def nombre_donante(self):
+        if self.donante_id is not None:
+            return str(self.donante)
+        return self.donante_texto
 
-class Donante(models.Model):
+class DonanteQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Anota cantidad de donaciones, kg totales y última fecha en un solo GROUP BY."""
+        return self.annotate(
+            num_donaciones=Count('donaciones'),
+            kg_donados=Coalesce(Sum('donaciones__cantidad'), Value(0)),
+            ultima_donacion=Max('donaciones__fecha_llegada'),
+        )
+
+
+class Donante(ConGeohash):
     TIPO_DONANTE_CHOICES = [
         ('individual', 'Individual'),
         ('empresa', 'Empresa'),
@@ -59,7 +131,7 @@ class Donante(models.Model):
     direccion = models.TextField(blank=True, null=True)
     telefono = models.CharField(max_length=20, blank=True, null=True)
     email = models.CharField(max_length=255, blank=True, null=True)
-    fecha_registro = models.DateField(blank=True, null=True)
+    fecha_registro = models.DateField(default=datetime.date.today, blank=True)
     
     estado = models.CharField(
         max_length=10, 
@@ -69,34 +141,271 @@ class Donante(models.Model):
     )
     notas = models.TextField(blank=True, null=True)
     
-    # Campos para el mapa (opcionales por si los agregaste antes)
-    latitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
-    longitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # latitud, longitud y geohash vienen de ConGeohash (campos del mapa)
+
+    objects = DonanteQuerySet.as_manager()
 
     class Meta:
         managed = True  # <--- CAMBIO IMPORTANTE
         db_table = 'donante'
+        indexes = [
+            # Clave de la paginación por cursor del listado
+            models.Index(fields=['fecha_registro', 'id_donante'], name='donante_registro_id_idx'),
+            # Filtros del listado, seguidos de la clave de paginación
+            models.Index(fields=['tipo_donante', 'fecha_registro', 'id_donante'], name='donante_tipo_registro_idx'),
+            models.Index(fields=['estado', 'fecha_registro', 'id_donante'], name='donante_estado_registro_idx'),
+            models.Index(fields=['ciudad', 'fecha_registro', 'id_donante'], name='donante_ciudad_registro_idx'),
+            # Consultas por caja (bbox) del mapa
+            models.Index(fields=['latitud', 'longitud'], name='donante_lat_lon_idx'),
+            # Búsquedas de cercanía por prefijo de geohash
+            models.Index(fields=['estado', 'geohash'], name='donante_estado_geohash_idx'),
+            models.Index(fields=['geohash'], name='donante_geohash_idx'),
+        ]
 
     def __str__(self):
         return self.nombre or self.ciudad
 
+    def zonas_cercanas(self, k=1):
+        """Las k zonas de bajos recursos más cercanas, con su distancia en km."""
+        if not self.geohash:
+            return []
+        return geo.mas_cercanos(BajoRecursos.objects.all(), self.latitud, self.longitud, k)
+
+    # Si la instancia viene de with_stats() se usan las anotaciones y no hay consulta extra
     def total_donaciones(self):
-        return Donaciones.objects.filter(donante=self.ciudad).count()
+        if hasattr(self, 'num_donaciones'):
+            return self.num_donaciones
+        return self.donaciones.count()
 
     def cantidad_total_donada(self):
-        total = Donaciones.objects.filter(donante=self.ciudad).aggregate(Sum('cantidad'))
+        if hasattr(self, 'kg_donados'):
+            return self.kg_donados
+        total = self.donaciones.aggregate(Sum('cantidad'))
         return total['cantidad__sum'] or 0
 
-class Zoo(models.Model):
+class Zoo(ConGeohash):
     id_zoo = models.AutoField(primary_key=True)
     animales = models.CharField(max_length=255)
     trabajadores = models.CharField(max_length=255)
     tipo_animal = models.CharField(max_length=50)
     donacion = models.CharField(max_length=50)
+    # Kg que el zoo puede recibir (los usa el motor de asignación)
+    demanda_kg = models.PositiveIntegerField(default=0)
 
     class Meta:
         managed = True  # <--- CAMBIO IMPORTANTE
         db_table = 'zoo'
         
     def __str__(self):
-        return f"Zoo: {self.animales}"
\ No newline at end of file
+        return f"Zoo: {self.animales}"
+
+class Asignacion(models.Model):
+    """Kg de una donación destinados a una zona o a un zoo (ver asignacion.py).
+
+    Una donación puede repartirse en varias asignaciones; lo pendiente es
+    su cantidad menos la suma de sus asignaciones.
+    """
+    donacion = models.ForeignKey(Donaciones, on_delete=models.CASCADE, related_name='asignaciones')
+    zona = models.ForeignKey(BajoRecursos, on_delete=models.CASCADE, null=True, blank=True, related_name='asignaciones')
+    zoo = models.ForeignKey(Zoo, on_delete=models.CASCADE, null=True, blank=True, related_name='asignaciones')
+    kg = models.PositiveIntegerField()
+    distancia_km = models.FloatField(null=True, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'asignacion'
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(zona__isnull=False, zoo__isnull=True)
+                    | models.Q(zona__isnull=True, zoo__isnull=False)
+                ),
+                name='asignacion_un_destino',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kg} kg de la donación {self.donacion_id} -> {self.zona or self.zoo}"
+
+
+class CorreoPendiente(models.Model):
+    """Bandeja de salida: correos que el comando 'enviar_correos' despacha fuera del request."""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    destinatario = models.CharField(max_length=254)
+    asunto = models.CharField(max_length=255)
+    cuerpo_texto = models.TextField()
+    cuerpo_html = models.TextField(blank=True, default='')
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, default='')
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'correo_pendiente'
+        indexes = [
+            # El worker busca pendientes cuyo próximo intento ya venció
+            models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_intento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} -> {self.destinatario} ({self.estado})"
+
+
+class ContadoresPanel(models.Model):
+    """Fila única con los totales del panel de inicio, mantenida por señales (ver contadores.py)."""
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    donaciones = models.BigIntegerField(default=0)
+    donantes = models.BigIntegerField(default=0)
+    zonas = models.BigIntegerField(default=0)
+    zoos = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'contadores_panel'
+
+    def __str__(self):
+        return 'Contadores del panel'
+
+
+class ResumenDonaciones(models.Model):
+    """Totales de donaciones por periodo, tipo de alimento, destino y ciudad del donante.
+
+    Se mantiene de forma incremental por señales (ver resumen.py) y se puede
+    reconstruir con 'reconstruir_resumen'.
+    """
+    GRANULARIDAD_CHOICES = [
+        ('mes', 'Mensual'),
+        ('semana', 'Semanal'),
+    ]
+
+    granularidad = models.CharField(max_length=6, choices=GRANULARIDAD_CHOICES)
+    # Primer día del periodo (día 1 del mes o lunes de la semana)
+    periodo = models.DateField()
+    tipo_alimento = models.CharField(max_length=50)
+    destino = models.CharField(max_length=50)
+    ciudad = models.CharField(max_length=255, blank=True, default='')
+    total_kg = models.BigIntegerField(default=0)
+    num_donaciones = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'resumen_donaciones'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularidad', 'periodo', 'tipo_alimento', 'destino', 'ciudad'],
+                name='resumen_donaciones_clave_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularidad} {self.periodo}: {self.tipo_alimento} / {self.destino} / {self.ciudad}"
+
+
+class DireccionGeocodificada(models.Model):
+    """Caché persistente del geocodificador: una fila por dirección normalizada.
+
+    Si no se encontró la dirección se guarda igual, con coordenadas nulas,
+    para no volver a consultarla.
+    """
+    clave = models.CharField(max_length=255, unique=True)
+    latitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitud = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    fuente = models.CharField(max_length=50, blank=True, default='')
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'direccion_geocodificada'
+
+    def __str__(self):
+        return self.clave
+
+
+class MovimientoInventario(models.Model):
+    """Libro de inventario: solo se agregan filas, nunca se editan ni borran.
+
+    kg es positivo para entradas y negativo para salidas; las correcciones
+    (una donación editada o borrada) son ajustes que compensan lo anterior.
+    """
+    TIPO_CHOICES = [
+        ('entrada', 'Entrada'),
+        ('salida', 'Salida'),
+        ('ajuste', 'Ajuste'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    ciudad = models.CharField(max_length=255, blank=True, default='')
+    tipo_alimento = models.CharField(max_length=50)
+    kg = models.IntegerField()
+    tipo = models.CharField(max_length=7, choices=TIPO_CHOICES)
+    donacion = models.ForeignKey(
+        Donaciones, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos',
+    )
+    asignacion = models.ForeignKey(
+        Asignacion, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos',
+    )
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'movimiento_inventario'
+        indexes = [
+            # El saldo suma la cola posterior al último corte de cada cuenta
+            models.Index(fields=['ciudad', 'tipo_alimento', 'id'], name='movimiento_cuenta_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.kg} kg {self.tipo_alimento} ({self.ciudad or 'sin ciudad'})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Los movimientos de inventario no se modifican; registre un ajuste.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Los movimientos de inventario no se borran; registre un ajuste.')
+
+
+class CuentaInventario(models.Model):
+    """Una fila por (ciudad, tipo_alimento) con su último corte de saldo.
+
+    Toda escritura en el libro bloquea antes esta fila (SELECT ... FOR UPDATE),
+    así las salidas concurrentes no pueden dejar el saldo negativo y los
+    cortes no se saltan movimientos aún sin confirmar.
+    """
+    ciudad = models.CharField(max_length=255, blank=True, default='')
+    tipo_alimento = models.CharField(max_length=50)
+    # Saldo al último corte: incluye los movimientos con id <= hasta_movimiento
+    saldo_corte = models.BigIntegerField(default=0)
+    hasta_movimiento = models.BigIntegerField(default=0)
+    movimientos_desde_corte = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'cuenta_inventario'
+        constraints = [
+            models.UniqueConstraint(fields=['ciudad', 'tipo_alimento'], name='cuenta_inventario_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo_alimento} en {self.ciudad or 'sin ciudad'}"
+
+
+class CorteInventario(models.Model):
+    """Historial de cortes de saldo (el último también queda en CuentaInventario)."""
+    cuenta = models.ForeignKey(CuentaInventario, on_delete=models.CASCADE, related_name='cortes')
+    saldo = models.BigIntegerField()
+    hasta_movimiento = models.BigIntegerField()
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'corte_inventario'
+        indexes = [
+            models.Index(fields=['cuenta', 'hasta_movimiento'], name='corte_cuenta_movimiento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cuenta}: {self.saldo} kg al movimiento {self.hasta_movimiento}"
@@ -0,0 +1,165 @@
+"""Paginación por cursor (keyset) para las vistas de listado.
+
+En lugar de OFFSET se filtra por la clave de orden del último registro visto,
+así el costo de cada página es constante sin importar qué tan profundo se vaya.
+"""
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+
+TAMANO_PAGINA = 50
+
+
+def _codificar(valores):
+    datos = json.dumps(valores, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(datos).decode().rstrip('=')
+
+
+def _decodificar(token, modelo, nombres):
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(nombres):
+        return None
+    try:
+        return [modelo._meta.get_field(n).to_python(v) for n, v in zip(nombres, valores)]
+    except Exception:
+        return None
+
+
+def _filtro_keyset(campos, valores, hacia_adelante):
+    """Construye (a > x) OR (a = x AND b > y) ... según la dirección de cada campo."""
+    condicion = Q()
+    iguales = Q()
+    for campo, valor in zip(campos, valores):
+        nombre = campo.lstrip('-')
+        descendente = campo.startswith('-')
+        # Avanzar en un campo descendente significa ir hacia valores menores
+        lookup = 'lt' if descendente == hacia_adelante else 'gt'
+        condicion |= iguales & Q(**{f'{nombre}__{lookup}': valor})
+        iguales &= Q(**{nombre: valor})
+    return condicion
+
+
+def _invertir(campos):
+    return [c[1:] if c.startswith('-') else f'-{c}' for c in campos]
+
+
+class PaginaKeyset:
+    def __init__(self, objetos, request, cursor_siguiente=None, cursor_anterior=None):
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self._request = request
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    def _query(self, parametro, cursor):
+        # Conserva el resto de los parámetros GET (filtros, búsqueda...)
+        params = self._request.GET.copy()
+        params.pop('despues', None)
+        params.pop('antes', None)
+        params[parametro] = cursor
+        return params.urlencode()
+
+    @property
+    def query_siguiente(self):
+        return self._query('despues', self.cursor_siguiente) if self.tiene_siguiente else ''
+
+    @property
+    def query_anterior(self):
+        return self._query('antes', self.cursor_anterior) if self.tiene_anterior else ''
+
+
+def paginar(request, queryset, campos, tamano=TAMANO_PAGINA):
+    """Devuelve una PaginaKeyset de `queryset` ordenado por `campos`.
+
+    `campos` debe terminar en una columna única (la PK) para que el orden sea
+    total, p. ej. ('-fecha_llegada', '-id_donacion'). Los cursores viajan en
+    los parámetros GET 'despues' y 'antes'. Acepta también querysets de
+    values() que incluyan esos campos.
+    """
+    modelo = queryset.model
+    nombres = [c.lstrip('-') for c in campos]
+
+    def clave(obj):
+        if isinstance(obj, dict):
+            return _codificar([obj[n] for n in nombres])
+        return _codificar([getattr(obj, n) for n in nombres])
+
+    despues = request.GET.get('despues')
+    antes = request.GET.get('antes')
+    valores_despues = _decodificar(despues, modelo, nombres) if despues else None
+    valores_antes = _decodificar(antes, modelo, nombres) if antes else None
+
+    if valores_antes is not None:
+        qs = queryset.filter(_filtro_keyset(campos, valores_antes, hacia_adelante=False))
+        filas = list(qs.order_by(*_invertir(campos))[:tamano + 1])
+        hay_mas = len(filas) > tamano
+        filas = filas[:tamano][::-1]
+        return PaginaKeyset(
+            filas, request,
+            cursor_siguiente=clave(filas[-1]) if filas else None,
+            cursor_anterior=clave(filas[0]) if hay_mas else None,
+        )
+
+    if valores_despues is not None:
+        queryset = queryset.filter(_filtro_keyset(campos, valores_despues, hacia_adelante=True))
+    filas = list(queryset.order_by(*campos)[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    return PaginaKeyset(
+        filas, request,
+        cursor_siguiente=clave(filas[-1]) if hay_mas else None,
+        cursor_anterior=clave(filas[0]) if (valores_despues is not None and filas) else None,
+    )
+
+
+class PaginaNumerada(PaginaKeyset):
+    """Paginación por número de página, para resultados ordenados por relevancia.
+
+    Se usa solo en búsquedas, donde la clave de orden (el rank) no es estable
+    entre consultas; por eso se limita a MAX_PAGINAS_BUSQUEDA páginas.
+    """
+
+    def __init__(self, objetos, request, numero, hay_mas):
+        siguiente = str(numero + 1) if hay_mas else None
+        anterior = str(numero - 1) if numero > 1 else None
+        super().__init__(objetos, request, siguiente, anterior)
+        self.numero = numero
+
+    def _query(self, parametro, cursor):
+        params = self._request.GET.copy()
+        params['pagina'] = cursor
+        return params.urlencode()
+
+
+MAX_PAGINAS_BUSQUEDA = 20
+
+
+def paginar_por_numero(request, queryset, tamano=TAMANO_PAGINA):
+    try:
+        numero = int(request.GET.get('pagina', 1))
+    except ValueError:
+        numero = 1
+    numero = min(max(numero, 1), MAX_PAGINAS_BUSQUEDA)
+    inicio = (numero - 1) * tamano
+    filas = list(queryset[inicio:inicio + tamano + 1])
+    hay_mas = len(filas) > tamano and numero < MAX_PAGINAS_BUSQUEDA
+    return PaginaNumerada(filas[:tamano], request, numero, hay_mas)
@@ -0,0 +1,172 @@
+"""Tabla de resumen (rollup) de donaciones por periodo.
+
+Cada donación aporta a dos filas de ResumenDonaciones (su mes y su semana).
+Las señales aplican la diferencia al guardar o borrar con expresiones F(), y
+'reconstruir_resumen' recalcula todo con un único GROUP BY por granularidad.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+from .models import Donaciones, ResumenDonaciones
+
+TRUNCADORES = {
+    'mes': TruncMonth,
+    'semana': TruncWeek,
+}
+
+
+def inicio_periodo(fecha, granularidad):
+    # Igual que TruncMonth / TruncWeek (semanas ISO, empiezan el lunes)
+    if granularidad == 'mes':
+        return fecha.replace(day=1)
+    return fecha - datetime.timedelta(days=fecha.weekday())
+
+
+def aportes(tipo_alimento, destino, ciudad, fecha, cantidad, signo=1):
+    """Las claves de resumen que toca una donación, con su aporte (kg, cantidad)."""
+    for granularidad in TRUNCADORES:
+        clave = (granularidad, inicio_periodo(fecha, granularidad), tipo_alimento, destino, ciudad or '')
+        yield clave, signo * cantidad, signo
+
+
+def aportes_de(donacion, signo=1):
+    ciudad = donacion.donante.ciudad if donacion.donante_id else ''
+    return aportes(
+        donacion.tipo_alimento, donacion.destino, ciudad,
+        donacion.fecha_llegada, donacion.cantidad, signo,
+    )
+
+
+def _aplicar(clave, kg, n):
+    granularidad, periodo, tipo_alimento, destino, ciudad = clave
+    filtro = dict(
+        granularidad=granularidad, periodo=periodo, tipo_alimento=tipo_alimento,
+        destino=destino, ciudad=ciudad,
+    )
+    cambios = dict(total_kg=F('total_kg') + kg, num_donaciones=F('num_donaciones') + n)
+    if ResumenDonaciones.objects.filter(**filtro).update(**cambios):
+        return
+    try:
+        # La fila no existía; si otro proceso la crea a la vez, se reintenta el UPDATE
+        with transaction.atomic():
+            ResumenDonaciones.objects.create(total_kg=kg, num_donaciones=n, **filtro)
+    except IntegrityError:
+        ResumenDonaciones.objects.filter(**filtro).update(**cambios)
+
+
+def _aplicar_en_bloque(totales):
+    """Para lotes grandes: una lectura para ubicar las filas existentes, UPDATE por id y bulk_create del resto."""
+    existentes = dict(
+        (clave[:5], clave[5])
+        for clave in ResumenDonaciones.objects.filter(
+            granularidad__in={c[0] for c in totales},
+            periodo__in={c[1] for c in totales},
+            tipo_alimento__in={c[2] for c in totales},
+        ).values_list('granularidad', 'periodo', 'tipo_alimento', 'destino', 'ciudad', 'pk')
+    )
+    nuevas, incrementos = [], []
+    for clave, (kg, n) in totales.items():
+        pk = existentes.get(clave)
+        if pk is None:
+            nuevas.append((clave, kg, n))
+        else:
+            incrementos.append((kg, n, pk))
+    tabla = connection.ops.quote_name(ResumenDonaciones._meta.db_table)
+    with transaction.atomic():
+        # Mismo UPDATE relativo que _aplicar, pero un solo executemany en lugar de una consulta ORM por fila
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {tabla} SET total_kg = total_kg + %s, num_donaciones = num_donaciones + %s WHERE id = %s',
+                incrementos,
+            )
+        try:
+            with transaction.atomic():
+                ResumenDonaciones.objects.bulk_create([
+                    ResumenDonaciones(
+                        granularidad=clave[0], periodo=clave[1], tipo_alimento=clave[2], destino=clave[3],
+                        ciudad=clave[4], total_kg=kg, num_donaciones=n,
+                    )
+                    for clave, kg, n in nuevas
+                ], batch_size=500)
+        except IntegrityError:
+            # Otro proceso creó alguna a la vez: esas van clave por clave
+            for clave, kg, n in nuevas:
+                _aplicar(clave, kg, n)
+
+
+# Claves distintas a partir de las cuales conviene escribir en bloque
+UMBRAL_EN_BLOQUE = 50
+
+
+def aplicar_aportes(lista):
+    """Agrupa los aportes por clave y aplica un UPDATE por clave distinta (o en bloque si son muchas)."""
+    totales = defaultdict(lambda: [0, 0])
+    for clave, kg, n in lista:
+        totales[clave][0] += kg
+        totales[clave][1] += n
+    totales = {clave: (kg, n) for clave, (kg, n) in totales.items() if kg or n}
+    if len(totales) >= UMBRAL_EN_BLOQUE:
+        _aplicar_en_bloque(totales)
+        return
+    for clave, (kg, n) in totales.items():
+        _aplicar(clave, kg, n)
+
+
+def reconstruir():
+    """Recalcula el resumen completo desde Donaciones."""
+    filas = []
+    for granularidad, truncar in TRUNCADORES.items():
+        grupos = (
+            Donaciones.objects
+            .annotate(p=truncar('fecha_llegada'), c=Coalesce('donante__ciudad', Value('')))
+            .values('p', 'tipo_alimento', 'destino', 'c')
+            .annotate(kg=Sum('cantidad'), n=Count('id_donacion'))
+            .order_by()
+        )
+        for g in grupos:
+            periodo = g['p'].date() if isinstance(g['p'], datetime.datetime) else g['p']
+            filas.append(ResumenDonaciones(
+                granularidad=granularidad, periodo=periodo, tipo_alimento=g['tipo_alimento'],
+                destino=g['destino'], ciudad=g['c'], total_kg=g['kg'], num_donaciones=g['n'],
+            ))
+    with transaction.atomic():
+        ResumenDonaciones.objects.all().delete()
+        ResumenDonaciones.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+DIMENSIONES = ('tipo_alimento', 'destino', 'ciudad')
+
+
+def series(granularidad='mes', dimension='tipo_alimento', desde=None, hasta=None, **filtros):
+    """Totales por periodo y valor de la dimensión, leídos solo de la tabla de resumen.
+
+    'filtros' acepta tipo_alimento, destino y ciudad (valores exactos).
+    """
+    qs = ResumenDonaciones.objects.filter(granularidad=granularidad)
+    if desde:
+        qs = qs.filter(periodo__gte=inicio_periodo(desde, granularidad))
+    if hasta:
+        qs = qs.filter(periodo__lte=hasta)
+    qs = qs.filter(**{campo: valor for campo, valor in filtros.items() if campo in DIMENSIONES and valor})
+    return list(
+        qs.values('periodo', dimension)
+        .annotate(total_kg=Sum('total_kg'), num_donaciones=Sum('num_donaciones'))
+        .order_by('periodo', dimension)
+    )
+
+
+def mover_ciudad(donante_id, ciudad_anterior, ciudad_nueva):
+    """Pasa los aportes de las donaciones de un donante de una ciudad a otra."""
+    filas = Donaciones.objects.filter(donante_id=donante_id).values_list(
+        'tipo_alimento', 'destino', 'fecha_llegada', 'cantidad',
+    )
+    lista = []
+    for tipo_alimento, destino, fecha, cantidad in filas.iterator():
+        lista.extend(aportes(tipo_alimento, destino, ciudad_anterior, fecha, cantidad, signo=-1))
+        lista.extend(aportes(tipo_alimento, destino, ciudad_nueva, fecha, cantidad))
+    aplicar_aportes(lista)
@@ -0,0 +1,141 @@
+"""Datos de prueba deterministas: donantes, donaciones, zonas y zoos.
+
+Con la misma semilla se generan siempre los mismos valores. Todo se inserta
+con bulk_create en lotes (cada lote en su transacción) y se avisa con
+creados_en_lote, así contadores, índice de búsqueda, resumen e inventario
+quedan igual que con altas normales.
+"""
+import datetime
+import random
+
+from django.db import transaction
+
+from .choice import CIUDADES_CHILE, TIPOS_ALIMENTO, TIPOS_ANIMAL
+from .forms import DonacionesForm
+from .geocodificacion import NOMENCLATOR_CHILE, normalizar
+from .models import BajoRecursos, Donaciones, Donante, Zoo
+from .signals import creados_en_lote
+
+TAMANO_LOTE = 1000
+FECHA_BASE = datetime.date(2025, 1, 1)
+# Dispersión de las coordenadas alrededor del centro de la ciudad, en grados
+DISPERSION = 0.15
+
+CIUDADES = [valor for valor, _ in CIUDADES_CHILE if valor]
+ALIMENTOS = [valor for valor, _ in TIPOS_ALIMENTO if valor]
+ANIMALES = [valor for valor, _ in TIPOS_ANIMAL if valor]
+DESTINOS = [valor for valor, _ in DonacionesForm.DESTINO_CHOICES if valor]
+
+
+def _coordenadas(azar, ciudad):
+    lat, lon = NOMENCLATOR_CHILE[normalizar(ciudad)]
+    return (
+        round(lat + azar.uniform(-DISPERSION, DISPERSION), 6),
+        round(lon + azar.uniform(-DISPERSION, DISPERSION), 6),
+    )
+
+
+def _insertar(modelo, objetos, tamano_lote):
+    guardados = []
+    for inicio in range(0, len(objetos), tamano_lote):
+        lote = objetos[inicio:inicio + tamano_lote]
+        with transaction.atomic():
+            lote = modelo.objects.bulk_create(lote)
+            if lote and lote[0].pk is None:
+                # MySQL no devuelve los ids de bulk_create: son los últimos insertados
+                ids = modelo.objects.order_by('-pk').values_list('pk', flat=True)[:len(lote)]
+                for objeto, pk in zip(lote, reversed(ids)):
+                    objeto.pk = pk
+            creados_en_lote.send(sender=modelo, objetos=lote)
+        guardados.extend(lote)
+    return guardados
+
+
+def _donantes(azar, cantidad, desde):
+    objetos = []
+    for i in range(desde, desde + cantidad):
+        ciudad = azar.choice(CIUDADES)
+        latitud, longitud = _coordenadas(azar, ciudad)
+        donante = Donante(
+            nombre=f'Donante {i}',
+            tipo_donante=azar.choice(Donante.TIPO_DONANTE_CHOICES)[0],
+            ciudad=ciudad,
+            direccion=f'Calle {azar.randint(1, 300)} #{azar.randint(100, 9999)}',
+            telefono=f'+569{azar.randint(10000000, 99999999)}',
+            email=f'donante{i}@ejemplo.cl',
+            fecha_registro=FECHA_BASE - datetime.timedelta(days=azar.randint(0, 730)),
+            estado=azar.choices(['activo', 'inactivo', 'suspendido'], weights=[8, 1, 1])[0],
+            latitud=latitud,
+            longitud=longitud,
+        )
+        # bulk_create no pasa por save()
+        donante.actualizar_geohash()
+        objetos.append(donante)
+    return objetos
+
+
+def _donaciones(azar, cantidad, donantes):
+    return [
+        Donaciones(
+            donante=azar.choice(donantes),
+            cantidad=azar.randint(1, 500),
+            fecha_llegada=FECHA_BASE + datetime.timedelta(days=azar.randint(0, 364)),
+            tipo_alimento=azar.choice(ALIMENTOS),
+            destino=azar.choice(DESTINOS),
+        )
+        for _ in range(cantidad)
+    ]
+
+
+def _zonas(azar, cantidad, donaciones):
+    objetos = []
+    for _ in range(cantidad):
+        ciudad = azar.choice(CIUDADES)
+        latitud, longitud = _coordenadas(azar, ciudad)
+        zona = BajoRecursos(
+            ciudad=ciudad, donacion=azar.choice(donaciones), demanda_kg=azar.randint(100, 5000),
+            latitud=latitud, longitud=longitud,
+        )
+        zona.actualizar_geohash()
+        objetos.append(zona)
+    return objetos
+
+
+def _zoos(azar, cantidad, desde, donaciones):
+    objetos = []
+    for i in range(desde, desde + cantidad):
+        latitud, longitud = _coordenadas(azar, azar.choice(CIUDADES))
+        zoo = Zoo(
+            animales=f'Recinto {i}', trabajadores=f'Cuidador {i}', tipo_animal=azar.choice(ANIMALES),
+            donacion=azar.choice(donaciones), demanda_kg=azar.randint(100, 5000),
+            latitud=latitud, longitud=longitud,
+        )
+        zoo.actualizar_geohash()
+        objetos.append(zoo)
+    return objetos
+
+
+def sembrar(donantes=0, donaciones=0, zonas=0, zoos=0, semilla=1, tamano_lote=TAMANO_LOTE):
+    """Crea los registros pedidos y devuelve cuántos de cada tipo.
+
+    Las donaciones se reparten entre los donantes nuevos (o, si no se piden
+    donantes, entre los existentes). Nombres y emails siguen numerando desde
+    los registros que ya existen.
+    """
+    azar = random.Random(semilla)
+    nuevos = _insertar(Donante, _donantes(azar, donantes, Donante.objects.count()), tamano_lote)
+    nuevas = []
+    if donaciones:
+        destinatarios = nuevos or list(Donante.objects.only('pk', 'ciudad'))
+        if not destinatarios:
+            raise ValueError('No hay donantes a quienes asignar las donaciones.')
+        nuevas = _insertar(Donaciones, _donaciones(azar, donaciones, destinatarios), tamano_lote)
+    if zonas or zoos:
+        # Zonas y zoos guardan el id de una donación como texto (ver BajoRecursosForm)
+        ids = [d.pk for d in nuevas] or list(Donaciones.objects.values_list('pk', flat=True)[:1000])
+        if not ids:
+            raise ValueError('No hay donaciones para asociar a las zonas y zoos.')
+        ids = [str(pk) for pk in ids]
+        _insertar(BajoRecursos, _zonas(azar, zonas, ids), tamano_lote)
+        _insertar(Zoo, _zoos(azar, zoos, Zoo.objects.count(), ids), tamano_lote)
+    return {'donantes': donantes, 'donaciones': donaciones, 'zonas': zonas, 'zoos': zoos}
@@ -0,0 +1,149 @@
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import cache, contadores, inventario, resumen
+from .busqueda import desindexar_donantes, indexar_donantes
+from .models import BajoRecursos, Donaciones, Donante, Zoo
+
+# bulk_create no dispara post_save: quien inserte en lote envía esta señal
+# con sender=<modelo> y objetos=<lista de instancias ya guardadas>.
+creados_en_lote = Signal()
+
+
+def guardar_en_lote(modelo, objetos, batch_size=None):
+    """Inserta `objetos` con bulk_create y envía creados_en_lote; devuelve los objetos con su pk.
+
+    Si el motor no devuelve los ids de un INSERT múltiple (MySQL), se guardan
+    uno por uno con save(): las entradas de inventario, el índice de búsqueda
+    y el resumen necesitan el pk, y los post_save hacen lo mismo que la señal.
+    Llamar dentro de una transacción.
+    """
+    if connections[router.db_for_write(modelo)].features.can_return_rows_from_bulk_insert:
+        objetos = modelo.objects.bulk_create(objetos, batch_size=batch_size)
+        creados_en_lote.send(sender=modelo, objetos=objetos)
+        return objetos
+    for objeto in objetos:
+        objeto.save(force_insert=True)
+    return objetos
+
+
+@receiver(post_save, sender=Donante)
+def indexar_donante(sender, instance, raw=False, **kwargs):
+    if not raw:
+        indexar_donantes([instance])
+
+
+@receiver(post_delete, sender=Donante)
+def desindexar_donante(sender, instance, **kwargs):
+    desindexar_donantes([instance.pk])
+
+
+@receiver(post_save, sender=Donaciones)
+@receiver(post_save, sender=Donante)
+@receiver(post_save, sender=BajoRecursos)
+@receiver(post_save, sender=Zoo)
+def contar_alta(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        contadores.incrementar(sender)
+
+
+@receiver(post_delete, sender=Donaciones)
+@receiver(post_delete, sender=Donante)
+@receiver(post_delete, sender=BajoRecursos)
+@receiver(post_delete, sender=Zoo)
+def contar_baja(sender, instance, **kwargs):
+    contadores.incrementar(sender, -1)
+
+
+@receiver(post_save, sender=Donaciones)
+@receiver(post_save, sender=Donante)
+@receiver(post_save, sender=BajoRecursos)
+@receiver(post_save, sender=Zoo)
+@receiver(post_delete, sender=Donaciones)
+@receiver(post_delete, sender=Donante)
+@receiver(post_delete, sender=BajoRecursos)
+@receiver(post_delete, sender=Zoo)
+def invalidar_cache(sender, **kwargs):
+    # Tras el commit: si se invalida antes, un GET concurrente puede guardar la
+    # página vieja bajo la generación nueva y servirla hasta que expire
+    transaction.on_commit(lambda: cache.invalidar(sender))
+
+
+@receiver(creados_en_lote)
+def procesar_lote(sender, objetos, **kwargs):
+    if not objetos:
+        return
+    contadores.incrementar(sender, len(objetos))
+    transaction.on_commit(lambda: cache.invalidar(sender))
+    if sender is Donante:
+        indexar_donantes(objetos, nuevos=True)
+    if sender is Donaciones:
+        resumen.aplicar_aportes(a for d in objetos for a in resumen.aportes_de(d))
+        inventario.registrar(inventario.entradas_de(objetos))
+
+
+# --- Resumen de donaciones ---
+
+@receiver(pre_save, sender=Donaciones)
+def recordar_donacion_anterior(sender, instance, raw=False, **kwargs):
+    # Solo en ediciones: hay que restar lo que aportaba antes del cambio
+    instance._aportes_anteriores = []
+    if raw or instance.pk is None:
+        return
+    anterior = (
+        Donaciones.objects.filter(pk=instance.pk)
+        .values_list('tipo_alimento', 'destino', 'donante__ciudad', 'fecha_llegada', 'cantidad')
+        .first()
+    )
+    if anterior:
+        instance._aportes_anteriores = list(resumen.aportes(*anterior, signo=-1))
+
+
+@receiver(post_save, sender=Donaciones)
+def actualizar_resumen(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    anteriores = getattr(instance, '_aportes_anteriores', [])
+    resumen.aplicar_aportes(anteriores + list(resumen.aportes_de(instance)))
+
+
+@receiver(post_delete, sender=Donaciones)
+def descontar_resumen(sender, instance, **kwargs):
+    resumen.aplicar_aportes(resumen.aportes_de(instance, signo=-1))
+
+
+@receiver(pre_save, sender=Donante)
+def recordar_ciudad_anterior(sender, instance, raw=False, **kwargs):
+    instance._ciudad_anterior = None
+    if not raw and instance.pk is not None:
+        instance._ciudad_anterior = (
+            Donante.objects.filter(pk=instance.pk).values_list('ciudad', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Donante)
+def mover_resumen_de_ciudad(sender, instance, raw=False, **kwargs):
+    anterior = getattr(instance, '_ciudad_anterior', None)
+    if not raw and anterior is not None and anterior != instance.ciudad:
+        resumen.mover_ciudad(instance.pk, anterior, instance.ciudad)
+
+
+@receiver(pre_delete, sender=Donante)
+def soltar_resumen_de_ciudad(sender, instance, **kwargs):
+    # Las donaciones quedan sin donante (SET_NULL) y por tanto sin ciudad
+    resumen.mover_ciudad(instance.pk, instance.ciudad, '')
+
+
+# --- Inventario ---
+
+@receiver(post_save, sender=Donaciones)
+def registrar_en_inventario(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        inventario.registrar_donacion(instance, created)
+
+
+@receiver(pre_delete, sender=Donaciones)
+def retirar_de_inventario(sender, instance, **kwargs):
+    # Antes del borrado: después sus movimientos ya no apuntan a la donación
+    inventario.registrar_baja_donacion(instance.pk)
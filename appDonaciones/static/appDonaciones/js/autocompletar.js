@@ -0,0 +1,49 @@
+// Autocompletado para los <select data-autocompletar="url">.
+// Agrega un campo de búsqueda encima del select y rellena sus opciones con
+// el JSON del endpoint ({resultados: [{id, texto}], hay_mas}).
+(function () {
+    function iniciar(select) {
+        var buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control mb-1';
+        buscador.placeholder = 'Buscar...';
+        select.parentNode.insertBefore(buscador, select);
+
+        var temporizador = null;
+        var ultimaConsulta = null;
+
+        function cargar(q) {
+            if (q === ultimaConsulta) return;
+            ultimaConsulta = q;
+            var url = select.dataset.autocompletar + '?q=' + encodeURIComponent(q);
+            fetch(url, {credentials: 'same-origin'})
+                .then(function (r) { return r.json(); })
+                .then(function (datos) {
+                    if (q !== ultimaConsulta) return; // llegó una respuesta vieja
+                    var elegido = select.value;
+                    var textoElegido = elegido ? select.options[select.selectedIndex].text : null;
+                    select.innerHTML = '';
+                    select.add(new Option(select.dataset.placeholder || '', ''));
+                    var incluido = false;
+                    (datos.resultados || []).forEach(function (item) {
+                        var valor = String(item.id);
+                        incluido = incluido || valor === elegido;
+                        select.add(new Option(item.texto, valor, false, valor === elegido));
+                    });
+                    if (elegido && !incluido) {
+                        select.add(new Option(textoElegido, elegido, true, true), 1);
+                    }
+                });
+        }
+
+        buscador.addEventListener('input', function () {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(function () { cargar(buscador.value.trim()); }, 250);
+        });
+        select.addEventListener('focus', function () { cargar(buscador.value.trim()); });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();
@@ -0,0 +1,17 @@
+from django import template
+from django.apps import apps
+
+from appDonaciones.cache import generaciones
+
+register = template.Library()
+
+
+@register.simple_tag
+def generacion(*nombres):
+    """Generación combinada de los modelos dados, para usar como vary_on de {% cache %}.
+
+    Uso: {% generacion 'Donaciones' 'Donante' as gen %}{% cache 600 fragmento obj.pk gen using="fragmentos" %}
+    (el alias 'fragmentos' no guarda nada si la caché no es compartida, ver settings.CACHE_VISTAS)
+    """
+    modelos = [apps.get_model('appDonaciones', nombre) for nombre in nombres]
+    return '.'.join(str(g) for g in generaciones(*modelos))
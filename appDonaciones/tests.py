@@ -1,3 +1,894 @@
-from django.test import TestCase
+import datetime
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_recaptcha.client import RecaptchaResponse
+
+from . import asignacion, cache, carga, contadores, correo, geo, inventario, metricas, resumen
+from .api import RECURSOS, TAMANO_PAGINA_API
+from .busqueda import buscar_donantes
+from .forms import BajoRecursosForm, DonacionesForm, ZooForm
+from .geocodificacion import GeocodificadorNomenclator, geocodificar_donantes
+from .importacion import ImportadorDonaciones, ImportadorDonantes, leer_filas
+from .middleware import InstrumentacionSQLMiddleware
+from .models import (
+    Asignacion, BajoRecursos, CorreoPendiente, CorteInventario, CuentaInventario, DireccionGeocodificada,
+    Donaciones, Donante, MovimientoInventario, ResumenDonaciones, Zoo,
+)
+from .paginacion import paginar
+from .signals import guardar_en_lote
+
+# Caché de un solo proceso, pero con las vistas cacheadas encendidas: los tests
+# que miden aciertos o ETag no dependen de CACHE_BACKEND ni escriben en .cache/
+CACHE_DE_PRUEBA = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CACHE_VISTAS=True,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+)
+
+
+@CACHE_DE_PRUEBA
+class ApiTests(TestCase):
+    # Consultas de una petición autenticada: el usuario de la sesión (la
+    # sesión misma sale de la caché con el backend cached_db)
+    CONSULTAS_AUTENTICACION = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.usuario = User.objects.create_user('usuario', password='x')
+        donantes = Donante.objects.bulk_create([
+            Donante(nombre=f'Donante {i}', ciudad='Santiago', fecha_registro=datetime.date(2025, 1, 1 + i))
+            for i in range(3)
+        ])
+        Donaciones.objects.bulk_create([
+            Donaciones(
+                donante=donantes[i % 3], cantidad=i + 1, tipo_alimento='Carnes', destino='Zoológico',
+                fecha_llegada=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 40),
+            )
+            for i in range(TAMANO_PAGINA_API + 20)
+        ])
+        BajoRecursos.objects.create(ciudad='Santiago', donacion='1', demanda_kg=10)
+        Zoo.objects.create(animales='Leones', trabajadores='Ana', tipo_animal='1', donacion='1')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.staff)
+        # La primera petición de la sesión la renueva (SesionDeslizanteMiddleware);
+        # se hace aquí para que no cuente en las mediciones
+        self.client.get(reverse('api_zoos'))
+
+    def test_permisos(self):
+        url = reverse('api_donaciones')
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_consultas_por_endpoint(self):
+        for recurso, config in RECURSOS.items():
+            pk = config.modelo.objects.values_list('pk', flat=True).first()
+            with self.subTest(recurso=recurso):
+                with self.assertNumQueries(self.CONSULTAS_AUTENTICACION + 1):
+                    response = self.client.get(reverse(f'api_{recurso}'))
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(self.CONSULTAS_AUTENTICACION + 1):
+                    response = self.client.get(reverse(f'api_{recurso}_detalle', args=[pk]))
+                self.assertEqual(response.status_code, 200)
+
+    def test_paginacion_por_cursor_recorre_todo(self):
+        url, vistos, paginas = reverse('api_donaciones'), [], 0
+        while url:
+            with self.assertNumQueries(self.CONSULTAS_AUTENTICACION + 1):
+                datos = self.client.get(url).json()
+            vistos += [fila['id_donacion'] for fila in datos['resultados']]
+            url = datos['siguiente']
+            paginas += 1
+        esperados = list(
+            Donaciones.objects.order_by('-fecha_llegada', '-id_donacion').values_list('id_donacion', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(paginas, 2)
+
+    def test_fields_limita_columnas(self):
+        datos = self.client.get(reverse('api_donantes'), {'fields': 'nombre,ciudad'}).json()
+        self.assertEqual(set(datos['resultados'][0]), {'nombre', 'ciudad'})
+        response = self.client.get(reverse('api_donantes'), {'fields': 'nombre,clave'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_if_none_match_responde_304_sin_leer_datos(self):
+        url = reverse('api_zoos')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(self.CONSULTAS_AUTENTICACION):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_cambia_al_modificar(self):
+        url = reverse('api_zoos')
+        etag = self.client.get(url)['ETag']
+        zoo = Zoo.objects.get()
+        zoo.animales = 'Tigres'
+        with self.captureOnCommitCallbacks(execute=True):
+            zoo.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['resultados'][0]['animales'], 'Tigres')
+
+    @override_settings(CACHE_VISTAS=False)
+    def test_sin_cache_compartida_no_hay_etag(self):
+        url = reverse('api_zoos')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_detalle_inexistente(self):
+        response = self.client.get(reverse('api_donantes_detalle', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LoteDonacionesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('usuario', password='x')
+        cls.donante = Donante.objects.create(nombre='Donante', ciudad='Santiago', fecha_registro=datetime.date(2025, 1, 1))
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('api_donaciones_lote')
+
+    def _post(self, items):
+        return self.client.post(self.url, json.dumps(items), content_type='application/json')
+
+    def _item(self, **cambios):
+        return {
+            'donante': self.donante.pk, 'cantidad': 5, 'fecha_llegada': '2025-02-01',
+            'tipo_alimento': 'Carnes', 'destino': 'Zoológico', **cambios,
+        }
+
+    def test_resultados_por_item(self):
+        response = self._post([self._item(), self._item(donante=999, cantidad=0), self._item(cantidad=7)])
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        self.assertEqual((datos['creadas'], datos['con_error']), (2, 1))
+        ok, error, ok2 = datos['resultados']
+        self.assertEqual(Donaciones.objects.get(pk=ok['id_donacion']).cantidad, 5)
+        self.assertEqual(Donaciones.objects.get(pk=ok2['id_donacion']).cantidad, 7)
+        self.assertEqual(set(error['errores']), {'donante', 'cantidad'})
+        # Las señales del lote también registran la entrada en inventario
+        self.assertEqual(MovimientoInventario.objects.filter(tipo='entrada').count(), 2)
+
+    def test_motor_sin_ids_en_bulk_create(self):
+        # Como en MySQL: bulk_create no devolvería los ids
+        sin_ids = mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock,
+            return_value=False,
+        )
+        with sin_ids:
+            datos = self._post([self._item(), self._item(cantidad=7)]).json()
+            ImportadorDonaciones().importar([self._item(cantidad=3)])
+        ids = [r['id_donacion'] for r in datos['resultados']]
+        self.assertNotIn(None, ids)
+        self.assertEqual(
+            sorted(MovimientoInventario.objects.filter(tipo='entrada').values_list('donacion_id', flat=True)),
+            sorted(Donaciones.objects.values_list('pk', flat=True)),
+        )
+        # Las ediciones ajustan la entrada de la donación en vez de sumar otra
+        donacion = Donaciones.objects.get(pk=ids[0])
+        donacion.cantidad = 2
+        donacion.save()
+        self.assertEqual(inventario.saldo('Santiago', 'Carnes'), 2 + 7 + 3)
+        self.assertEqual(Donaciones.objects.count(), 3)
+
+    def test_todo_invalido(self):
+        response = self._post([self._item(tipo_alimento='Piedras')])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Donaciones.objects.exists())
+
+    def test_cuerpo_invalido(self):
+        self.assertEqual(self._post({'donante': 1}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'no json', content_type='application/json').status_code, 400)
+
+    def test_requiere_sesion(self):
+        self.client.logout()
+        self.assertEqual(self._post([self._item()]).status_code, 401)
+
+
+class InstrumentacionSQLTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Donante.objects.bulk_create([
+            Donante(nombre=f'Donante {i}', ciudad='Santiago') for i in range(6)
+        ])
+
+    def _middleware(self, vista):
+        return InstrumentacionSQLMiddleware(vista)(RequestFactory().get('/prueba/'))
+
+    def test_server_timing(self):
+        response = self._middleware(lambda request: HttpResponse(str(Donante.objects.count())))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 consultas", app;dur=[\d.]+$')
+
+    def test_detecta_n_mas_1(self):
+        def vista(request):
+            # Sin with_stats(), total_donaciones() hace un COUNT por donante
+            return HttpResponse(str([d.total_donaciones() for d in Donante.objects.all()]))
+
+        with self.assertLogs('appDonaciones.sql', 'WARNING') as logs:
+            self._middleware(vista)
+        registro = json.loads(logs.records[0].getMessage())
+        self.assertEqual(registro['evento'], 'posible_n_mas_1')
+        self.assertEqual(registro['consultas'], 7)
+        self.assertEqual(registro['repetidas'][0]['veces'], 6)
+
+    @override_settings(SQL_LENTO_MS=0)
+    def test_registra_requests_lentos(self):
+        with self.assertLogs('appDonaciones.sql', 'WARNING') as logs:
+            self._middleware(lambda request: HttpResponse('ok'))
+        self.assertEqual(json.loads(logs.records[0].getMessage())['evento'], 'request_lento')
+
+
+class MetricasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def test_histograma_acumulado(self):
+        histograma = metricas.Histograma('prueba_histograma', 'Prueba.', (0.1, 1))
+        self.addCleanup(metricas.METRICAS.pop, 'prueba_histograma')
+        for valor in (0.05, 0.1, 0.5, 3):
+            histograma.observar(valor, url='x')
+        texto = metricas.exponer()
+        self.assertIn('# TYPE prueba_histograma histogram', texto)
+        self.assertIn('prueba_histograma_bucket{le="0.1",url="x"} 2', texto)
+        self.assertIn('prueba_histograma_bucket{le="1.0",url="x"} 3', texto)
+        self.assertIn('prueba_histograma_bucket{le="+Inf",url="x"} 4', texto)
+        self.assertIn('prueba_histograma_sum{url="x"} 3.65', texto)
+        self.assertIn('prueba_histograma_count{url="x"} 4', texto)
+
+    def test_suma_los_archivos_de_cada_proceso(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        clave = metricas._clave('donaciones_correos_enviados_total', {})
+        for pid, n in ((1, 2), (2, 5)):
+            almacen = metricas._AlmacenMmap(os.path.join(directorio, f'metricas_{pid}.db'))
+            almacen.sumar(clave, n)
+            almacen.mm.flush()
+        with override_settings(METRICAS_DIR=directorio):
+            self.assertIn('donaciones_correos_enviados_total 7\n', metricas.exponer())
+
+    def test_vista_registra_requests(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('metricas'))
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertRegex(
+            response.content.decode(),
+            r'donaciones_http_requests_total\{metodo="GET",status="200",url="metricas"\} [1-9]',
+        )
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+        response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+
+class ConexionCaida:
+    """Conexión de correo cuyo servidor no responde."""
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP caído')
+
+    def close(self):
+        pass
+
+
+class CorreoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('usuario', 'usuario@ejemplo.cl', 'x')
+        cls.donante = Donante.objects.create(nombre='Donante', ciudad='Santiago')
+
+    def _encolar(self, **campos):
+        return CorreoPendiente.objects.create(
+            destinatario='usuario@ejemplo.cl', asunto='Asunto', cuerpo_texto='Hola', **campos,
+        )
+
+    def test_envia_pendientes(self):
+        pendiente = self._encolar()
+        self.assertEqual(correo.enviar_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.estado, pendiente.intentos), ('enviado', 1))
+        self.assertEqual(correo.enviar_pendientes(), (0, 0))
+
+    def test_fallo_de_conexion_cuenta_el_intento_con_backoff(self):
+        pendiente = self._encolar()
+        self.assertEqual(correo.enviar_pendientes(connection=ConexionCaida()), (0, 1))
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.estado, pendiente.intentos), ('pendiente', 1))
+        self.assertIn('SMTP caído', pendiente.ultimo_error)
+        self.assertGreater(pendiente.proximo_intento, timezone.now() + correo.ESPERA_BASE / 2)
+        # Hasta que venza la espera no se reintenta
+        self.assertEqual(correo.enviar_pendientes(), (0, 0))
+
+    def test_fallido_al_agotar_los_intentos(self):
+        pendiente = self._encolar(intentos=correo.MAX_INTENTOS - 1)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('rechazado')):
+            self.assertEqual(correo.enviar_pendientes(), (0, 1))
+        pendiente.refresh_from_db()
+        self.assertEqual((pendiente.estado, pendiente.intentos), ('fallido', correo.MAX_INTENTOS))
+
+    @mock.patch('django_recaptcha.client.submit', return_value=RecaptchaResponse(is_valid=True))
+    def test_donacion_y_correo_en_la_misma_transaccion(self, _):
+        self.client.force_login(self.usuario)
+        datos = {
+            'donante': self.donante.pk, 'cantidad': 5, 'fecha_llegada': '2025-02-01',
+            'tipo_alimento': 'Carnes', 'destino': 'Zoológico', 'g-recaptcha-response': 'ok',
+        }
+        self.assertRedirects(self.client.post(reverse('donaciones_create'), datos), reverse('home'))
+        self.assertEqual((Donaciones.objects.count(), CorreoPendiente.objects.count()), (1, 1))
+        self.assertEqual(mail.outbox, [])
+
+        with mock.patch('appDonaciones.views.encolar_confirmacion_donacion', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('donaciones_create'), datos)
+        self.assertEqual((Donaciones.objects.count(), CorreoPendiente.objects.count()), (1, 1))
+
+
+class AsignacionTests(TestCase):
+    def _donacion(self, kg, lat, lon, destino='Bajo Recursos', tipo='Carnes'):
+        donante = Donante.objects.create(nombre='Donante', ciudad='Santiago', latitud=lat, longitud=lon)
+        return Donaciones.objects.create(
+            donante=donante, cantidad=kg, tipo_alimento=tipo, destino=destino,
+            fecha_llegada=datetime.date(2025, 1, 1),
+        )
+
+    def _zona(self, kg, lat, lon):
+        return BajoRecursos.objects.create(ciudad='Santiago', donacion='1', demanda_kg=kg, latitud=lat, longitud=lon)
+
+    def _zoo(self, kg, lat, lon):
+        # '4': anfibios, solo carne
+        return Zoo.objects.create(
+            animales='Ranas', trabajadores='Ana', tipo_animal='4', donacion='1', demanda_kg=kg,
+            latitud=lat, longitud=lon,
+        )
+
+    def test_respeta_cantidades_y_demandas(self):
+        donaciones = [self._donacion(8, -33.40, -70.60), self._donacion(5, -33.42, -70.65), self._donacion(9, -36.8, -73.0)]
+        zonas = [self._zona(6, -33.45, -70.66), self._zona(10, -36.82, -73.05)]
+        plan = asignacion.asignar()
+        self.assertEqual(plan.kg_asignados, 16)
+        for donacion in donaciones:
+            asignado = sum(a.kg for a in Asignacion.objects.filter(donacion=donacion))
+            self.assertLessEqual(asignado, donacion.cantidad)
+        for zona in zonas:
+            self.assertLessEqual(sum(a.kg for a in Asignacion.objects.filter(zona=zona)), zona.demanda_kg)
+        # La distancia guardada es la de cada donante a su destino, no la de las celdas
+        for a in Asignacion.objects.select_related('donacion__donante', 'zona'):
+            donante, zona = a.donacion.donante, a.zona
+            real = geo.haversine(float(donante.latitud), float(donante.longitud), float(zona.latitud), float(zona.longitud))
+            self.assertAlmostEqual(a.distancia_km, real, places=2)
+        # Lo asignado sale del inventario
+        self.assertEqual(-sum(MovimientoInventario.objects.filter(tipo='salida').values_list('kg', flat=True)), 16)
+        # Una segunda corrida no vuelve a repartir lo mismo
+        self.assertEqual(asignacion.asignar().kg_asignados, 0)
+
+    def test_penaliza_el_destino_no_elegido(self):
+        donacion = self._donacion(5, -33.40, -70.60, destino='Zoológico')
+        self._zona(5, -33.45, -70.65)           # ~7 km
+        zoo = self._zoo(5, -33.80, -70.90)      # ~50 km, menos que la penalización
+        asignacion.asignar()
+        self.assertEqual(list(Asignacion.objects.filter(donacion=donacion).values_list('zoo', 'kg')), [(zoo.pk, 5)])
+
+    def test_optimo_contra_fuerza_bruta(self):
+        # Cada donación y cada zona en su propia celda: el modelo agrupado es exacto
+        donaciones = [self._donacion(4, -33.0, -71.0), self._donacion(3, -34.5, -71.5), self._donacion(3, -36.0, -72.0)]
+        zonas = [self._zona(5, -33.5, -70.5), self._zona(4, -35.5, -72.5)]
+        puntos_d = [(float(d.donante.latitud), float(d.donante.longitud)) for d in donaciones]
+        puntos_z = [(float(z.latitud), float(z.longitud)) for z in zonas]
+        distancia = [[geo.haversine(*d, *z) for z in puntos_z] for d in puntos_d]
+
+        mejor = None
+        for repartos in itertools.product(*[
+            [(a, b) for a in range(d.cantidad + 1) for b in range(d.cantidad + 1 - a)] for d in donaciones
+        ]):
+            if any(sum(r[j] for r in repartos) > z.demanda_kg for j, z in enumerate(zonas)):
+                continue
+            total = sum(map(sum, repartos))
+            costo = sum(r[j] * distancia[i][j] for i, r in enumerate(repartos) for j in range(len(zonas)))
+            if mejor is None or (total, -costo) > (mejor[0], -mejor[1]):
+                mejor = (total, costo)
+
+        plan = asignacion.asignar()
+        self.assertEqual(plan.kg_asignados, mejor[0])
+        # Los costos se redondean a 0,1 km por kg dentro del flujo
+        self.assertAlmostEqual(plan.km_por_kg * plan.kg_asignados, mejor[1], delta=0.1 * mejor[0])
+
+
+class InventarioTests(TestCase):
+    def _donacion(self, kg, ciudad='Santiago', tipo='Carnes'):
+        donante = Donante.objects.create(nombre='Donante', ciudad=ciudad)
+        return Donaciones.objects.create(
+            donante=donante, cantidad=kg, tipo_alimento=tipo, destino='Bajo Recursos',
+            fecha_llegada=datetime.date(2025, 1, 1),
+        )
+
+    def _salida(self, donacion, kg):
+        inventario.registrar([MovimientoInventario(
+            ciudad='Santiago', tipo_alimento='Carnes', kg=-kg, tipo='salida', donacion=donacion,
+        )])
+
+    def test_salida_mayor_al_saldo(self):
+        donacion = self._donacion(5)
+        with self.assertRaises(inventario.StockInsuficiente):
+            self._salida(donacion, 6)
+        self.assertFalse(MovimientoInventario.objects.filter(tipo='salida').exists())
+        self.assertEqual(inventario.saldo('Santiago', 'Carnes'), 5)
+
+    def test_ajustes_al_editar_y_borrar(self):
+        donacion = self._donacion(10)
+        self._salida(donacion, 4)
+        # Lo entregado no vuelve: quedan los 8 nuevos menos los 4 que salieron
+        donacion.cantidad = 8
+        donacion.save()
+        self.assertEqual(inventario.saldo('Santiago', 'Carnes'), 4)
+        donacion.tipo_alimento = 'Lácteos'
+        donacion.save()
+        self.assertEqual(inventario.saldo('Santiago', 'Carnes'), 0)
+        self.assertEqual(inventario.saldo('Santiago', 'Lácteos'), 4)
+        donacion.save()
+        self.assertEqual(MovimientoInventario.objects.count(), 5)
+        donacion.delete()
+        self.assertEqual([s['kg'] for s in inventario.saldos()], [0, 0])
+
+    def test_saldos_con_cortes(self):
+        with mock.patch.object(inventario, 'CORTE_CADA', 3):
+            donaciones = [self._donacion(i + 1, ciudad=('Santiago', 'Temuco')[i % 2]) for i in range(10)]
+            donaciones[0].cantidad = 20
+            donaciones[0].save()
+            donaciones[1].delete()
+        self.assertTrue(CorteInventario.objects.exists())
+        self.assertTrue(CuentaInventario.objects.filter(hasta_movimiento__gt=0).exists())
+        esperado = (
+            MovimientoInventario.objects.values('ciudad', 'tipo_alimento')
+            .annotate(kg=Sum('kg')).order_by('ciudad', 'tipo_alimento')
+        )
+        self.assertEqual(inventario.saldos(), list(esperado))
+        self.assertEqual(inventario.saldo('Santiago', 'Carnes'), 20 + 3 + 5 + 7 + 9)
+
+
+class MigracionTestCase(TransactionTestCase):
+    """Migra la app hasta `desde`, deja que el test cargue datos y luego aplica `hasta`."""
+    desde = hasta = None
+
+    def _migrar(self, migracion):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('appDonaciones', migracion)])
+        return executor.loader.project_state(('appDonaciones', migracion)).apps
+
+    def setUp(self):
+        self.apps = self._migrar(self.desde)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrar(self):
+        self.apps = self._migrar(self.hasta)
+        return self.apps
+
+
+class MigracionDonanteTests(MigracionTestCase):
+    desde, hasta = '0003_donaciones_donante_fk', '0004_rellenar_donaciones_donante'
+
+    def test_la_ciudad_manda_y_los_conflictos_quedan_sin_enlazar(self):
+        Donante = self.apps.get_model('appDonaciones', 'Donante')
+        Donaciones = self.apps.get_model('appDonaciones', 'Donaciones')
+        por_nombre = {
+            nombre: Donante.objects.create(nombre=nombre, ciudad=ciudad).pk
+            for nombre, ciudad in [
+                ('Temuco', 'Santiago'), ('Rosa', 'Temuco'), ('Luis', 'Valdivia'),
+                ('Ana', 'Osorno'), ('Eva', 'Osorno'), ('Osorno', 'Arica'),
+            ]
+        }
+        for texto in ('Temuco', 'Valdivia', 'Osorno', 'Arica', 'Luis', 'Nadie'):
+            Donaciones.objects.create(
+                donante_texto=texto, cantidad=1, tipo_alimento='Carnes', destino='Zoo',
+                fecha_llegada=datetime.date(2025, 1, 1),
+            )
+
+        Donaciones = self.migrar().get_model('appDonaciones', 'Donaciones')
+        enlazados = dict(Donaciones.objects.values_list('donante_texto', 'donante_id'))
+        self.assertEqual(enlazados, {
+            # Ciudad de Rosa y nombre de otro donante: no se adivina
+            'Temuco': None,
+            'Valdivia': por_nombre['Luis'],
+            # Ciudad con dos donantes: ambigua aunque coincida con un nombre
+            'Osorno': None,
+            'Arica': por_nombre['Osorno'],
+            # No es ciudad de nadie: se enlaza por nombre
+            'Luis': por_nombre['Luis'],
+            'Nadie': None,
+        })
+
+
+class MigracionInventarioTests(MigracionTestCase):
+    desde, hasta = '0014_asignacion', '0015_inventario'
+
+    def test_rellena_el_libro_con_donaciones_y_asignaciones(self):
+        Donante = self.apps.get_model('appDonaciones', 'Donante')
+        Donaciones = self.apps.get_model('appDonaciones', 'Donaciones')
+        BajoRecursos = self.apps.get_model('appDonaciones', 'BajoRecursos')
+        Asignacion = self.apps.get_model('appDonaciones', 'Asignacion')
+        donante = Donante.objects.create(nombre='Donante', ciudad='Santiago')
+        fecha = datetime.date(2025, 1, 1)
+        carnes = Donaciones.objects.create(
+            donante=donante, cantidad=10, tipo_alimento='Carnes', destino='Bajo Recursos', fecha_llegada=fecha,
+        )
+        Donaciones.objects.create(
+            donante=donante, cantidad=5, tipo_alimento='Lácteos', destino='Bajo Recursos', fecha_llegada=fecha,
+        )
+        zona = BajoRecursos.objects.create(ciudad='Santiago', donacion='1', demanda_kg=3)
+        Asignacion.objects.create(donacion=carnes, zona=zona, kg=3)
+
+        self.migrar()
+        self.assertEqual(
+            sorted(MovimientoInventario.objects.values_list('tipo', 'tipo_alimento', 'kg')),
+            [('entrada', 'Carnes', 10), ('entrada', 'Lácteos', 5), ('salida', 'Carnes', -3)],
+        )
+        self.assertEqual(
+            [(s['tipo_alimento'], s['kg']) for s in inventario.saldos()], [('Carnes', 7), ('Lácteos', 5)],
+        )
+        self.assertEqual(CorteInventario.objects.count(), 2)
+
+
+@CACHE_DE_PRUEBA
+class CacheVistasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.staff)
+        self.client.get(reverse('cache_estadisticas'))
+
+    def _nombres(self):
+        respuesta = self.client.get(reverse('donante_buscar'), {'q': 'Donante'})
+        return sorted(r['nombre'] for r in respuesta.json()['resultados'])
+
+    def test_guardar_invalida_la_pagina(self):
+        Donante.objects.create(nombre='Donante Uno', ciudad='Santiago')
+        self.assertEqual(self._nombres(), ['Donante Uno'])
+        # Solo la consulta del usuario de la sesión: la página sale de la caché
+        with self.assertNumQueries(1):
+            self.assertEqual(self._nombres(), ['Donante Uno'])
+        generacion = cache.generaciones(Donante)
+        with self.captureOnCommitCallbacks() as al_confirmar:
+            Donante.objects.create(nombre='Donante Dos', ciudad='Santiago')
+            # Antes del commit la generación no cambia: un GET concurrente no
+            # puede guardar la página sin confirmar bajo la generación nueva
+            self.assertEqual(cache.generaciones(Donante), generacion)
+        for callback in al_confirmar:
+            callback()
+        self.assertNotEqual(cache.generaciones(Donante), generacion)
+        self.assertEqual(self._nombres(), ['Donante Dos', 'Donante Uno'])
+
+    @override_settings(CACHE_VISTAS=False)
+    def test_sin_cache_compartida_no_guarda(self):
+        Donante.objects.create(nombre='Donante Uno', ciudad='Santiago')
+        self._nombres()
+        with self.assertNumQueries(2):
+            self._nombres()
+
+
+class CargaTests(TestCase):
+    def test_percentil(self):
+        valores = list(range(1, 101))
+        self.assertEqual(carga.percentil(valores, 50), 50)
+        self.assertEqual(carga.percentil(valores, 95), 95)
+        self.assertEqual(carga.percentil(valores, 100), 100)
+        self.assertEqual(carga.percentil([7], 99), 7)
+        self.assertEqual(carga.percentil([], 50), 0.0)
+
+    def test_resumir(self):
+        mediciones = [carga.Medicion('GET home', s / 1000, 200, True) for s in range(1, 11)]
+        mediciones.append(carga.Medicion('POST signin', 0.5, 200, False))
+        home, signin = carga.resumir(mediciones, segundos=2)
+        self.assertEqual(
+            (home['nombre'], home['peticiones'], home['errores'], home['por_segundo']), ('GET home', 10, 0, 5.0),
+        )
+        self.assertEqual((home['p50'], home['p95'], home['p99']), (5.0, 10.0, 10.0))
+        self.assertEqual((signin['peticiones'], signin['errores'], signin['p99']), (1, 1, 500.0))
+
+    @override_settings(DEBUG=True)
+    def test_no_corre_contra_una_base_remota(self):
+        # DEBUG no basta: lo que cuenta es dónde está la base de datos
+        with mock.patch.object(connection, 'vendor', 'postgresql'), \
+                mock.patch.dict(connection.settings_dict, {'HOST': 'db.ejemplo.render.com'}):
+            with self.assertRaisesMessage(CommandError, '--permitir-base-remota'):
+                call_command('reproducir_carga', duracion=0, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='carga_').exists())
+
+
+class PaginacionKeysetTests(TestCase):
+    CAMPOS = ('-fecha_llegada', '-id_donacion')
+
+    @classmethod
+    def setUpTestData(cls):
+        donante = Donante.objects.create(nombre='Donante', ciudad='Santiago')
+        # Pocas fechas distintas: muchas filas empatan en el primer campo del orden
+        Donaciones.objects.bulk_create([
+            Donaciones(
+                donante=donante, cantidad=1, tipo_alimento='Carnes', destino='Zoológico',
+                fecha_llegada=datetime.date(2025, 1, 1 + i % 4),
+            )
+            for i in range(23)
+        ])
+
+    def _pagina(self, **params):
+        return paginar(RequestFactory().get('/', params), Donaciones.objects.all(), self.CAMPOS, tamano=5)
+
+    def test_recorre_sin_duplicados_ni_huecos(self):
+        esperado = list(Donaciones.objects.order_by(*self.CAMPOS).values_list('pk', flat=True))
+        vistos, pagina = [], self._pagina()
+        while True:
+            vistos += [d.pk for d in pagina]
+            if not pagina.tiene_siguiente:
+                break
+            pagina = self._pagina(despues=pagina.cursor_siguiente)
+        self.assertEqual(vistos, esperado)
+
+        # Y hacia atrás desde la última página
+        hacia_atras = [d.pk for d in pagina]
+        while pagina.tiene_anterior:
+            pagina = self._pagina(antes=pagina.cursor_anterior)
+            hacia_atras = [d.pk for d in pagina] + hacia_atras
+        self.assertEqual(hacia_atras, esperado)
+
+
+class BusquedaDonantesTests(TestCase):
+    def _encontrados(self, texto):
+        return sorted(buscar_donantes(Donante.objects.all(), texto).values_list('nombre', flat=True))
+
+    def test_indice_sigue_a_los_cambios(self):
+        donante = Donante.objects.create(nombre='Panadería Rosa', ciudad='Santiago', direccion='Calle Olmo 12')
+        self.assertEqual(self._encontrados('panader'), ['Panadería Rosa'])
+        self.assertEqual(self._encontrados('olmo'), ['Panadería Rosa'])
+
+        donante.nombre = 'Verdulería Rosa'
+        donante.save()
+        self.assertEqual(self._encontrados('panader'), [])
+        self.assertEqual(self._encontrados('verdul'), ['Verdulería Rosa'])
+
+        # Alta masiva: pasa por creados_en_lote
+        ImportadorDonantes().importar([
+            {'nombre': 'Verdulería Sol', 'ciudad': 'Temuco', 'tipo_donante': 'empresa', 'estado': 'activo'},
+        ])
+        self.assertEqual(self._encontrados('verdul'), ['Verdulería Rosa', 'Verdulería Sol'])
+
+        donante.delete()
+        self.assertEqual(self._encontrados('verdul'), ['Verdulería Sol'])
+
+
+class ContadoresTests(TestCase):
+    def assertContadoresAlDia(self):
+        panel = contadores.leer()
+        for modelo, campo in contadores.CAMPO_POR_MODELO.items():
+            self.assertEqual(getattr(panel, campo), modelo.objects.count(), campo)
+
+    def test_coinciden_con_count(self):
+        donante = Donante.objects.create(nombre='Donante', ciudad='Santiago')
+        Zoo.objects.create(animales='Leones', trabajadores='Ana', tipo_animal='1', donacion='1')
+        self.assertContadoresAlDia()
+        guardar_en_lote(Donaciones, [
+            Donaciones(donante=donante, cantidad=i + 1, tipo_alimento='Carnes', destino='Zoológico',
+                       fecha_llegada=datetime.date(2025, 1, 1))
+            for i in range(4)
+        ])
+        guardar_en_lote(BajoRecursos, [BajoRecursos(ciudad='Temuco', donacion='1') for _ in range(3)])
+        self.assertContadoresAlDia()
+        Donaciones.objects.first().delete()
+        BajoRecursos.objects.filter(ciudad='Temuco').delete()
+        self.assertContadoresAlDia()
+        donante.delete()
+        self.assertContadoresAlDia()
+
+
+class ImportacionTests(TestCase):
+    def test_errores_por_fila_no_frenan_las_validas(self):
+        donante = Donante.objects.create(nombre='Donante', ciudad='Santiago')
+        archivo = io.BytesIO((
+            'donante,cantidad,fecha_llegada,tipo_alimento,destino\n'
+            f'{donante.pk},10,2025-02-01,Carnes,Zoológico\n'
+            '999,5,2025-02-01,Carnes,Zoológico\n'
+            f'{donante.pk},-3,2025-02-01,Carnes,Zoológico\n'
+            '\n'
+            f'{donante.pk},7,2025-02-02,Lácteos,Bajo Recursos\n'
+        ).encode())
+        # Lotes de 2: las filas con error caen en lotes distintos
+        reporte = ImportadorDonaciones(tamano_lote=2).importar(leer_filas(archivo, 'donaciones.csv'))
+        self.assertEqual((reporte.total, reporte.creados, reporte.filas_con_error), (4, 2, 2))
+        self.assertEqual([(fila, campo) for fila, campo, _ in reporte.errores], [(3, 'donante'), (4, 'cantidad')])
+        self.assertEqual(sorted(Donaciones.objects.values_list('cantidad', flat=True)), [7, 10])
+
+
+class ResumenTests(TestCase):
+    def _filas(self):
+        # Las filas que quedaron en cero por las restas equivalen a no tenerlas
+        return sorted(
+            ResumenDonaciones.objects.exclude(total_kg=0, num_donaciones=0).values_list(
+                'granularidad', 'periodo', 'tipo_alimento', 'destino', 'ciudad', 'total_kg', 'num_donaciones',
+            )
+        )
+
+    def test_incremental_igual_a_reconstruir(self):
+        santiago = Donante.objects.create(nombre='Uno', ciudad='Santiago')
+        temuco = Donante.objects.create(nombre='Dos', ciudad='Temuco')
+        donacion = Donaciones.objects.create(
+            donante=santiago, cantidad=10, tipo_alimento='Carnes', destino='Zoológico',
+            fecha_llegada=datetime.date(2025, 1, 31),
+        )
+        # Suficientes para pasar por _aplicar_en_bloque
+        guardar_en_lote(Donaciones, [
+            Donaciones(
+                donante=(santiago, temuco)[i % 2], cantidad=i + 1, tipo_alimento=('Carnes', 'Lácteos')[i % 3 == 0],
+                destino='Bajo Recursos', fecha_llegada=datetime.date(2025, 1, 1) + datetime.timedelta(days=i * 3),
+            )
+            for i in range(resumen.UMBRAL_EN_BLOQUE)
+        ])
+        donacion.cantidad, donacion.fecha_llegada, donacion.tipo_alimento = 4, datetime.date(2025, 2, 3), 'Lácteos'
+        donacion.save()
+        donacion.donante = temuco
+        donacion.save()
+        # Cambia la ciudad del donante: sus donaciones pasan a la nueva
+        santiago.ciudad = 'Valdivia'
+        santiago.save()
+        Donaciones.objects.filter(cantidad=7).delete()
+        temuco.delete()
+
+        incremental = self._filas()
+        resumen.reconstruir()
+        self.assertEqual(incremental, self._filas())
+
+
+class CercaniaTests(TestCase):
+    # Puntos de consulta: centro de Santiago y uno sobre un borde de celda
+    # (lon -67.5 corta celdas de geohash hasta precisión 3)
+    PUNTOS = [(-33.45, -70.66), (-33.40, -67.5)]
+
+    @classmethod
+    def setUpTestData(cls):
+        azar = random.Random(7)
+        for i in range(120):
+            lat, lon = cls.PUNTOS[i % 2]
+            BajoRecursos.objects.create(
+                ciudad='Zona %d' % i, donacion='1',
+                latitud=round(lat + azar.uniform(-1.5, 1.5), 6),
+                longitud=round(lon + azar.uniform(-1.5, 1.5), 6),
+            )
+        BajoRecursos.objects.create(ciudad='Sin coordenadas', donacion='1')
+
+    def _fuerza_bruta(self, lat, lon):
+        pares = [
+            (zona.pk, geo.haversine(lat, lon, zona.latitud, zona.longitud))
+            for zona in BajoRecursos.objects.exclude(latitud=None)
+        ]
+        return sorted(pares, key=lambda par: (par[1], par[0]))
+
+    def test_en_radio_igual_a_fuerza_bruta(self):
+        for (lat, lon), radio in itertools.product(self.PUNTOS, (0.5, 5, 25, 80, 400)):
+            with self.subTest(lat=lat, lon=lon, radio=radio):
+                esperado = [par for par in self._fuerza_bruta(lat, lon) if par[1] <= radio]
+                obtenido = [(zona.pk, d) for zona, d in geo.en_radio(BajoRecursos.objects.all(), lat, lon, radio)]
+                self.assertEqual(sorted(obtenido, key=lambda par: (par[1], par[0])), esperado)
+
+    def test_mas_cercanos_igual_a_fuerza_bruta(self):
+        for (lat, lon), k in itertools.product(self.PUNTOS, (1, 3, 10, 200)):
+            with self.subTest(lat=lat, lon=lon, k=k):
+                esperado = [d for _, d in self._fuerza_bruta(lat, lon)[:k]]
+                obtenido = [d for _, d in geo.mas_cercanos(BajoRecursos.objects.all(), lat, lon, k)]
+                self.assertEqual(obtenido, esperado)
+
+
+class GeocodificadorContador(GeocodificadorNomenclator):
+    """Nomenclátor que anota cada dirección que le consultan."""
+    consultas = []
+
+    def geocodificar(self, direccion, ciudad):
+        self.consultas.append((direccion, ciudad))
+        return super().geocodificar(direccion, ciudad)
+
+
+class InterrupcionSimulada(Exception):
+    pass
+
+
+@override_settings(GEOCODIFICADORES=['appDonaciones.tests.GeocodificadorContador'])
+class GeocodificacionTests(TestCase):
+    def setUp(self):
+        GeocodificadorContador.consultas = []
+        # Misma dirección escrita de dos formas, una ciudad sin nomenclátor y
+        # una dirección que ya estaba en la caché de una ejecución anterior
+        for nombre, direccion, ciudad in [
+            ('A', 'Av. Matta 100', 'Santiago'),
+            ('B', 'av matta 100', 'santiago'),
+            ('C', 'Calle Sur 5', 'Osorno'),
+            ('D', 'Calle Sur 5', 'Osorno'),
+            ('E', 'Pasaje Uno 1', 'Temuco'),
+            ('F', 'Pasaje Dos 2', 'Temuco'),
+        ]:
+            Donante.objects.create(nombre=nombre, direccion=direccion, ciudad=ciudad)
+        DireccionGeocodificada.objects.create(
+            clave='pasaje dos 2|temuco', latitud='-38.700000', longitud='-72.500000', fuente='previa',
+        )
+
+    def test_cache_y_reanudacion(self):
+        def cortar(resultado):
+            raise InterrupcionSimulada
+
+        with self.assertRaises(InterrupcionSimulada):
+            geocodificar_donantes(tamano_lote=2, hilos=2, al_terminar_lote=cortar)
+        self.assertEqual(GeocodificadorContador.consultas, [('av matta 100', 'santiago')])
+
+        resultado = geocodificar_donantes(tamano_lote=2, hilos=2)
+        # Solo se consultan las direcciones que faltaban, una vez cada una
+        self.assertCountEqual(
+            GeocodificadorContador.consultas,
+            [('av matta 100', 'santiago'), ('calle sur 5', 'osorno'), ('pasaje uno 1', 'temuco')],
+        )
+        self.assertEqual(resultado.consultas, 2)
+        self.assertEqual(resultado.procesados, 4)
+        self.assertEqual(resultado.ubicados, 2)
+
+        f = Donante.objects.get(nombre='F')
+        self.assertEqual((str(f.latitud), str(f.longitud)), ('-38.700000', '-72.500000'))
+        self.assertTrue(f.geohash)
+        self.assertEqual(
+            set(Donante.objects.filter(latitud__isnull=True).values_list('nombre', flat=True)), {'C', 'D'},
+        )
+        # La dirección no encontrada también queda en caché
+        self.assertTrue(DireccionGeocodificada.objects.filter(clave='calle sur 5|osorno', latitud=None).exists())
+
+        GeocodificadorContador.consultas = []
+        geocodificar_donantes(tamano_lote=2, hilos=2)
+        self.assertEqual(GeocodificadorContador.consultas, [])
+
+
+class AutocompletarSelectTests(TestCase):
+    def test_id_invalido_se_muestra_como_error(self):
+        donante = Donante.objects.create(nombre='Rosa', ciudad='Santiago')
+        for form, campo in [
+            (DonacionesForm({'donante': 'abc', 'cantidad': 1}), 'donante'),
+            (ZooForm({'donacion': 'x1'}), 'donacion'),
+            (BajoRecursosForm({'donacion': 'x1'}), 'donacion'),
+        ]:
+            with self.subTest(form=type(form).__name__):
+                self.assertFalse(form.is_valid())
+                self.assertIn(campo, form.errors)
+                # Solo queda el placeholder, sin consultar el valor inválido
+                self.assertEqual(str(form[campo]).count('<option'), 1)
+
+        # Un id válido sigue mostrándose como la opción elegida
+        html = str(DonacionesForm({'donante': str(donante.pk)})['donante'])
+        self.assertIn(f'value="{donante.pk}" selected', html)
+        self.assertIn('Rosa', html)
@@ -0,0 +1,265 @@
+"""Regresiones de rendimiento: todas las URLs con pocos y con muchos datos.
+
+Para cada URL de prjDonaciones/urls.py se verifica que la cantidad de
+consultas no pase de su presupuesto y que no crezca con los datos (un N+1
+la haría crecer), y se compara el tiempo con la línea base guardada en
+rendimiento_base.json.
+
+Variables de entorno:
+- RENDIMIENTO_ACTUALIZAR=1 reescribe la línea base con los tiempos medidos.
+  Sin ella el archivo no se toca, y las URLs (o motores) que no estén en la
+  línea base solo verifican consultas: el tiempo se informa como omitido.
+- RENDIMIENTO_TOLERANCIA: cuánto más lento se acepta, como fracción de la
+  línea base (por defecto 1.0, el doble); a eso se suma MARGEN_MS.
+"""
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from .api import RECURSOS
+from .cache import invalidar
+from .models import BajoRecursos, Donaciones, Donante, Zoo
+from .semilla import sembrar
+
+ARCHIVO_BASE = Path(__file__).with_name('rendimiento_base.json')
+TOLERANCIA = float(os.environ.get('RENDIMIENTO_TOLERANCIA', '1.0'))
+# Holgura fija para que el ruido no haga fallar las vistas de 1-2 ms
+MARGEN_MS = 10
+REPETICIONES = 3
+
+TAMANOS = {
+    'pequeno': dict(donantes=20, donaciones=100, zonas=5, zoos=5),
+    'grande': dict(donantes=400, donaciones=4000, zonas=40, zoos=20),
+}
+
+# Consultas máximas por URL, incluida la del usuario de la sesión
+PRESUPUESTO_CONSULTAS = {
+    'donaciones_list': 2,
+    'donaciones_create': 1,
+    'donaciones_update': 3,
+    'donaciones_delete': 3,
+    'donaciones_exportar': 2,
+    'donante_list': 3,  # página + estadísticas de esa página
+    'donante_create': 1,
+    'donante_update': 2,
+    'donante_delete': 2,
+    'donante_detail': 3,
+    'donante_buscar': 2,
+    'donante_exportar': 2,
+    'donante_mapa': 2,
+    'donante_zonas_cercanas': 5,
+    'importar': 1,
+    'reporte_donaciones': 2,
+    'reporte_donaciones_datos': 2,
+    'inventario_saldos': 2,
+    'bajorecursos_list': 2,
+    'bajorecursos_create': 2,
+    'bajorecursos_update': 4,
+    'bajorecursos_delete': 2,
+    'bajorecursos_donantes_cercanos': 3,
+    'zoo_list': 2,
+    'zoo_create': 1,
+    'zoo_update': 3,
+    'zoo_delete': 2,
+    'home': 2,
+    'admin:index': 2,
+    'signup': 1,
+    'signin': 1,
+    'logout': 3,
+    'crear_admin_rapido': 1,
+    'cache_estadisticas': 1,
+    'metricas': 1,
+    'autocompletar_donantes': 2,
+    'autocompletar_donaciones': 2,
+    'api_donaciones_lote': 1,
+    **{f'api_{recurso}': 2 for recurso in RECURSOS},
+    **{f'api_{recurso}_detalle': 2 for recurso in RECURSOS},
+}
+
+# Consultas que sí dependen de los datos: URL -> (pequeño, grande)
+EXCEPCIONES_CRECIMIENTO = {}
+
+# URLs que no se pueden pedir en un test, con el motivo
+EXCLUIDAS = {
+    'reparar_db': 'ejecuta migrate sobre la base de datos',
+}
+
+PARAMETROS = {
+    'donante_buscar': {'q': 'Donante 1'},
+    'autocompletar_donantes': {'q': 'Donante'},
+    'autocompletar_donaciones': {'q': '1'},
+    'donante_mapa': {'bbox': '-75,-55,-66,-17', 'zoom': '5'},
+}
+
+MODELOS = (Donaciones, Donante, BajoRecursos, Zoo)
+
+# Modelo del <pk> de las URLs de detalle, según el prefijo del nombre
+MODELO_POR_PREFIJO = {
+    'donaciones_': Donaciones,
+    'donante_': Donante,
+    'bajorecursos_': BajoRecursos,
+    'zoo_': Zoo,
+}
+
+
+def nombres_de_urls():
+    """Nombres de todas las URLs; de los include() (el admin) basta su índice."""
+    nombres = []
+    for patron in get_resolver().url_patterns:
+        if isinstance(patron, URLResolver):
+            nombres.append(f'{patron.namespace}:index')
+        elif isinstance(patron, URLPattern) and patron.name:
+            nombres.append(patron.name)
+    return list(dict.fromkeys(nombres))
+
+
+def _patron(nombre):
+    for patron in get_resolver().url_patterns:
+        if isinstance(patron, URLPattern) and patron.name == nombre:
+            return patron
+    return None
+
+
+def _modelo(nombre):
+    if nombre.startswith('api_'):
+        return RECURSOS[nombre[len('api_'):-len('_detalle')]].modelo
+    for prefijo, modelo in MODELO_POR_PREFIJO.items():
+        if nombre.startswith(prefijo):
+            return modelo
+    raise KeyError(nombre)
+
+
+def url_de(nombre):
+    patron = _patron(nombre)
+    if patron is None or 'pk' not in patron.pattern.converters:
+        return reverse(nombre)
+    # Los kwargs fijos (p. ej. {'recurso': ...} de la API) los agrega reverse
+    pk = _modelo(nombre).objects.order_by('pk').values_list('pk', flat=True).first()
+    return reverse(nombre, kwargs={'pk': pk})
+
+
+def leer_base():
+    if ARCHIVO_BASE.exists():
+        return json.loads(ARCHIVO_BASE.read_text(encoding='utf-8'))
+    return {}
+
+
+# Los presupuestos suponen la sesión en caché (lo normal con caché compartida);
+# con CACHE_BACKEND=locmem settings usaría sesiones en la base
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class RendimientoUrlsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('staff', 'staff@ejemplo.cl', 'x')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.base = leer_base()
+        cls.actualizar = os.environ.get('RENDIMIENTO_ACTUALIZAR') == '1'
+        cls.base_cambiada = False
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.base_cambiada:
+            ARCHIVO_BASE.write_text(
+                json.dumps(cls.base, indent=2, sort_keys=True, ensure_ascii=False) + '\n', encoding='utf-8',
+            )
+        super().tearDownClass()
+
+    def _cliente(self):
+        cliente = Client()
+        cliente.force_login(self.staff)
+        # La primera petición renueva la sesión (SesionDeslizanteMiddleware)
+        cliente.get(reverse('cache_estadisticas'))
+        return cliente
+
+    def _pedir(self, cliente, nombre):
+        if nombre == 'logout':
+            # Cierra la sesión: se usa un cliente aparte cada vez
+            cliente = self._cliente()
+        url = url_de(nombre)
+        # Se mide el camino sin caché de vistas, que es donde aparecen los N+1
+        for modelo in MODELOS:
+            invalidar(modelo)
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            response = cliente.get(url, PARAMETROS.get(nombre, {}))
+            if response.streaming:
+                # Las exportaciones consultan mientras se genera el contenido
+                b''.join(response.streaming_content)
+            milisegundos = (time.perf_counter() - inicio) * 1000
+        return response, len(consultas), milisegundos, consultas
+
+    def _medir(self, nombres):
+        """Consultas y mediana del tiempo (ms) de cada URL, con una petición previa de calentamiento."""
+        cliente = self._cliente()
+        medidas = {}
+        for nombre in nombres:
+            response, _, _, _ = self._pedir(cliente, nombre)
+            self.assertLess(response.status_code, 400, f'{nombre}: {response.status_code}')
+            tiempos = []
+            for _ in range(REPETICIONES):
+                _, cantidad, milisegundos, consultas = self._pedir(cliente, nombre)
+                tiempos.append(milisegundos)
+            medidas[nombre] = (cantidad, statistics.median(tiempos), consultas)
+        return medidas
+
+    def _comparar_tiempo(self, tamano, nombre, milisegundos):
+        if self.actualizar:
+            self.base.setdefault(connection.vendor, {}).setdefault(tamano, {})[nombre] = round(milisegundos, 2)
+            type(self).base_cambiada = True
+            return
+        base = self.base.get(connection.vendor, {}).get(tamano, {})
+        if nombre not in base:
+            self.skipTest(
+                f'{nombre} ({tamano}) sin línea base para {connection.vendor}: '
+                'correr con RENDIMIENTO_ACTUALIZAR=1 y versionar rendimiento_base.json'
+            )
+        limite = base[nombre] * (1 + TOLERANCIA) + MARGEN_MS
+        self.assertLessEqual(
+            milisegundos, limite,
+            f'{nombre} ({tamano}) tardó {milisegundos:.1f} ms; línea base {base[nombre]:.1f} ms',
+        )
+
+    def test_todas_las_urls_tienen_presupuesto(self):
+        nombres = set(nombres_de_urls()) - set(EXCLUIDAS)
+        self.assertEqual(nombres - set(PRESUPUESTO_CONSULTAS), set(), 'URLs sin presupuesto de consultas')
+        self.assertEqual(set(PRESUPUESTO_CONSULTAS) - nombres, set(), 'Presupuestos de URLs que ya no existen')
+
+    def test_consultas_y_tiempos(self):
+        nombres = [n for n in nombres_de_urls() if n not in EXCLUIDAS]
+        medidas = {}
+        sembrado = dict.fromkeys(TAMANOS['pequeno'], 0)
+        for tamano, cantidades in TAMANOS.items():
+            # El tamaño grande agrega lo que falta sobre el pequeño
+            sembrar(semilla=len(medidas) + 1, **{k: v - sembrado[k] for k, v in cantidades.items()})
+            sembrado = cantidades
+            medidas[tamano] = self._medir(nombres)
+
+        for nombre in nombres:
+            with self.subTest(url=nombre):
+                presupuesto = PRESUPUESTO_CONSULTAS[nombre]
+                for tamano, por_url in medidas.items():
+                    cantidad, _, consultas = por_url[nombre]
+                    self.assertLessEqual(
+                        cantidad, presupuesto,
+                        f'{nombre} ({tamano}): {cantidad} consultas, presupuesto {presupuesto}\n'
+                        + '\n'.join(q['sql'] for q in consultas.captured_queries),
+                    )
+                pequeno, grande = (medidas[t][nombre][0] for t in TAMANOS)
+                self.assertEqual(
+                    (pequeno, grande), EXCEPCIONES_CRECIMIENTO.get(nombre, (pequeno, pequeno)),
+                    f'{nombre}: las consultas crecen con los datos',
+                )
+                for tamano, por_url in medidas.items():
+                    with self.subTest(url=nombre, tamano=tamano):
+                        self._comparar_tiempo(tamano, nombre, por_url[nombre][1])
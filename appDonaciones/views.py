@@ -1,17 +1,29 @@
+import csv
+import hmac
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User, Group
+from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.db.models import Q
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
 from django.core.management import call_command
+from django.utils.dateparse import parse_date
 from .models import Donaciones, Donante, BajoRecursos, Zoo
-from .forms import DonacionesForm, DonanteForm, BajoRecursosForm, ZooForm
+from .choice import CIUDADES_CHILE, TIPOS_ALIMENTO
+from .forms import DonacionesForm, DonanteForm, BajoRecursosForm, ZooForm, ImportacionForm
+from .importacion import IMPORTADORES, ErrorImportacion, leer_filas
+from .paginacion import paginar, paginar_por_numero
+from .busqueda import buscar_donantes
+from .correo import encolar_confirmacion_donacion
+from . import contadores
+from .cache import cache_por_modelo, estadisticas
+from . import inventario, mapa, metricas, resumen
 
 
 # =============================================
@@ -92,16 +104,14 @@ def signout(request):
 @login_required
 def home(request):
     if request.user.is_staff:
-        donaciones_count = Donaciones.objects.count()
-        donantes_count = Donante.objects.count()
-        zonas_count = BajoRecursos.objects.count()
-        zoos_count = Zoo.objects.count()
+        # Una sola fila mantenida por señales en lugar de cuatro COUNT(*)
+        totales = contadores.leer()
         
         context = {
-            'donaciones_count': donaciones_count,
-            'donantes_count': donantes_count,
-            'zonas_count': zonas_count,
-            'zoos_count': zoos_count,
+            'donaciones_count': totales.donaciones,
+            'donantes_count': totales.donantes,
+            'zonas_count': totales.zonas,
+            'zoos_count': totales.zoos,
         }
         # CORRECCIÓN: 'html/...'
         return render(request, 'html/home.html', context)
@@ -126,14 +136,19 @@ def vista_solo_para_admin(request):
 # =============================================
 
 @login_required
+@cache_por_modelo(Donaciones, Donante)
 def donaciones_list(request):
     if not request.user.is_staff:
         messages.error(request, 'No tienes permisos para acceder a esta página.')
         return redirect('home')
     
-    donaciones = Donaciones.objects.all()
+    donaciones = paginar(
+        request,
+        Donaciones.objects.select_related('donante'),
+        ('-fecha_llegada', '-id_donacion'),
+    )
     # CORRECCIÓN: 'html/...'
-    return render(request, 'html/donaciones_list.html', {'donaciones': donaciones})
+    return render(request, 'html/donaciones_list.html', {'donaciones': donaciones, 'pagina': donaciones})
 
 
 @login_required
@@ -141,23 +156,16 @@ def donaciones_create(request):
     if request.method == 'POST':
         form = DonacionesForm(request.POST)
         if form.is_valid():
-            donacion = form.save()
-            
-            # Lógica de correo
-            try:
-                asunto = f'Confirmación de Donación #{donacion.id_donacion} - Sistema Donaciones'
-                mensaje = f"""Hola {request.user.username}, ... (Resumen) ..."""
-                remitente = settings.EMAIL_HOST_USER
-                destinatarios = [request.user.email]
-                
-                if request.user.email:
-                    send_mail(asunto, mensaje, remitente, destinatarios, fail_silently=True)
-                    messages.success(request, 'Donación registrada y correo enviado.')
-                else:
-                    messages.success(request, 'Donación registrada (Sin email).')
-            except Exception as e:
-                print(f"Error correo: {e}")
-                messages.warning(request, 'Donación guardada, error al enviar correo.')
+            # La donación y su correo se guardan juntos; el envío lo hace 'enviar_correos'
+            with transaction.atomic():
+                donacion = form.save()
+                correo = encolar_confirmacion_donacion(donacion, request.user)
+            metricas.correos_encolados.inc(resultado='encolado' if correo else 'sin_email')
+
+            if correo:
+                messages.success(request, 'Donación registrada. Recibirás un correo de confirmación.')
+            else:
+                messages.success(request, 'Donación registrada (Sin email).')
 
             return redirect('home')
         else:
@@ -219,20 +227,75 @@ def donaciones_delete(request, pk):
 # VISTAS DE DONANTES
 # =============================================
 
+def _parse_fecha(valor):
+    try:
+        return parse_date(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def filtrar_donantes(queryset, params):
+    """Aplica los filtros GET del listado de donantes.
+
+    Devuelve el queryset filtrado y los valores vigentes para la plantilla.
+    Cada filtro tiene un índice compuesto que termina en la clave de la paginación.
+    """
+    tipos_validos = {valor for valor, _ in Donante.TIPO_DONANTE_CHOICES}
+    estados_validos = {valor for valor, _ in Donante.ESTADO_DONANTE_CHOICES}
+    tipo = params.get('tipo', '')
+    estado = params.get('estado', '')
+    ciudad = params.get('ciudad', '').strip()
+    fecha_desde = _parse_fecha(params.get('fecha_desde'))
+    fecha_hasta = _parse_fecha(params.get('fecha_hasta'))
+
+    if tipo in tipos_validos:
+        queryset = queryset.filter(tipo_donante=tipo)
+    if estado in estados_validos:
+        queryset = queryset.filter(estado=estado)
+    if ciudad:
+        queryset = queryset.filter(ciudad=ciudad)
+    if fecha_desde:
+        queryset = queryset.filter(fecha_registro__gte=fecha_desde)
+    if fecha_hasta:
+        queryset = queryset.filter(fecha_registro__lte=fecha_hasta)
+
+    filtros = {
+        'current_tipo': tipo,
+        'current_estado': estado,
+        'current_ciudad': ciudad,
+        'fecha_desde': fecha_desde.isoformat() if fecha_desde else '',
+        'fecha_hasta': fecha_hasta.isoformat() if fecha_hasta else '',
+    }
+    return queryset, filtros
+
+
 @login_required
+@cache_por_modelo(Donante, Donaciones)
 def donante_list(request):
     if not request.user.is_staff:
         messages.error(request, 'No tienes permisos para acceder a esta página.')
         return redirect('home')
     
     try:
-        donantes = Donante.objects.all().order_by('-fecha_registro')
-        # ... lógica de filtros ...
+        donantes, filtros = filtrar_donantes(Donante.objects.all(), request.GET)
+        search_query = request.GET.get('search', '').strip()
+        if search_query:
+            # Resultados por relevancia
+            donantes = paginar_por_numero(request, buscar_donantes(donantes, search_query))
+        else:
+            donantes = paginar(request, donantes, ('-fecha_registro', '-id_donante'))
+        # Las estadísticas (GROUP BY sobre donaciones) se calculan solo para la
+        # página: anotarlas antes del LIMIT agruparía la tabla completa
+        stats = Donante.objects.with_stats().in_bulk([d.pk for d in donantes])
+        donantes.objetos = [stats[d.pk] for d in donantes]
         context = {
+            'search_query': search_query,
             'donantes': donantes,
+            'pagina': donantes,
             'tipos_donante': Donante.TIPO_DONANTE_CHOICES, 
             'estados_donante': Donante.ESTADO_DONANTE_CHOICES, 
-            # ...
+            'ciudades': [valor for valor, _ in CIUDADES_CHILE if valor],
+            **filtros,
         }
         # CORRECCIÓN: 'html/...'
         return render(request, 'html/donante_list.html', context)
@@ -242,6 +305,56 @@ def donante_list(request):
         return render(request, 'html/donante_list.html', {'donantes': []})
 
 
+@login_required
+@cache_por_modelo(Donante)
+def donante_buscar(request):
+    """Búsqueda de texto completo de donantes en JSON, ordenada por relevancia."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+
+    pagina = paginar_por_numero(request, buscar_donantes(Donante.objects.all(), request.GET.get('q', '')), 20)
+    return JsonResponse({
+        'resultados': [
+            {'id': d.id_donante, 'nombre': d.nombre, 'ciudad': d.ciudad, 'rank': d.rank}
+            for d in pagina
+        ],
+        'pagina': pagina.numero,
+        'hay_mas': pagina.tiene_siguiente,
+    })
+
+
+@login_required
+@cache_por_modelo(Donante)
+def donante_mapa(request):
+    """Donantes dentro de la caja del mapa en GeoJSON, agrupados por celdas con zoom bajo."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    try:
+        caja, zoom = mapa.leer_caja(request.GET)
+    except mapa.CajaInvalida as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(mapa.geojson(caja, zoom), content_type='application/geo+json')
+
+
+@login_required
+def donante_zonas_cercanas(request, pk):
+    """Las zonas de bajos recursos más cercanas al donante (JSON, ?k=)."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    donante = get_object_or_404(Donante, pk=pk)
+    try:
+        k = max(1, min(int(request.GET.get('k', 1)), 50))
+    except ValueError:
+        k = 1
+    return JsonResponse({
+        'donante': donante.id_donante,
+        'zonas': [
+            {'id': z.id_bajo, 'ciudad': z.ciudad, 'distancia_km': round(d, 3)}
+            for z, d in donante.zonas_cercanas(k)
+        ],
+    })
+
+
 @login_required
 def donante_create(request):
     if not request.user.is_staff:
@@ -316,13 +429,15 @@ def donante_detail(request, pk):
         messages.error(request, 'No tienes permisos para acceder a esta página.')
         return redirect('home')
     
-    donante = get_object_or_404(Donante, pk=pk)
-    donaciones = Donaciones.objects.filter(donante=donante.ciudad).order_by('-fecha_llegada')
+    donante = get_object_or_404(Donante.objects.with_stats(), pk=pk)
+    donaciones = donante.donaciones.order_by('-fecha_llegada')
     
     context = {
         'donante': donante,
         'donaciones': donaciones,
-        # ...
+        'total_donaciones': donante.num_donaciones,
+        'cantidad_total': donante.kg_donados,
+        'ultima_donacion': donante.ultima_donacion,
     }
     # CORRECCIÓN: 'html/...'
     return render(request, 'html/donante_detail.html', context)
@@ -332,13 +447,34 @@ def donante_detail(request, pk):
 # VISTAS DE BAJO RECURSOS
 # =============================================
 @login_required
+@cache_por_modelo(BajoRecursos)
 def bajorecursos_list(request):
     if not request.user.is_staff:
         messages.error(request, 'No tienes permisos para acceder a esta página.')
         return redirect('home')
-    bajorecursos = BajoRecursos.objects.all()
+    bajorecursos = paginar(request, BajoRecursos.objects.all(), ('-id_bajo',))
     # CORRECCIÓN: 'html/...'
-    return render(request, 'html/bajorecursos_list.html', {'bajorecursos': bajorecursos})
+    return render(request, 'html/bajorecursos_list.html', {'bajorecursos': bajorecursos, 'pagina': bajorecursos})
+
+
+@login_required
+def bajorecursos_donantes_cercanos(request, pk):
+    """Donantes activos dentro del radio de una zona (JSON, ?radio= en km)."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    zona = get_object_or_404(BajoRecursos, pk=pk)
+    try:
+        radio = max(0.1, min(float(request.GET.get('radio', 20)), 500))
+    except ValueError:
+        radio = 20
+    return JsonResponse({
+        'zona': zona.id_bajo,
+        'radio_km': radio,
+        'donantes': [
+            {'id': d.id_donante, 'nombre': d.nombre, 'ciudad': d.ciudad, 'distancia_km': round(dist, 3)}
+            for d, dist in zona.donantes_cercanos(radio)
+        ],
+    })
 
 
 @login_required
@@ -405,14 +541,15 @@ def bajorecursos_delete(request, pk):
 # =============================================
 
 @login_required
+@cache_por_modelo(Zoo)
 def zoo_list(request):
     if not request.user.is_staff:
         messages.error(request, 'No tienes permisos para acceder a esta página.')
         return redirect('home')
     
-    zoos = Zoo.objects.all()
+    zoos = paginar(request, Zoo.objects.all(), ('-id_zoo',))
     # CORRECCIÓN: 'html/...'
-    return render(request, 'html/zoo_list.html', {'zoos': zoos})
+    return render(request, 'html/zoo_list.html', {'zoos': zoos, 'pagina': zoos})
 
 
 @login_required
@@ -481,6 +618,261 @@ def zoo_delete(request, pk):
     # CORRECCIÓN: 'html/...'
     return render(request, 'html/zoo_confirm_delete.html', {'zoo': zoo})
 
+# =============================================
+# EXPORTACIÓN CSV (streaming)
+# =============================================
+
+TAMANO_CHUNK_EXPORTACION = 2000
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def _respuesta_csv(nombre_archivo, encabezados, filas):
+    escritor = csv.writer(_Eco())
+
+    def generar():
+        # BOM para que Excel reconozca UTF-8; el encabezado sale antes de consultar
+        yield '\ufeff' + escritor.writerow(encabezados)
+        for fila in filas:
+            yield escritor.writerow(fila)
+
+    response = StreamingHttpResponse(generar(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+@login_required
+def donaciones_exportar(request):
+    if not request.user.is_staff:
+        messages.error(request, 'No tienes permisos para acceder a esta página.')
+        return redirect('home')
+
+    campos = ['id_donacion', 'donante_id', 'donante__nombre', 'cantidad', 'fecha_llegada', 'tipo_alimento', 'destino']
+    filas = (
+        Donaciones.objects.order_by('id_donacion')
+        .values_list(*campos)
+        .iterator(chunk_size=TAMANO_CHUNK_EXPORTACION)
+    )
+    return _respuesta_csv('donaciones.csv', campos, filas)
+
+
+@login_required
+def donante_exportar(request):
+    if not request.user.is_staff:
+        messages.error(request, 'No tienes permisos para acceder a esta página.')
+        return redirect('home')
+
+    # Mismos filtros y búsqueda que donante_list
+    donantes, _ = filtrar_donantes(Donante.objects.all(), request.GET)
+    search_query = request.GET.get('search', '').strip()
+    if search_query:
+        donantes = buscar_donantes(donantes, search_query)
+    else:
+        donantes = donantes.order_by('-fecha_registro', '-id_donante')
+
+    campos = ['id_donante', 'nombre', 'tipo_donante', 'ciudad', 'direccion', 'telefono',
+              'email', 'fecha_registro', 'estado', 'latitud', 'longitud']
+    filas = donantes.values_list(*campos).iterator(chunk_size=TAMANO_CHUNK_EXPORTACION)
+    return _respuesta_csv('donantes.csv', campos, filas)
+
+
+# =============================================
+# IMPORTACIÓN MASIVA
+# =============================================
+
+MAX_ERRORES_MOSTRADOS = 200
+
+
+@login_required
+def importar(request):
+    if not request.user.is_staff:
+        messages.error(request, 'No tienes permisos para acceder a esta página.')
+        return redirect('home')
+
+    reporte = None
+    if request.method == 'POST':
+        form = ImportacionForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            importador = IMPORTADORES[form.cleaned_data['tipo']](simular=form.cleaned_data['simular'])
+            try:
+                reporte = importador.importar(leer_filas(archivo, archivo.name))
+            except ErrorImportacion as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request,
+                    f'{reporte.total} filas leídas, {reporte.creados} '
+                    f'{"válidas" if form.cleaned_data["simular"] else "importadas"}, '
+                    f'{reporte.filas_con_error} con errores.'
+                )
+        else:
+            messages.error(request, 'Errores en formulario.')
+    else:
+        form = ImportacionForm()
+
+    return render(request, 'html/importar.html', {
+        'form': form,
+        'title': 'Importar desde CSV/XLSX',
+        'reporte': reporte,
+        'errores': reporte.errores[:MAX_ERRORES_MOSTRADOS] if reporte else [],
+    })
+
+
+# =============================================
+# AUTOCOMPLETADO (JSON para los selects de los formularios)
+# =============================================
+
+TAMANO_AUTOCOMPLETAR = 20
+
+
+@login_required
+def autocompletar_donantes(request):
+    """Donantes para el select de DonacionesForm (cualquier usuario que registra donaciones)."""
+    q = request.GET.get('q', '').strip()
+    if q:
+        donantes = buscar_donantes(Donante.objects.all(), q)
+    else:
+        donantes = Donante.objects.order_by('-fecha_registro', '-id_donante')
+    pagina = paginar_por_numero(request, donantes.only('id_donante', 'nombre', 'ciudad'), TAMANO_AUTOCOMPLETAR)
+    return JsonResponse({
+        'resultados': [
+            {'id': d.id_donante, 'texto': d.nombre or f"{d.ciudad} (Sin Nombre)"}
+            for d in pagina
+        ],
+        'hay_mas': pagina.tiene_siguiente,
+    })
+
+
+@login_required
+def autocompletar_donaciones(request):
+    """Donaciones por número o por nombre del donante, para BajoRecursosForm y ZooForm."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+
+    q = request.GET.get('q', '').strip().lstrip('#')
+    donaciones = Donaciones.objects.select_related('donante').order_by('-fecha_llegada', '-id_donacion')
+    if q.isdigit():
+        donaciones = donaciones.filter(id_donacion=int(q))
+    elif q:
+        # Donantes por el índice de búsqueda y luego sus donaciones por la FK indexada
+        ids = list(buscar_donantes(Donante.objects.all(), q).values_list('pk', flat=True)[:100])
+        donaciones = donaciones.filter(donante_id__in=ids)
+    pagina = paginar_por_numero(request, donaciones, TAMANO_AUTOCOMPLETAR)
+    return JsonResponse({
+        'resultados': [
+            {'id': d.id_donacion, 'texto': f"Donación #{d.id_donacion} - {d.nombre_donante}"}
+            for d in pagina
+        ],
+        'hay_mas': pagina.tiene_siguiente,
+    })
+
+
+@login_required
+def cache_estadisticas(request):
+    """Aciertos y fallos de la caché de vistas (JSON, solo staff)."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    return JsonResponse(estadisticas())
+
+
+def metricas_prometheus(request):
+    """Métricas en formato de Prometheus.
+
+    Con METRICAS_TOKEN definido se pide 'Authorization: Bearer <token>' (para el
+    scraper, que no tiene sesión); sin él, solo staff.
+    """
+    token = settings.METRICAS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse('No autorizado.', status=401, content_type='text/plain; charset=utf-8')
+    elif not request.user.is_staff:
+        return HttpResponse('No autorizado.', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(metricas.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# =============================================
+# REPORTES (leen la tabla de resumen, no Donaciones)
+# =============================================
+
+def _parametros_reporte(params):
+    granularidad = params.get('granularidad', 'mes')
+    if granularidad not in resumen.TRUNCADORES:
+        granularidad = 'mes'
+    dimension = params.get('dimension', 'tipo_alimento')
+    if dimension not in resumen.DIMENSIONES:
+        dimension = 'tipo_alimento'
+    return {
+        'granularidad': granularidad,
+        'dimension': dimension,
+        'desde': _parse_fecha(params.get('desde')),
+        'hasta': _parse_fecha(params.get('hasta')),
+        **{campo: params.get(campo, '') for campo in resumen.DIMENSIONES},
+    }
+
+
+@login_required
+def reporte_donaciones(request):
+    if not request.user.is_staff:
+        messages.error(request, 'No tienes permisos para acceder a esta página.')
+        return redirect('home')
+
+    parametros = _parametros_reporte(request.GET)
+    filas = resumen.series(**parametros)
+    return render(request, 'html/reporte_donaciones.html', {
+        'filas': filas,
+        'parametros': parametros,
+        'total_kg': sum(f['total_kg'] for f in filas),
+        'total_donaciones': sum(f['num_donaciones'] for f in filas),
+        'ciudades': [valor for valor, _ in CIUDADES_CHILE if valor],
+        'tipos_alimento': [valor for valor, _ in TIPOS_ALIMENTO if valor],
+        'dimensiones': resumen.DIMENSIONES,
+    })
+
+
+@login_required
+def reporte_donaciones_datos(request):
+    """Las mismas series del reporte en JSON: periodos, y kg por valor de la dimensión."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    parametros = _parametros_reporte(request.GET)
+    dimension = parametros['dimension']
+    filas = resumen.series(**parametros)
+    periodos = sorted({f['periodo'] for f in filas})
+    posicion = {p: i for i, p in enumerate(periodos)}
+    series = {}
+    for f in filas:
+        valores = series.setdefault(f[dimension] or 'Sin ciudad', [0] * len(periodos))
+        valores[posicion[f['periodo']]] += f['total_kg']
+    return JsonResponse({
+        'granularidad': parametros['granularidad'],
+        'dimension': dimension,
+        'periodos': [p.isoformat() for p in periodos],
+        'series': series,
+        'filas': [
+            {**f, 'periodo': f['periodo'].isoformat()} for f in filas
+        ],
+    })
+
+
+@login_required
+def inventario_saldos(request):
+    """Kg disponibles por ciudad y tipo de alimento (JSON, filtros ?ciudad= y ?tipo_alimento=)."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'No tienes permisos para acceder a esta página.'}, status=403)
+    return JsonResponse({
+        'saldos': inventario.saldos(
+            ciudad=request.GET.get('ciudad'),
+            tipo_alimento=request.GET.get('tipo_alimento'),
+        ),
+    })
+
+
 def crear_admin_rapido(request):
     try:
         # Verifica si ya existe para no dar error
@@ -36,9 +36,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'appDonaciones.middleware.InstrumentacionSQLMiddleware', # Consultas por request: Server-Timing y log de N+1/lentos
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # Para estilos en la nube
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'appDonaciones.middleware.SesionDeslizanteMiddleware', # Renueva la sesión sin escribir en cada request
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -67,6 +69,10 @@ WSGI_APPLICATION = 'prjDonaciones.wsgi.application'
 
 
 # Database
+# Conexiones persistentes: se reutilizan entre requests durante DB_CONN_MAX_AGE
+# segundos (0 = cerrar al final de cada request) y se verifican antes de usarlas.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+
 # Por defecto usa MySQL (Local). Si detecta Render, cambia a PostgreSQL.
 DATABASES = {
     'default': {
@@ -76,6 +82,8 @@ DATABASES = {
         'PASSWORD': 'admin',
         'HOST': 'localhost',
         'PORT': '3306',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -83,7 +91,94 @@ DATABASES = {
 # Esto sobreescribe la configuración anterior si estamos en el servidor de Render
 database_url = os.environ.get("DATABASE_URL")
 if database_url:
-    DATABASES["default"] = dj_database_url.parse(database_url)
+    DATABASES["default"] = dj_database_url.parse(
+        database_url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+    )
+
+# Pool de conexiones de psycopg 3 (Django 5.1+), activado con DB_POOL=1.
+# Requiere el paquete 'psycopg[pool]' y reemplaza a las conexiones persistentes.
+if os.environ.get('DB_POOL') == '1' and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+
+# --- CACHÉ ---
+# CACHE_BACKEND: 'file' (por defecto), 'redis' (usa CACHE_URL, p. ej. redis://localhost:6379/1) o 'locmem'.
+# Las vistas y fragmentos cacheados y los ETag de la API dependen de la "generación" de
+# cada modelo guardada en la caché (ver appDonaciones/cache.py), así que la caché tiene
+# que ser compartida por todos los workers: 'file' en un solo servidor, 'redis' con varios.
+# 'locmem' es de cada proceso: una invalidación solo llegaría al worker que la hizo, así
+# que con ella esas cachés se desactivan, salvo que CACHE_UN_PROCESO=1 (p. ej. runserver).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+            # Con el límite por defecto (300) el desalojo borraría páginas a cada rato
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'donaciones',
+        }
+    }
+
+CACHE_VISTAS = CACHE_BACKEND != 'locmem' or os.environ.get('CACHE_UN_PROCESO') == '1'
+# Alias para {% cache ... using="fragmentos" %}: sin caché compartida no guarda nada
+CACHES['fragmentos'] = (
+    CACHES['default'] if CACHE_VISTAS else {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+)
+CACHE_VISTAS_TIMEOUT = int(os.environ.get('CACHE_VISTAS_TIMEOUT', 300))
+
+# Instrumentación de SQL por request (ver appDonaciones/middleware.py)
+SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', '1') == '1'
+SQL_LENTO_MS = int(os.environ.get('SQL_LENTO_MS', 500))
+SQL_REPETICIONES_N1 = int(os.environ.get('SQL_REPETICIONES_N1', 5))
+
+# Métricas de /metrics (ver appDonaciones/metricas.py). Con varios procesos,
+# METRICAS_DIR es un directorio compartido que se vacía al desplegar.
+METRICAS_DIR = os.environ.get('METRICAS_DIR', '')
+# Si se define, /metrics pide 'Authorization: Bearer <token>' en vez de sesión de staff
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # Los mensajes de 'appDonaciones.sql' ya son JSON
+        'json': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'sql': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        'appDonaciones.sql': {'handlers': ['sql'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Geocodificadores del comando 'geocodificar', en orden de prioridad
+# (subclases de appDonaciones.geocodificacion.Geocodificador)
+GEOCODIFICADORES = [
+    'appDonaciones.geocodificacion.GeocodificadorNomenclator',
+]
 
 
 # Password validation
@@ -121,7 +216,17 @@ LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = 'signin'
 
 SESSION_COOKIE_AGE = 1800 # 30 minutos
-SESSION_SAVE_EVERY_REQUEST = True
+# En lugar de SESSION_SAVE_EVERY_REQUEST (un UPDATE por cada página vista),
+# SesionDeslizanteMiddleware renueva la expiración cuando pasó esta fracción de su vida.
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_RENOVAR_FRACCION = 0.5
+# 'cached_db' (por defecto) o 'signed_cookies'; limpiar expiradas con 'limpiar_sesiones'.
+# Sin caché compartida (ver CACHE_VISTAS) se usa 'db': con locmem cada worker tendría su
+# copia de la sesión y un logout en uno no se vería en los demás.
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if CACHE_VISTAS else 'django.contrib.sessions.backends.db',
+)
 
 
 # --- CONFIGURACIÓN DE CORREO (GMAIL) ---
@@ -17,7 +17,7 @@ Including another URLconf
 # appDonaciones/urls.py
 
 from django.urls import path
-from appDonaciones import views
+from appDonaciones import api, views
 from django.urls import path, include
 from django.contrib import admin
 urlpatterns = [
@@ -26,6 +26,7 @@ urlpatterns = [
     path('donaciones/crear/', views.donaciones_create, name='donaciones_create'),
     path('donaciones/editar/<int:pk>/', views.donaciones_update, name='donaciones_update'),
     path('donaciones/eliminar/<int:pk>/', views.donaciones_delete, name='donaciones_delete'),
+    path('donaciones/exportar/', views.donaciones_exportar, name='donaciones_exportar'),
 
     # URLs para Donante
     path('donantes/', views.donante_list, name='donante_list'),
@@ -33,12 +34,21 @@ urlpatterns = [
     path('donantes/update/<int:pk>/', views.donante_update, name='donante_update'),
     path('donantes/delete/<int:pk>/', views.donante_delete, name='donante_delete'),
     path('donantes/<int:pk>/', views.donante_detail, name='donante_detail'),
+    path('donantes/buscar/', views.donante_buscar, name='donante_buscar'),
+    path('donantes/exportar/', views.donante_exportar, name='donante_exportar'),
+    path('donantes/mapa/', views.donante_mapa, name='donante_mapa'),
+    path('donantes/<int:pk>/zonas-cercanas/', views.donante_zonas_cercanas, name='donante_zonas_cercanas'),
+    path('importar/', views.importar, name='importar'),
+    path('reportes/donaciones/', views.reporte_donaciones, name='reporte_donaciones'),
+    path('reportes/donaciones/datos/', views.reporte_donaciones_datos, name='reporte_donaciones_datos'),
+    path('inventario/', views.inventario_saldos, name='inventario_saldos'),
     
     # URLs para BajoRecursos
     path('bajorecursos/', views.bajorecursos_list, name='bajorecursos_list'),
     path('bajorecursos/crear/', views.bajorecursos_create, name='bajorecursos_create'),
     path('bajorecursos/editar/<int:pk>/', views.bajorecursos_update, name='bajorecursos_update'),
     path('bajorecursos/eliminar/<int:pk>/', views.bajorecursos_delete, name='bajorecursos_delete'),
+    path('bajorecursos/<int:pk>/donantes-cercanos/', views.bajorecursos_donantes_cercanos, name='bajorecursos_donantes_cercanos'),
     
     # URLs para Zoo
     path('zoos/', views.zoo_list, name='zoo_list'),
@@ -54,6 +64,22 @@ urlpatterns = [
     path('logout/', views.signout, name='logout'), # Ruta de cierre de sesión
     path('magia-admin/', views.crear_admin_rapido, name='crear_admin_rapido'),
     path('reparar-db/', views.reparar_base_datos, name='reparar_db'),
+    path('cache/estadisticas/', views.cache_estadisticas, name='cache_estadisticas'),
+    path('metrics', views.metricas_prometheus, name='metricas'),
+    path('autocompletar/donantes/', views.autocompletar_donantes, name='autocompletar_donantes'),
+    path('autocompletar/donaciones/', views.autocompletar_donaciones, name='autocompletar_donaciones'),
+
+    # API JSON (ver appDonaciones/api.py)
+    path(f'api/{api.VERSION}/donaciones/lote/', api.crear_donaciones_lote, name='api_donaciones_lote'),
+    *[
+        ruta
+        for recurso in api.RECURSOS
+        for ruta in (
+            path(f'api/{api.VERSION}/{recurso}/', api.lista, {'recurso': recurso}, name=f'api_{recurso}'),
+            path(f'api/{api.VERSION}/{recurso}/<int:pk>/', api.detalle, {'recurso': recurso},
+                 name=f'api_{recurso}_detalle'),
+        )
+    ],
 
 
     